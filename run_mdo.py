@@ -13,6 +13,8 @@ def main():
         aero_report(plane)
     elif command == 'design':
         aero_design(plane)
+    elif command == 'takeoff':
+        aero_takeoff(plane)
     else:
         print('command not found')
 
@@ -31,5 +33,13 @@ def aero_design(plane_name):
     return
 
 
+def aero_takeoff(plane_name):
+    plane = __import__('src.airplanes.%s.plane' % plane_name, fromlist=['plane'])
+    from src.analysis.takeoff_table import save_takeoff_table, takeoff_grid, takeoff_table
+    table = takeoff_table(plane.plane, *takeoff_grid(plane.plane))
+    print(save_takeoff_table(table))
+    return
+
+
 if __name__ == '__main__':
     main()
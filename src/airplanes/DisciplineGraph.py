@@ -0,0 +1,143 @@
+"""Dependency tracked evaluation of sizing disciplines."""
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from numpy import abs, all, asarray, ndarray
+_missing = object()
+
+
+class Discipline:
+    def __init__(self, name, fun, reads, writes, always=False):
+        """fun(state) updates state in place, reads and writes are its key paths, always ones are never skipped."""
+        # a skipped discipline replays exactly its writes, so they must list every path fun changes
+        self.name = name
+        self.fun = fun
+        self.reads = [tuple(path) for path in reads]
+        self.writes = [tuple(path) for path in writes]
+        self.always = always
+        self.inputs = None
+        self.outputs = None
+        self.runs = 0
+        self.skips = 0
+
+
+class DisciplineGraph:
+    def __init__(self, disciplines, rtol=1e-3, n_workers=1):
+        """run disciplines in list order, skipping those whose inputs moved less than rtol since their last run."""
+        # conflict free neighbours form a stage run on n_workers threads
+        self.disciplines = disciplines
+        self.rtol = rtol
+        self.n_workers = n_workers
+
+    def run(self, state):
+        """evaluate disciplines on state, return names of the disciplines that ran."""
+        ran = []
+        for stage in self.stages():
+            pending = []
+            for discipline in stage:
+                inputs = [_get(state, path) for path in discipline.reads]
+                if not discipline.always and discipline.inputs is not None and \
+                        _close(discipline.inputs, inputs, self.rtol):
+                    for path, value in zip(discipline.writes, discipline.outputs):
+                        _set(state, path, deepcopy(value))
+                    discipline.skips = discipline.skips + 1
+                else:
+                    pending.append((discipline, deepcopy(inputs)))
+            if self.n_workers == 1 or len(pending) <= 1:
+                for discipline, inputs in pending:
+                    discipline.fun(state)
+                    self._store(discipline, inputs, state)
+            else:
+                # each discipline works on its own copy, writes are merged back in stage order
+                copies = [_copy_tree(state) for discipline in pending]
+                with ThreadPoolExecutor(max_workers=self.n_workers) as pool:
+                    list(pool.map(lambda job: job[0][0].fun(job[1]), zip(pending, copies)))
+                for (discipline, inputs), copy in zip(pending, copies):
+                    self._store(discipline, inputs, copy)
+                    for path, value in zip(discipline.writes, discipline.outputs):
+                        _set(state, path, deepcopy(value))
+            ran = ran + [discipline.name for discipline, inputs in pending]
+        return ran
+
+    def stages(self):
+        """return disciplines grouped into stages of mutually independent consecutive disciplines."""
+        stages = []
+        for discipline in self.disciplines:
+            if stages and all([_independent(discipline, other) for other in stages[-1]]):
+                stages[-1].append(discipline)
+            else:
+                stages.append([discipline])
+        return stages
+
+    def info(self):
+        """return run and skip counts of each discipline."""
+        return {discipline.name: {'runs': discipline.runs, 'skips': discipline.skips}
+                for discipline in self.disciplines}
+
+    def _store(self, discipline, inputs, state):
+        """record inputs and written outputs of a discipline run."""
+        discipline.inputs = inputs
+        discipline.outputs = [deepcopy(_get(state, path)) for path in discipline.writes]
+        discipline.runs = discipline.runs + 1
+
+
+def loop_rtol(tol, value, margin=0.1):
+    """return skip rtol for an outer loop converging value to absolute tol."""
+    # inputs moving less than rtol shift a value proportional to them by at most margin * tol
+    return margin * tol / abs(value)
+
+
+def _independent(a, b):
+    """return true if neither discipline reads or writes what the other writes."""
+    return not any([_overlap(p, q) for p in a.writes for q in b.reads + b.writes] +
+                   [_overlap(p, q) for p in b.writes for q in a.reads])
+
+
+def _overlap(p, q):
+    """return true if one key path contains the other."""
+    n = min(len(p), len(q))
+    return p[0:n] == q[0:n]
+
+
+def _get(state, path):
+    """return value at key path, _missing if absent."""
+    for key in path:
+        if not isinstance(state, dict) or key not in state:
+            return _missing
+        state = state[key]
+    return state
+
+
+def _set(state, path, value):
+    """set value at key path, creating intermediate dicts, _missing removes the key."""
+    for key in path[0:-1]:
+        state = state.setdefault(key, {})
+    if value is _missing:
+        state.pop(path[-1], None)
+    else:
+        state[path[-1]] = value
+
+
+def _copy_tree(state):
+    """return copy of nested dicts and lists sharing leaf values."""
+    if isinstance(state, dict):
+        return {key: _copy_tree(value) for key, value in state.items()}
+    if isinstance(state, list):
+        return [_copy_tree(value) for value in state]
+    return state
+
+
+def _close(a, b, rtol):
+    """return true if nested values match, numbers within relative tolerance rtol."""
+    if isinstance(a, dict) or isinstance(b, dict):
+        return (isinstance(a, dict) and isinstance(b, dict) and a.keys() == b.keys() and
+                all([_close(a[key], b[key], rtol) for key in a]))
+    if isinstance(a, (list, tuple, ndarray)) or isinstance(b, (list, tuple, ndarray)):
+        try:
+            a = asarray(a, dtype=float)
+            b = asarray(b, dtype=float)
+        except (TypeError, ValueError):
+            return (len(a) == len(b) and all([_close(a_i, b_i, rtol) for a_i, b_i in zip(a, b)]))
+        return a.shape == b.shape and bool(all(abs(a - b) <= rtol * abs(a).clip(abs(b))))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return a == b or abs(a - b) <= rtol * max(abs(a), abs(b))
+    return a is b or a == b
@@ -2,15 +2,19 @@ from matplotlib import pyplot as plt
 from numpy import arctan, array, cos, deg2rad, linspace, min, ones, pi, rad2deg, sin, size, tan
 from scipy.interpolate import interp1d
 from scipy.optimize import minimize, Bounds
+from src.airplanes.DisciplineGraph import Discipline, DisciplineGraph, loop_rtol
 from src.airplanes.visualization import print_plane
 from src.analysis.constraint import takeoff, master_constraint, stall_speed
 from src.analysis.longitudinal import short_period_mode, static_margin
 from src.analysis.lateral_directional import directional_stability, dutch_roll_mode
 from src.analysis.trim import trim_alpha_de_nonlinear
-from common import Atmosphere, Gravity, constants
-from src.modeling.aerodynamics import polhamus
-from src.modeling import Aircraft, Fuselage, MassProperties, Propulsion, trapezoidal_wing
+from common import Gravity, constants
+from src.modeling.aerodynamics import create_aero_model_surrogate, polhamus
+from src.modeling import Fuselage, MassProperties, Propulsion, trapezoidal_wing
+from src.modeling.Aircraft import aircraft_derivatives
+from src.modeling.FlightCondition import FlightCondition
 from src.modeling.force_model import c_f_m, landing_gear_loads
+from src.modeling.atmosphere import air_density, speed_of_sound
 g = Gravity(0).gravity()
 
 
@@ -58,8 +62,9 @@ def elevator(plane, req, tol=10e-1):
     def v_stab(x):
         plane['horizontal']['control_1']['cf_c'] = x[0]
         s = array([vr, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
-        c = c_f_m(plane, s, u)
-        c_t, c_g, normal_loads = landing_gear_loads(plane, s, c)
+        fc = FlightCondition(s)
+        c = c_f_m(plane, s, u, fc=fc)
+        c_t, c_g, normal_loads = landing_gear_loads(plane, s, c, fc=fc)
         return float(normal_loads[0])
 
     lim = Bounds(0, 1)
@@ -105,7 +110,7 @@ def landing_gear_location(plane, k=0.05, mount='fuselage'):
 
 def longitudinal_sizing(plane, req, s, u, tol=10e-1):
     v = (s[0] ** 2 + s[2] ** 2) ** 0.5
-    a = Atmosphere(s[-1]).speed_of_sound()
+    a = speed_of_sound(s[-1])
     zeta_req = req['stability_and_control']['zeta_sp']
     sm_req = req['stability_and_control']['sm']*100
 
@@ -132,8 +137,9 @@ def longitudinal_sizing(plane, req, s, u, tol=10e-1):
         zeta_sp, omega_sp, cap = short_period_mode(plane, s, u)
         plane['horizontal']['control_1']['cf_c'] = 0.99
         s_r = array([vr, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, alt_to])
-        cfm = c_f_m(plane, s_r, u_r)
-        c_t, c_g, normal_loads = landing_gear_loads(plane, s_r, cfm)
+        fc = FlightCondition(s_r)
+        cfm = c_f_m(plane, s_r, u_r, fc=fc)
+        c_t, c_g, normal_loads = landing_gear_loads(plane, s_r, cfm, fc=fc)
         c = array([zeta_sp - zeta_req, float(normal_loads[0])])
         return c
 
@@ -181,7 +187,7 @@ def range_iter(plane, req):
     hold = 5 * 60  # [sec]
     divert = 45 * 60  # [sec]
     e = plane['wing']['aspect_ratio'] / (2 + plane['wing']['aspect_ratio'])
-    l_d = 0.5 * (pi * plane['wing']['aspect_ratio'] * e / Aircraft(plane, m_cruise).c_d_zero(alt_cruise))**0.5
+    l_d = 0.5 * (pi * plane['wing']['aspect_ratio'] * e / aircraft_derivatives(plane, m_cruise).c_d_zero(alt_cruise))**0.5
     w = plane['weight']['weight']
     delta = 10
     fuel_weight = 0
@@ -189,7 +195,7 @@ def range_iter(plane, req):
         gamma = 10  # [deg]
         m_fuel_climb = w / (l_d * cos(deg2rad(gamma)) * sigma * eta) * (alt_cruise / tan(deg2rad(gamma)))
         m_fuel_cruise = w * (r * constants.ft2nm()) / (l_d * sigma * eta)
-        m_fuel_divert = w * (hold + divert) * (Atmosphere(alt_cruise).speed_of_sound() * m_cruise) / (l_d * sigma * eta)
+        m_fuel_divert = w * (hold + divert) * (speed_of_sound(alt_cruise) * m_cruise) / (l_d * sigma * eta)
         fuel_weight = g * (m_fuel_climb * 3 + m_fuel_cruise + m_fuel_divert) * 1.1
         w_out = plane['weight']['weight'] - plane['propulsion']['fuel_mass'] * g + fuel_weight
         delta = abs(w - w_out)
@@ -222,11 +228,135 @@ def rudder(plane, req, tol=10e-1):
     return u_out['x'][1]
 
 
+def sizing_disciplines(plane, requirements, v_cruise, v_stall, l_cab, tail, engine, landing_gear, surrogate):
+    """return disciplines of one design iteration acting on {'plane': plane, 'sizing': {}}, in evaluation order."""
+    cruise_altitude = requirements['performance']['cruise_altitude']
+    engines = [('plane', 'propulsion', 'engine_%d' % (ii + 1)) for ii in range(0, plane['propulsion']['n_engines'])]
+    airframe = [('plane', key) for key in ['wing', 'horizontal', 'vertical', 'fuselage', 'propulsion',
+                                           'landing_gear', 'weight']]
+
+    def buildup(state):
+        state['plane']['weight']['weight'], cg = MassProperties(state['plane']).weight_buildup(requirements)
+
+    def inertia(state):
+        mp = MassProperties(state['plane'])
+        i_xx = mp.i_xx_simple()
+        i_yy = mp.i_yy_simple()
+        i_zz = mp.i_zz_simple()
+        i_xz = mp.i_xz_simple()
+        state['plane']['weight']['inertia'] = [[i_xx, 0, i_xz], [0, i_yy, 0], [i_xz, 0, i_zz]]
+
+    def loading(state):
+        plane = state['plane']
+        w_s, t_w = wing_loading(plane, requirements)
+        plane['wing']['planform'] = plane['weight']['weight'] / w_s
+        state['sizing']['thrust'] = plane['weight']['weight'] * t_w
+
+    def propellers(state):
+        plane = state['plane']
+        t = state['sizing']['thrust']
+        thrust = array([t * air_density(0) / 0.00238,
+                        t * air_density(cruise_altitude) / 0.00238,
+                        t * air_density(cruise_altitude) / 0.00238])
+        out_prop = propulsion_sizing(plane, thrust, array([v_stall, v_cruise - 200, v_cruise]),
+                                     array([0, cruise_altitude, cruise_altitude]), tol=10e-4)
+        for ii in range(0, plane['propulsion']['n_engines']):
+            plane['propulsion']["engine_%d" % (ii + 1)]['pitch'] = out_prop[0]
+            plane['propulsion']["engine_%d" % (ii + 1)]['diameter'] = out_prop[1]
+            plane['propulsion']["engine_%d" % (ii + 1)]['rpm_max'] = out_prop[2]*1000
+
+    def location(state):
+        plane = state['plane']
+        plane['wing']['station'],  plane['weight']['cg'] = wing_location(plane, requirements, 300, 20000)
+
+    def layout(state):
+        plane = state['plane']
+        if tail == 'T':
+            plane['horizontal']['waterline'] = plane['vertical']['waterline'] + trapezoidal_wing.span(
+                plane['vertical']['aspect_ratio'], plane['vertical']['planform'], mirror=0)
+        elif tail == 'conventional':
+            plane['horizontal']['waterline'] = plane['vertical']['waterline']
+
+        engine_height(plane, requirements)
+        plane['wing']['dihedral'] = dihedral(plane, requirements)
+        if engine == 'wing_mounted':
+            for ii in range(0, plane['propulsion']['n_engines']):
+                plane['propulsion']["engine_%d" % (ii + 1)]['station'] = plane['wing']['station']
+        elif engine == 'fuselage_mounted':
+            for ii in range(0, plane['propulsion']['n_engines']):
+                plane['propulsion']["engine_%d" % (ii + 1)]['station'] = l_cab + plane['fuselage']['l_cockpit'] + 5
+
+        x_ng, x_mg, y_mg, l_g = landing_gear_location(plane, mount=landing_gear)
+        plane['landing_gear']['nose'] = [x_ng, 0, -l_g]
+        plane['landing_gear']['main'] = [x_mg, y_mg, -l_g]
+
+        plane['horizontal']['station'] = min([x_mg +
+                                              (plane['horizontal']['waterline'] + l_g) /
+                                              tan(deg2rad(plane['wing']['alpha_stall']+2)),
+                                              plane['fuselage']['length']-3])
+        plane['vertical']['station'] = plane['horizontal']['station'] - 2
+
+    def trim(state):
+        plane = state['plane']
+        if surrogate is None:
+            c = trim_alpha_de_nonlinear(plane, v_cruise, cruise_altitude, 0)
+        else:
+            previous = plane.get('aero_model')
+            plane['aero_model'] = create_aero_model_surrogate(plane, requirements, surrogate)
+            try:
+                c = trim_alpha_de_nonlinear(plane, v_cruise, cruise_altitude, 0)
+            finally:
+                # surrogate tables are stale once the sizing below moves the tails, the caller's model is kept
+                if previous is None:
+                    del plane['aero_model']
+                else:
+                    plane['aero_model'] = previous
+        state['sizing']['u'] = array([0, deg2rad(c[0]), 0, 1])
+        state['sizing']['x'] = array([float(v_cruise * cos(deg2rad(c[1]))), 0, float(v_cruise * sin(deg2rad(c[1]))),
+                                      0, float(deg2rad(c[1])), 0, 0, 0, 0, 0, 0, cruise_altitude])
+
+    def longitudinal(state):
+        plane = state['plane']
+        out = longitudinal_sizing(plane, requirements, state['sizing']['x'], state['sizing']['u'])
+        plane['wing']['station'] = out[0]
+        plane['horizontal']['planform'] = out[1]
+
+    def directional(state):
+        plane = state['plane']
+        plane['vertical']['planform'] = vertical_tail(plane, requirements, state['sizing']['x'], state['sizing']['u'])
+
+    def fuel(state):
+        state['plane']['propulsion']['fuel_mass'] = range_iter(state['plane'], requirements) / g
+
+    trimmed = [('sizing', 'x'), ('sizing', 'u')]
+    return [Discipline('weight_buildup', buildup, airframe, [('plane', 'weight', 'weight')]),
+            Discipline('inertia', inertia, airframe, [('plane', 'weight', 'inertia')]),
+            Discipline('wing_loading', loading, airframe, [('plane', 'wing', 'planform'), ('sizing', 'thrust')]),
+            Discipline('propulsion_sizing', propellers, [('sizing', 'thrust')] + airframe,
+                       [e + (key,) for e in engines for key in ['pitch', 'diameter', 'rpm_max']]),
+            Discipline('wing_location', location, airframe,
+                       [('plane', 'wing', 'station'), ('plane', 'weight', 'cg')] + [e + ('station',) for e in engines]),
+            Discipline('layout', layout, airframe,
+                       [('plane', 'horizontal', 'waterline'), ('plane', 'horizontal', 'station'),
+                        ('plane', 'vertical', 'station'), ('plane', 'wing', 'dihedral'),
+                        ('plane', 'landing_gear', 'nose'), ('plane', 'landing_gear', 'main')] +
+                       [e + (key,) for e in engines for key in ['station', 'waterline']]),
+            Discipline('trim', trim, airframe, trimmed),
+            Discipline('longitudinal_sizing', longitudinal, airframe + trimmed,
+                       [('plane', 'wing', 'station'), ('plane', 'horizontal', 'planform'),
+                        ('plane', 'horizontal', 'control_1', 'cf_c'), ('plane', 'weight', 'weight'),
+                        ('plane', 'weight', 'cg')]),
+            Discipline('vertical_tail', directional, airframe + trimmed, [('plane', 'vertical', 'planform')]),
+            Discipline('range', fuel, airframe, [('plane', 'propulsion', 'fuel_mass')]),
+            Discipline('weight_buildup_final', buildup, airframe, [('plane', 'weight', 'weight')],
+                       always=True)]
+
+
 def vertical_tail(plane, req, s, u, tol=10e-4):
     zeta_dr_req = req['stability_and_control']['zeta_dr']
     c_n_b_req = req['stability_and_control']['c_n_b']
     alpha = arctan(s[2] / s[0])
-    a = Atmosphere(s[-1]).speed_of_sound()
+    a = speed_of_sound(s[-1])
 
     def obj(x):
         return x[0]
@@ -249,7 +379,7 @@ def wing_loading(plane, requirements):
     """return optimum wing and thrust loading based on requirements."""
     cla = polhamus(2 * pi, plane['wing']['aspect_ratio'], 0.3, plane['wing']['taper'], plane['wing']['sweep_LE'])
     cl_max = cla * deg2rad(plane['wing']['alpha_stall'])
-    a = Atmosphere(requirements['performance']['to_altitude']).speed_of_sound()
+    a = speed_of_sound(requirements['performance']['to_altitude'])
     w_s = linspace(5, 100, 50)
     t_w_to = takeoff(plane, w_s, requirements['performance']['bfl'], requirements['performance']['to_altitude'],
                      plane['landing_gear']['mu_roll'])
@@ -273,7 +403,7 @@ def wing_loading(plane, requirements):
 
 def wing_location(plane, requirements, v, altitude, tol=10e-4):
     sm_reg = requirements['stability_and_control']['sm']
-    a = Atmosphere(altitude).speed_of_sound()
+    a = speed_of_sound(altitude)
     dx = 1
     x_w = plane['wing']['station']
     while abs(dx) > tol:
@@ -289,7 +419,10 @@ def wing_location(plane, requirements, v, altitude, tol=10e-4):
 
 def design(plane, requirements,
            wing_height='high', tail='conventional', engine='wing_mounted', landing_gear='fuselage',
-           propulsion='h2'):
+           propulsion='h2', surrogate=None, w_tol=10, rtol=None, n_workers=1):
+    """size plane to requirements until the sizing loop moves the weight less than w_tol [lbs]."""
+    # surrogate is an optional AvlSurrogate supplying aero tables for the cruise trim, sizing disciplines are
+    # skipped while their inputs stay within rtol and independent ones run on n_workers threads
 
     if propulsion == 'h2':
         plane['propulsion']['energy_density'] = constants.energy_density_h2() * 2655224 / 0.0685218
@@ -321,72 +454,20 @@ def design(plane, requirements,
         plane['vertical']['taper'] = 0.7
 
     v_cruise = (requirements['performance']['cruise_mach'] *
-                Atmosphere(requirements['performance']['cruise_altitude']).speed_of_sound())
+                speed_of_sound(requirements['performance']['cruise_altitude']))
     v_stall = requirements['performance']['stall_speed']
 
+    # skipped disciplines replay outputs of inputs up to rtol away, loop_rtol keeps that well inside w_tol
+    rtol = loop_rtol(w_tol, plane['weight']['weight']) if rtol is None else rtol
+    graph = DisciplineGraph(sizing_disciplines(plane, requirements, v_cruise, v_stall, l_cab, tail, engine,
+                                               landing_gear, surrogate), rtol=rtol, n_workers=n_workers)
+    state = {'plane': plane, 'sizing': {}}
     dw = 100
-    # iterative
-    while abs(dw) > 10:
+    # iterative, weight_buildup_final always runs so dw is never a replayed value
+    while abs(dw) > w_tol:
         print('dw = %d' % dw)
         w_i = plane['weight']['weight']
-        plane['weight']['weight'], cg = MassProperties(plane).weight_buildup(requirements)
-        i_xx = MassProperties(plane).i_xx_simple()
-        i_yy = MassProperties(plane).i_yy_simple()
-        i_zz = MassProperties(plane).i_zz_simple()
-        i_xz = MassProperties(plane).i_xz_simple()
-        w_s, t_w = wing_loading(plane, requirements)
-        plane['weight']['inertia'] = [[i_xx, 0, i_xz], [0, i_yy, 0], [i_xz, 0, i_zz]]
-        plane['wing']['planform'] = plane['weight']['weight'] / w_s
-        t = plane['weight']['weight'] * t_w
-
-        thrust = array([t * Atmosphere(0).air_density() / 0.00238,
-                        t * Atmosphere(requirements['performance']['cruise_altitude']).air_density() / 0.00238,
-                        t * Atmosphere(requirements['performance']['cruise_altitude']).air_density() / 0.00238])
-        out_prop = propulsion_sizing(plane, thrust, array([v_stall, v_cruise - 200, v_cruise]),
-                                     array([0, requirements['performance']['cruise_altitude'],
-                                            requirements['performance']['cruise_altitude']]), tol=10e-4)
-        for ii in range(0, plane['propulsion']['n_engines']):
-            plane['propulsion']["engine_%d" % (ii + 1)]['pitch'] = out_prop[0]
-            plane['propulsion']["engine_%d" % (ii + 1)]['diameter'] = out_prop[1]
-            plane['propulsion']["engine_%d" % (ii + 1)]['rpm_max'] = out_prop[2]*1000
-
-        plane['wing']['station'],  plane['weight']['cg'] = wing_location(plane, requirements, 300, 20000)
-
-        if tail == 'T':
-            plane['horizontal']['waterline'] = plane['vertical']['waterline'] + trapezoidal_wing.span(
-                plane['vertical']['aspect_ratio'], plane['vertical']['planform'], mirror=0)
-        elif tail == 'conventional':
-            plane['horizontal']['waterline'] = plane['vertical']['waterline']
-
-        engine_height(plane, requirements)
-        plane['wing']['dihedral'] = dihedral(plane, requirements)
-        if engine == 'wing_mounted':
-            for ii in range(0, plane['propulsion']['n_engines']):
-                plane['propulsion']["engine_%d" % (ii + 1)]['station'] = plane['wing']['station']
-        elif engine == 'fuselage_mounted':
-            for ii in range(0, plane['propulsion']['n_engines']):
-                plane['propulsion']["engine_%d" % (ii + 1)]['station'] = l_cab + plane['fuselage']['l_cockpit'] + 5
-
-        x_ng, x_mg, y_mg, l_g = landing_gear_location(plane, mount=landing_gear)
-        plane['landing_gear']['nose'] = [x_ng, 0, -l_g]
-        plane['landing_gear']['main'] = [x_mg, y_mg, -l_g]
-
-        plane['horizontal']['station'] = min([x_mg +
-                                              (plane['horizontal']['waterline'] + l_g) /
-                                              tan(deg2rad(plane['wing']['alpha_stall']+2)),
-                                              plane['fuselage']['length']-3])
-        plane['vertical']['station'] = plane['horizontal']['station'] - 2
-
-        c = trim_alpha_de_nonlinear(plane, v_cruise, requirements['performance']['cruise_altitude'], 0)
-        u = array([0, deg2rad(c[0]), 0, 1])
-        x = array([float(v_cruise * cos(deg2rad(c[1]))), 0, float(v_cruise * sin(deg2rad(c[1]))),
-                   0, float(deg2rad(c[1])), 0, 0, 0, 0, 0, 0, requirements['performance']['cruise_altitude']])
-        out = longitudinal_sizing(plane, requirements, x, u)
-        plane['wing']['station'] = out[0]
-        plane['horizontal']['planform'] = out[1]
-        plane['vertical']['planform'] = vertical_tail(plane, requirements, x, u)
-        plane['propulsion']['fuel_mass'] = range_iter(plane, requirements) / g
-        plane['weight']['weight'], cg = MassProperties(plane).weight_buildup(requirements)
+        graph.run(state)
         dw = w_i - plane['weight']['weight']
 
     plane['horizontal']['control_1']['cf_c'] = elevator(plane, requirements)
@@ -1,28 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+from os import cpu_count
 from matplotlib import pyplot as plt
-from numpy import arctan, array, cos, deg2rad, linspace, sin, zeros
-from common import Atmosphere, Gravity
-from common.report_tools import create_output_dir, load_aero_model, model_exists, plot_or_save
+from numpy import arange, arctan, array, array_split, asarray, cos, deg2rad, linspace, sin, zeros
+from common import Gravity
+from common.report_tools import create_output_dir, plot_or_save
 from src.analysis.lateral_directional import dutch_roll_mode, latdir_stability_nonlinear, plot_dr, roll_mode, \
     spiral_mode
 from src.analysis.longitudinal import aircraft_range, balanced_field_length, maneuvering, maneuvering_envelope, \
-    plot_sp, short_period_mode, specific_excess_power, static_margin_nonlinear
-from src.analysis.trim import trim_aileron_nonlinear, trim_aileron_rudder_nonlinear, trim_alpha_de_nonlinear, trim_vx, \
-    trim_vy
+    plot_balanced_field_length, plot_sp, short_period_mode, specific_excess_power, static_margin_nonlinear
+from src.analysis.trim import continuation_guess, trim_aileron_nonlinear, trim_aileron_rudder_nonlinear, \
+    trim_alpha_de_nonlinear, trim_cache, trim_vx, trim_vy
+from src.modeling.aero_store import load_model
+from src.modeling.atmosphere import speed_of_sound
 g = Gravity(0).gravity()  # f/s2
 show_plot = 0
 save_plot = 1
+sweep_keys = ['cap', 'zeta_sp', 'zeta_dr', 'omega_dr', 'p_s', 'sm', 'c_n', 'c_r', 't_roll', 't_2_d_sp', 'dr_beta',
+              'da_beta', 'da_roll', 'r']
+trim_keys = ['alpha_de', 'aileron_rudder', 'aileron']
 
 
 # Sweep
-def report_sweep(plane, requirements):
-    if model_exists(plane['name']):
-        plane['aero_model'] = load_aero_model(plane['name'])
+def report_sweep(plane, requirements, n_mach=5, n_alt=3, n_workers=None, trim_store=None):
+    model = load_model(plane['name'])
+    if model is not None:
+        plane['aero_model'] = model
     name = plane['name']
     create_output_dir(name)
     machs = linspace(requirements['flight_envelope']['mach'][0],
-                     requirements['flight_envelope']['mach'][1], 5)
+                     requirements['flight_envelope']['mach'][1], n_mach)
     altitudes = linspace(requirements['flight_envelope']['altitude'][0],
-                         requirements['flight_envelope']['altitude'][1], 3)
+                         requirements['flight_envelope']['altitude'][1], n_alt)
 
     # Requirements
     n_z = [requirements['loads']['n_z'][0], 1, requirements['loads']['n_z'][1]]  # [g]
@@ -30,67 +39,8 @@ def report_sweep(plane, requirements):
     p = deg2rad(requirements['stability_and_control']['roll_rate'])  # [rad/s]
     h_to = requirements['performance']['to_altitude']  # [ft]
 
-    # set arrays
-    cap = zeros((len(altitudes), len(machs)))
-    zeta_sp = zeros((len(altitudes), len(machs)))
-    zeta_dr = zeros((len(altitudes), len(machs)))
-    omega_dr = zeros((len(altitudes), len(machs)))
-    p_s = zeros((len(altitudes), len(machs)))
-    alpha_nz = zeros((len(altitudes), len(machs), len(n_z)))
-    de_nz = zeros((len(altitudes), len(machs), len(n_z)))
-    sm = zeros((len(altitudes), len(machs)))
-    c_n = zeros((len(altitudes), len(machs)))
-    c_r = zeros((len(altitudes), len(machs)))
-    t_roll = zeros((len(altitudes), len(machs)))
-    t_2_d_sp = zeros((len(altitudes), len(machs)))
-    dr_beta = zeros((len(altitudes), len(machs)))
-    da_beta = zeros((len(altitudes), len(machs)))
-    da_roll = zeros((len(altitudes), len(machs)))
-    r = zeros((len(altitudes), len(machs)))
-    vmc = zeros((len(altitudes), 1))
-
     # iterative methods
-    i_alt = 0
-    for alt_i in altitudes:
-        i_mach = 0
-        # altitude iterative
-        # stability and control
-        #trim_vx(plane, alt_i)
-        #trim_vy(plane, alt_i)
-
-        for mach_i in machs:
-            a = Atmosphere(alt_i).speed_of_sound()
-            v = mach_i * a
-            trim_out = trim_alpha_de_nonlinear(plane, v, alt_i, 0)
-            aoa = deg2rad(trim_out[0])  # rad
-            u = v * cos(aoa)  # ft/s
-            w = v * sin(aoa)  # ft/s
-            de = deg2rad(trim_out[1])  # rad
-            x_0 = array([float(u), 0.0, float(w), 0.0, float(aoa), 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, alt_i])
-            u_0 = array([0.0, float(de), 0.0, 1])
-            beta = arctan(crosswind / v)
-
-            # stability and control
-            omega, zeta_sp[i_alt, i_mach], cap[i_alt, i_mach] = short_period_mode(plane, x_0, u_0)
-            omega_dr[i_alt, i_mach], zeta_dr[i_alt, i_mach] = dutch_roll_mode(plane, x_0, u_0)
-            t_2_d_sp[i_alt, i_mach] = spiral_mode(plane, x_0, u_0)
-            t_roll[i_alt, i_mach] = roll_mode(plane, x_0, u_0)
-            sm[i_alt, i_mach] = static_margin_nonlinear(plane, mach_i, alt_i, aoa, de)
-            c_latdir = latdir_stability_nonlinear(plane, mach_i, alt_i, aoa, de)
-            c_n[i_alt, i_mach] = c_latdir[1]
-            c_r[i_alt, i_mach] = c_latdir[0]
-            out_beta = trim_aileron_rudder_nonlinear(plane, v, alt_i, float(aoa), beta, 0, 0)
-            dr_beta[i_alt, i_mach] = out_beta[1]
-            da_beta[i_alt, i_mach] = out_beta[0]
-            out_p = trim_aileron_nonlinear(plane, v, alt_i, p)
-            da_roll[i_alt, i_mach] = out_p
-
-            # performance
-            p_s[i_alt, i_mach] = specific_excess_power(plane, x_0, u_0)
-            alpha_nz[i_alt, i_mach, :], de_nz[i_alt, i_mach, :] = maneuvering(plane, mach_i, alt_i, n_z)
-            r[i_alt, i_mach] = aircraft_range(plane, x_0, u_0)
-            i_mach = i_mach + 1
-        i_alt = i_alt + 1
+    results = envelope_sweep(plane, altitudes, machs, n_z, crosswind, p, n_workers=n_workers, trim_store=trim_store)
 
     # non-iterative methods
     maneuvering_envelope(plane, requirements, 0)
@@ -98,10 +48,122 @@ def report_sweep(plane, requirements):
 
     x_0 = array([float(0.01), 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, h_to])
     u_0 = array([0.0, 0.0, 0.0, 1])
-    balanced_field_length(plane, x_0, u_0)
+    v_r, v_1, v_2, v_lof, takeoff = balanced_field_length(plane, x_0, u_0, full_output=True)
+    plot_balanced_field_length(takeoff)
     plot_or_save(plt, show_plot, save_plot, name, 'balanced_field_length')
 
     # plotting
+    plot_sweep(name, altitudes, machs, n_z, results)
+    return results
+
+
+def envelope_sweep(plane, altitudes, machs, n_z, crosswind, p, n_workers=None, trim_store=None):
+    """evaluate every altitude, mach point of the flight envelope over a process pool."""
+    # n_workers=1 runs serially, trim_store is an optional directory of converged trims shared by the workers
+    results = {key: zeros((len(altitudes), len(machs))) for key in sweep_keys}
+    results['alpha_nz'] = zeros((len(altitudes), len(machs), len(n_z)))
+    results['de_nz'] = zeros((len(altitudes), len(machs), len(n_z)))
+    results['vmc'] = zeros((len(altitudes), 1))
+
+    # rows split into contiguous mach chunks until every worker has a job, trims continue along mach within a chunk
+    n_cpu = 1 if n_workers == 1 else (n_workers or cpu_count())
+    n_chunks = min(len(machs), ceil(n_cpu / len(altitudes)))
+    jobs = [(i_alt, i_machs, plane, asarray(machs)[i_machs], altitudes[i_alt], n_z, crosswind, p, trim_store)
+            for i_alt in range(0, len(altitudes)) for i_machs in array_split(arange(len(machs)), n_chunks)]
+    if n_workers == 1 or len(jobs) == 1:
+        chunks = list(map(_sweep_chunk, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            chunks = list(pool.map(_sweep_chunk, jobs))
+    for i_alt, i_machs, points in chunks:
+        for i_mach, point in zip(i_machs, points):
+            _store_point(results, i_alt, i_mach, point)
+    return results
+
+
+def sweep_point(plane, mach_i, alt_i, n_z, crosswind, p, x0=None):
+    """return stability, control and performance results and the nonlinear trims at one flight condition."""
+    # x0 holds optional trim starting points keyed like the returned trims
+    x0 = {} if x0 is None else x0
+    trims = {}
+    a = speed_of_sound(alt_i)
+    v = mach_i * a
+    trim_out = trim_alpha_de_nonlinear(plane, v, alt_i, 0, x0=x0.get('alpha_de'))
+    trims['alpha_de'] = trim_out
+    aoa = deg2rad(trim_out[0])  # rad
+    u = v * cos(aoa)  # ft/s
+    w = v * sin(aoa)  # ft/s
+    de = deg2rad(trim_out[1])  # rad
+    x_0 = array([float(u), 0.0, float(w), 0.0, float(aoa), 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, alt_i])
+    u_0 = array([0.0, float(de), 0.0, 1])
+    beta = arctan(crosswind / v)
+    point = {}
+
+    # stability and control
+    omega, point['zeta_sp'], point['cap'] = short_period_mode(plane, x_0, u_0)
+    point['omega_dr'], point['zeta_dr'] = dutch_roll_mode(plane, x_0, u_0)
+    point['t_2_d_sp'] = spiral_mode(plane, x_0, u_0)
+    point['t_roll'] = roll_mode(plane, x_0, u_0)
+    point['sm'] = static_margin_nonlinear(plane, mach_i, alt_i, aoa, de)
+    c_latdir = latdir_stability_nonlinear(plane, mach_i, alt_i, aoa, de)
+    point['c_n'] = c_latdir[1]
+    point['c_r'] = c_latdir[0]
+    out_beta = trim_aileron_rudder_nonlinear(plane, v, alt_i, float(aoa), beta, 0, 0, x0=x0.get('aileron_rudder'))
+    trims['aileron_rudder'] = out_beta
+    point['dr_beta'] = out_beta[1]
+    point['da_beta'] = out_beta[0]
+    point['da_roll'] = trim_aileron_nonlinear(plane, v, alt_i, p, x0=x0.get('aileron'))
+    trims['aileron'] = point['da_roll']
+
+    # performance
+    point['p_s'] = specific_excess_power(plane, x_0, u_0)
+    point['alpha_nz'], point['de_nz'] = maneuvering(plane, mach_i, alt_i, n_z)
+    point['r'] = aircraft_range(plane, x_0, u_0)
+    return point, trims
+
+
+def _sweep_chunk(job):
+    """process pool entry point, sweep a mach chunk at one altitude with trims continued from the previous points."""
+    i_alt, i_machs, plane, machs, alt_i, n_z, crosswind, p, trim_store = job
+    points = []
+    trims = []
+    # serial sweeps run in the caller's process, the store must not outlive the chunk
+    with trim_cache.backed_by(trim_store):
+        for i_mach in range(0, len(machs)):
+            x0 = {key: continuation_guess(machs[i_mach], machs[0:i_mach], [t[key] for t in trims])
+                  for key in trim_keys}
+            point, trim_out = sweep_point(plane, machs[i_mach], alt_i, n_z, crosswind, p, x0=x0)
+            points.append(point)
+            trims.append(trim_out)
+    return i_alt, i_machs, points
+
+
+def _store_point(results, i_alt, i_mach, point):
+    """copy one point into the sweep arrays."""
+    for key, value in point.items():
+        results[key][i_alt, i_mach] = asarray(value, dtype=float).reshape(results[key][i_alt, i_mach].shape)
+
+
+def plot_sweep(name, altitudes, machs, n_z, results):
+    """plot flight envelope sweep results."""
+    cap = results['cap']
+    zeta_sp = results['zeta_sp']
+    zeta_dr = results['zeta_dr']
+    omega_dr = results['omega_dr']
+    p_s = results['p_s']
+    alpha_nz = results['alpha_nz']
+    de_nz = results['de_nz']
+    sm = results['sm']
+    c_n = results['c_n']
+    c_r = results['c_r']
+    t_roll = results['t_roll']
+    t_2_d_sp = results['t_2_d_sp']
+    dr_beta = results['dr_beta']
+    da_beta = results['da_beta']
+    da_roll = results['da_roll']
+    r = results['r']
+    vmc = results['vmc']
+
     plt.figure()
     for i_alt in range(0, len(altitudes)):
         plt.plot(machs, sm[i_alt, :], label="Alt %d ft" % (altitudes[i_alt]))
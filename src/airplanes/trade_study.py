@@ -0,0 +1,190 @@
+"""Design of experiments and trade studies over design()."""
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from itertools import product
+from os import path
+from matplotlib import pyplot as plt
+from numpy import array, ceil, cos, deg2rad, floor, log2, sin
+from scipy.stats import qmc
+from src.airplanes.design import design
+from src.analysis.longitudinal import aircraft_range, specific_excess_power
+from src.analysis.takeoff_table import takeoff_point
+from src.analysis.trim import trim_alpha_de_nonlinear
+from src.modeling.atmosphere import atmosphere, speed_of_sound
+design_options = ['wing_height', 'tail', 'engine', 'landing_gear', 'propulsion']
+# performance. prefixed outputs are evaluated on the sized plane by performance
+default_outputs = ['weight.weight', 'propulsion.fuel_mass', 'wing.planform', 'wing.station', 'wing.dihedral',
+                   'horizontal.planform', 'horizontal.station', 'vertical.planform', 'vertical.station',
+                   'propulsion.engine_1.pitch', 'propulsion.engine_1.diameter', 'propulsion.engine_1.rpm_max',
+                   'performance.range', 'performance.p_s', 'performance.bfl']
+
+
+def full_factorial(space):
+    """return cases of every combination of levels, space is {name: [levels]}."""
+    names = list(space)
+    return [dict(zip(names, levels)) for levels in product(*[space[name] for name in names])]
+
+
+def latin_hypercube(space, n, seed=None):
+    """return n latin hypercube cases, space values are (low, high) ranges or [levels] lists."""
+    return _scale(space, qmc.LatinHypercube(d=len(space), seed=seed).random(n))
+
+
+def sobol(space, n, seed=None):
+    """return scrambled sobol cases, n is rounded up to a power of two to keep the sequence balanced."""
+    return _scale(space, qmc.Sobol(d=len(space), seed=seed).random_base2(int(ceil(log2(max(n, 1))))))
+
+
+def case_inputs(plane, requirements, case, options=None):
+    """return copies of plane and requirements with case applied, and the design() keyword arguments."""
+    # case names are design() options, plane. prefixed plane key paths or requirement key paths
+    plane = deepcopy({key: value for key, value in plane.items() if key != 'aero_model'})
+    requirements = deepcopy(requirements)
+    kwargs = {} if options is None else dict(options)
+    for name, value in case.items():
+        if name in design_options:
+            kwargs[name] = value
+            continue
+        keys = name.split('.')
+        target = plane if keys[0] == 'plane' else requirements
+        keys = keys[1:] if keys[0] == 'plane' else keys
+        for key in keys[0:-1]:
+            target = target[key]
+        if keys[-1] not in target:
+            raise KeyError('%s is not a design option, plane or requirement entry' % name)
+        target[keys[-1]] = value
+    return plane, requirements, kwargs
+
+
+def performance(plane, requirements):
+    """return cruise range [nmi], cruise specific excess power [ft/min] and standard day bfl [ft] of a sized plane."""
+    altitude = requirements['performance']['cruise_altitude']
+    v = requirements['performance']['cruise_mach'] * speed_of_sound(altitude)
+    alpha, de = deg2rad(trim_alpha_de_nonlinear(plane, v, altitude, 0))
+    x_0 = array([v * cos(alpha), 0, v * sin(alpha), 0, alpha, 0, 0, 0, 0, 0, 0, altitude])
+    u_0 = array([0, de, 0, 1])
+    elevation = requirements['performance']['to_altitude']
+    bfl = takeoff_point(plane, plane['weight']['weight'], elevation, atmosphere(elevation)[2] - 459.67)[0]
+    return {'range': aircraft_range(plane, x_0, u_0), 'p_s': specific_excess_power(plane, x_0, u_0), 'bfl': bfl}
+
+
+def trade_study(plane, requirements, cases, results_file=None, outputs=None, options=None, n_workers=None,
+                runner=design, retry_failed=True):
+    """run runner(plane, requirements, **kwargs) on isolated copies for every case, return one row dict per case."""
+    # rows hold the case index and values, status, wall time [s] and the outputs of the sized plane, results_file is
+    # an optional csv appended as cases finish whose recorded cases are not rerun unless they failed and retry_failed
+    # is set, options are design() keyword arguments shared by all cases, n_workers=None uses one process per cpu
+    outputs = default_outputs if outputs is None else outputs
+    names = list(dict.fromkeys([name for case in cases for name in case]))
+    columns = ['case'] + names + ['status', 'time'] + outputs
+    done = {}
+    if results_file is not None and path.isfile(results_file):
+        for row in _read_rows(results_file, columns):
+            i_case = int(row['case'])
+            if i_case < len(cases) and all([str(cases[i_case].get(name, '')) == row[name] for name in names]):
+                done[i_case] = {key: _parse(value) for key, value in row.items()}
+                done[i_case]['case'] = i_case
+    if retry_failed:
+        done = {i_case: row for i_case, row in done.items() if row['status'] == 'converged'}
+    jobs = [(i_case, plane, requirements, cases[i_case], outputs, options, runner)
+            for i_case in range(0, len(cases)) if i_case not in done]
+
+    rows = dict(done)
+    f = None
+    if results_file is not None:
+        new_file = not path.isfile(results_file)
+        f = open(results_file, 'a', newline='')
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if new_file:
+            writer.writeheader()
+    try:
+        if n_workers == 1 or len(jobs) <= 1:
+            finished = map(_run_case, jobs)
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_worker_init)
+            finished = (future.result() for future in as_completed([pool.submit(_run_case, job) for job in jobs]))
+        for row in finished:
+            rows[row['case']] = row
+            if f is not None:
+                # flushed per case so an interrupted study resumes where it stopped
+                writer.writerow({key: row.get(key, '') for key in columns})
+                f.flush()
+        if pool is not None:
+            pool.shutdown()
+    finally:
+        if f is not None:
+            f.close()
+    return [rows[i_case] for i_case in sorted(rows)]
+
+
+def read_results(results_file):
+    """return rows of a trade study results csv, numeric entries as floats, a retried case keeps its last row."""
+    rows = {}
+    for row in _read_rows(results_file):
+        rows[row['case']] = {key: _parse(value) for key, value in row.items()}
+    return list(rows.values())
+
+
+def _read_rows(results_file, columns=None):
+    """return raw csv rows, columns checks the header of a file being resumed."""
+    with open(results_file, newline='') as f:
+        reader = csv.DictReader(f)
+        if columns is not None and reader.fieldnames != columns:
+            raise ValueError('%s holds a different study, columns %s' % (results_file, reader.fieldnames))
+        return list(reader)
+
+
+def _run_case(job):
+    """process pool entry point, size one case and collect its outputs, failures are recorded not raised."""
+    i_case, plane, requirements, case, outputs, options, runner = job
+    t_0 = time.perf_counter()
+    row = dict(case)
+    row['case'] = i_case
+    try:
+        plane, requirements, kwargs = case_inputs(plane, requirements, case, options)
+        runner(plane, requirements, **kwargs)
+        sized = dict(plane)
+        if any([name.startswith('performance.') for name in outputs]):
+            sized['performance'] = performance(plane, requirements)
+        for name in outputs:
+            value = sized
+            for key in name.split('.'):
+                value = value[key]
+            row[name] = float(value)
+        row['status'] = 'converged'
+    except Exception as e:
+        row['status'] = 'failed: %s' % e
+    plt.close('all')
+    row['time'] = time.perf_counter() - t_0
+    return row
+
+
+def _parse(value):
+    """return csv entry as float where possible."""
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _worker_init():
+    """process pool initializer, plots of design() must not open windows that block the worker."""
+    plt.switch_backend('agg')
+
+
+def _scale(space, samples):
+    """map unit hypercube samples onto space, (low, high) tuples are ranges and lists are categorical levels."""
+    cases = []
+    for sample in samples:
+        case = {}
+        for name, s in zip(space, sample):
+            levels = space[name]
+            if isinstance(levels, tuple):
+                case[name] = float(levels[0] + s * (levels[1] - levels[0]))
+            else:
+                case[name] = levels[min(int(floor(s * len(levels))), len(levels) - 1)]
+        cases.append(case)
+    return cases
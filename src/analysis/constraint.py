@@ -1,21 +1,21 @@
 from numpy import cos, deg2rad, mean, sin, sqrt
-from common import Atmosphere
 from common.Gravity import Gravity
-from src.modeling.Aircraft import Aircraft
+from src.modeling.Aircraft import aircraft_derivatives
+from src.modeling.atmosphere import air_density, air_properties, speed_of_sound
 g = Gravity(0).gravity()
 
 
 def master_constraint(aircraft, wing_loading, mach, altitude, n, gamma, a_x):
     """master constraint equation for flight."""
     "return sea level static thrust to weight ratio"
-    rho = Atmosphere(altitude).air_density()
-    rho_sl = Atmosphere(0).air_density()
-    a = Atmosphere(altitude).speed_of_sound()
+    rho, a = air_properties(altitude)
+    rho_sl = air_density(0)
     v = a*mach
     q_bar = 0.5*rho*v**2
 
-    c_d_0 = Aircraft(aircraft, mach).c_d_zero(altitude)
-    c_l_a = Aircraft(aircraft, mach).c_l_alpha()
+    ac = aircraft_derivatives(aircraft, mach)
+    c_d_0 = ac.c_d_zero(altitude)
+    c_l_a = ac.c_l_alpha()
 
     t_w = (q_bar*c_d_0/wing_loading
            + wing_loading*(n**2)*(cos(deg2rad(gamma))**2)/(q_bar*c_l_a)
@@ -25,8 +25,7 @@ def master_constraint(aircraft, wing_loading, mach, altitude, n, gamma, a_x):
 
 def stall_speed(mach, altitude, c_l_max, n, gamma):
     """stall speed constraint equation."""
-    rho = Atmosphere(altitude).air_density()
-    a = Atmosphere(altitude).speed_of_sound()
+    rho, a = air_properties(altitude)
     v = a * mach
     q_bar = 0.5 * rho * v ** 2
     w_s = q_bar*c_l_max/(n*cos(deg2rad(gamma)))
@@ -36,17 +35,18 @@ def stall_speed(mach, altitude, c_l_max, n, gamma):
 def takeoff(aircraft, wing_loading, s_to, altitude, mu, c_l_max=1.4):
     """takeoff constraint equation."""
     "return sea level static thrust to weight ratio"
-    rho = Atmosphere(altitude).air_density()
-    rho_sl = Atmosphere(0).air_density()
+    rho = air_density(altitude)
+    rho_sl = air_density(0)
 
-    a = Atmosphere(altitude).speed_of_sound()
+    a = speed_of_sound(altitude)
     q_stall = wing_loading / c_l_max
     q_v_avg = 0.5 * q_stall
     mach_avg = sqrt(q_v_avg/(0.5*rho))/a
 
-    c_d_0 = Aircraft(aircraft, mean(mach_avg)).c_d_zero(altitude)
-    c_l_a = Aircraft(aircraft, mean(mach_avg)).c_l_alpha()
-    c_l_0 = Aircraft(aircraft, mean(mach_avg)).c_l_zero()
+    ac = aircraft_derivatives(aircraft, mean(mach_avg))
+    c_d_0 = ac.c_d_zero(altitude)
+    c_l_a = ac.c_l_alpha()
+    c_l_0 = ac.c_l_zero()
 
     d_w = q_v_avg*(c_d_0+(c_l_0**2)/c_l_a)/wing_loading
     l_w = q_v_avg*c_l_0/wing_loading
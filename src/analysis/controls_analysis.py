@@ -1,45 +1,48 @@
-from common.equations_of_motion import nonlinear_eom
-from numpy import identity, transpose, zeros
-from src.modeling.force_model import c_f_m
+from numpy import abs, asarray, identity, maximum, ones, tile, zeros
+from src.modeling.force_model import c_f_m_batch, nonlinear_eom_batch
+rel_step = 1e-4  # relative central difference step []
 
 
-def nonlinear_eom_to_ss(aircraft, x_ss, u_ss, x_0, u_0, m, j, dx=0.1, du=0.1):
+def nonlinear_eom_to_ss(aircraft, x_ss, u_ss, x_0, u_0, m, j, dx=None, du=None):
     """aircraft system linearization routine."""
     """return jacobians a, b wrt to x_ss and output matrices c, and d wrt u_ss."""
-    x = x_0
-    u = u_0
-    a = zeros((len(x_0), len(x_0)))
-    b = zeros((len(x_0), len(u_0)))
-    for ii in range(0, len(x_0)):
-        x[ii] = x[ii] + dx
-        c = c_f_m(aircraft, x, u_0)
-        dxdt_1 = nonlinear_eom(x, m, j, c)
-
-        x[ii] = x[ii] - dx
-        c = c_f_m(aircraft, x, u_0)
-        dxdt_2 = nonlinear_eom(x, m, j, c)
-        ddx_dx = (dxdt_1 - dxdt_2)/(2*dx)
-        a[:, ii] = transpose(ddx_dx)
-        x = x_0
-
-    for ii in range(0, len(u_0)):
-        u[ii] = u[ii] + du
-        c = c_f_m(aircraft, x_0, u)
-        dxdt_1 = nonlinear_eom(x, m, j, c)
-
-        u[ii] = u[ii] - du
-        c = c_f_m(aircraft, x_0, u)
-        dxdt_2 = nonlinear_eom(x, m, j, c)
-        ddx_dx = (dxdt_1 - dxdt_2)/(2*du)
-        b[:, ii] = transpose(ddx_dx)
-        u = u_0
-
-    a_out = a[x_ss, :]
-    a_out = a_out[:, x_ss]
-
-    b_out = b[x_ss, :]
-    b_out = b_out[:, u_ss]
-
+    a, b = eom_jacobians(aircraft, x_0, u_0, m, j, x_ss, u_ss, dx=dx, du=du)
     c_out = identity(len(x_ss))
     d_out = zeros((len(x_ss), len(u_ss)))
-    return a_out, b_out, c_out, d_out
+    return a, b, c_out, d_out
+
+
+def eom_jacobians(aircraft, x_0, u_0, m, j, x_cols, u_cols, dx=None, du=None):
+    """return central difference jacobians of the state derivative wrt x_cols and u_cols."""
+    x_0 = asarray(x_0, dtype=float).reshape(-1)
+    u_0 = asarray(u_0, dtype=float).reshape(-1)
+    x_cols = list(x_cols)
+    u_cols = list(u_cols)
+    h_x = _steps(x_0[x_cols], dx)
+    h_u = _steps(u_0[u_cols], du)
+    n_x = len(x_cols)
+    n_u = len(u_cols)
+
+    # rows ordered [+x_cols, -x_cols, +u_cols, -u_cols]
+    x = tile(x_0, (2*(n_x + n_u), 1))
+    u = tile(u_0, (2*(n_x + n_u), 1))
+    for ii, col in enumerate(x_cols):
+        x[ii, col] = x[ii, col] + h_x[ii]
+        x[n_x + ii, col] = x[n_x + ii, col] - h_x[ii]
+    for ii, col in enumerate(u_cols):
+        u[2*n_x + ii, col] = u[2*n_x + ii, col] + h_u[ii]
+        u[2*n_x + n_u + ii, col] = u[2*n_x + n_u + ii, col] - h_u[ii]
+
+    c = c_f_m_batch(aircraft, x, u)
+    dxdt = nonlinear_eom_batch(x, m * ones(len(x)), tile(asarray(j, dtype=float), (len(x), 1, 1)), c)[:, x_cols]
+
+    a = ((dxdt[0:n_x] - dxdt[n_x:2*n_x]) / (2*h_x[:, None])).T
+    b = ((dxdt[2*n_x:2*n_x + n_u] - dxdt[2*n_x + n_u:]) / (2*h_u[:, None])).T
+    return a, b
+
+
+def _steps(x, h):
+    """return per column difference steps."""
+    if h is None:
+        return rel_step * maximum(abs(x), 1)
+    return asarray(h, dtype=float) * ones(len(x))
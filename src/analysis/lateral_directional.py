@@ -2,17 +2,18 @@ from control import damp, StateSpace
 from matplotlib import pyplot as plt
 from numpy import array, gradient, linalg, log, max, mean, min, unique, real
 from src.analysis.trim import trim_aileron_rudder_speed_nonlinear
-from common import Gravity, Atmosphere
+from common import Gravity
 from src.analysis.controls_analysis import nonlinear_eom_to_ss
 from common.rotations import body_to_wind
-from src.modeling.Aircraft import Aircraft
+from src.modeling.Aircraft import aircraft_derivatives
 from src.modeling.force_model import linear_aero, nonlinear_aero
+from src.modeling.atmosphere import speed_of_sound
 g = Gravity(0).gravity()  # f/s2
 
 
 def directional_stability(plane, mach, alpha):
     """return airplane static directional stability."""
-    c_n_b = Aircraft(plane, mach).c_n_beta(alpha)
+    c_n_b = aircraft_derivatives(plane, mach).c_n_beta(alpha)
     return c_n_b
 
 
@@ -24,7 +25,7 @@ def dutch_roll_mode(aircraft, x_0, u_0):
 
 def lateral_stability(plane, mach, alpha):
     """return airplane static lateral stability."""
-    c_r_b = Aircraft(plane, mach).c_r_beta(alpha)
+    c_r_b = aircraft_derivatives(plane, mach).c_r_beta(alpha)
     return c_r_b
 
 
@@ -32,7 +33,7 @@ def latdir_stability_nonlinear(plane, mach, altitude, alpha, de, delta=0.01):
     """return lateral directional stability derivatives using nonlinear model."""
     u = [0, de, 0, 0.01]
     betas = array([-delta, 0, delta])
-    a = Atmosphere(altitude).speed_of_sound()
+    a = speed_of_sound(altitude)
     v = a * mach
     cmr = []
     cmy = []
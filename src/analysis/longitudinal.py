@@ -1,16 +1,22 @@
 from control import damp, StateSpace
 from matplotlib import pyplot as plt
-from numpy import append, array, cos, deg2rad, flip, floor, gradient, linspace, log, max, mean, min, unique, pi, sin, \
-    sort, sqrt, sum, zeros
+from numpy import append, array, asarray, concatenate, cos, deg2rad, flip, full, gradient, linspace, log, max, mean, \
+    min, nan, ones, unique, pi, sin, sort, sqrt, sum, tile, zeros
 from scipy.interpolate import InterpolatedUnivariateSpline
-from src.analysis.trim import trim_alpha_de_nonlinear, trim_alpha_de_throttle, trim_vr, trim_vs, trim_vs_nonlinear
-from common import Atmosphere, Gravity
+from scipy.optimize import brentq
+from src.analysis.trim import continuation_guess, trim_alpha_de_nonlinear, trim_alpha_de_throttle, trim_continuation, \
+    trim_vr, trim_vs, trim_vs_nonlinear
+from common import Gravity
 from common.equations_of_motion import nonlinear_eom
-from common.report_tools import load_aero_model, model_exists
 from common.tools import uvw
 from src.analysis.controls_analysis import nonlinear_eom_to_ss
-from src.modeling.Aircraft import Aircraft
-from src.modeling.force_model import c_f_m, landing_gear_loads, linear_aero, nonlinear_aero
+from src.analysis.simulation import integrate
+from src.modeling.aero_store import load_model
+from src.modeling.Aircraft import aircraft_derivatives
+from src.modeling.FlightCondition import FlightCondition
+from src.modeling.force_model import c_f_m, c_f_m_batch, landing_gear_loads, landing_gear_loads_batch, linear_aero, \
+    nonlinear_aero, nonlinear_eom_batch
+from src.modeling.atmosphere import air_properties, speed_of_sound
 g = Gravity(0).gravity()  # f/s2
 
 
@@ -33,101 +39,61 @@ def aircraft_range(aircraft, x, u):
     return r
 
 
-def balanced_field_length(aircraft, x_0, u_0, rotate_margin=1, h_f=35):
-    """return balanced field length."""
-    """return v_1, v_r, v_2, v_lof."""
+def balanced_field_length(aircraft, x_0, u_0, rotate_margin=1, h_f=35, rtol=1e-4, full_output=False):
+    """return v_rotate, v_1, v_2 and v_lof, full_output adds the go and stop histories and field length."""
+    x_0 = array(x_0, dtype=float)
+    u_0 = array(u_0, dtype=float)
     alt_f = x_0[-1] + h_f
     u_0[1] = aircraft['horizontal']['control_1']['limits'][0] * pi / 180
     v_unstick = trim_vr(aircraft, x_0[-1], u_0)
     v_lof = trim_vs(aircraft, x_0[-1], 0)
     v_rotate = 1.15 * max([v_lof, v_unstick])
     u_0[1] = 0.0
-    dt = 0.01
-    v = []
-    s = []
-    h = []
-    pitch = []
-    de = []
-    x = x_0
-    t = 0
-    t_out = []
-    p = zeros(len(x_0))
-    while x[0] < v_rotate:
-        dxdt = takeoff_ground_roll(aircraft, x, u_0)
-        p = p + x*dt + 0.5*dxdt*dt**2
-        x = x + dxdt * dt
-        v.append(x[0])
-        s.append(p[0])
-        h.append(x[-1])
-        pitch.append(x[4]*180/pi)
-        de.append(u_0[1]*180/pi)
-        t = t + dt
-        t_out.append(t)
-    x_rto = x
-
-    while pitch[-1] < aircraft['wing']['alpha_stall'] - rotate_margin:
-        u_0[1] = aircraft['horizontal']['control_1']['limits'][0]
-        dxdt = takeoff_ground_roll(aircraft, x, u_0)
-        p = p + x * dt + 0.5 * dxdt * dt ** 2
-        x = x + dxdt * dt
-        v.append(x[0])
-        s.append(p[0])
-        h.append(x[-1])
-        pitch.append(x[4] * 180 / pi)
-        de.append(u_0[1] * 180 / pi)
-        t = t + dt
-        t_out.append(t)
-
-    out = trim_alpha_de_throttle(aircraft, v[-1], h[-1], 5)
-    v_2 = v[-1]
+
+    # ground roll to v_rotate, state is augmented with the distance covered, short steps resolve the go curve
+    t_1, z_1, n_1 = _takeoff_phase(aircraft, append(x_0, 0), u_0, lambda t, z: z[0] - v_rotate, rtol, max_step=1)
+    x_rto = z_1[-1, 0:12].copy()
+
+    # rotation at full nose up elevator to the pitch target
+    u_0[1] = aircraft['horizontal']['control_1']['limits'][0]
+    pitch_target = deg2rad(aircraft['wing']['alpha_stall'] - rotate_margin)
+    t_2, z_2, n_2 = _takeoff_phase(aircraft, z_1[-1], u_0, lambda t, z: z[4] - pitch_target, rtol)
+
+    # climb out on the 5 deg climb trim to screen height
+    out = trim_alpha_de_throttle(aircraft, z_2[-1, 0], z_2[-1, 11], 5)
+    v_2 = z_2[-1, 0]
     u_0[1] = out[1] * pi / 180
     u_0[3] = out[2]
-    while h[-1] < alt_f:
-        dxdt = takeoff_ground_roll(aircraft, x, u_0)
-        p = p + x * dt + 0.5 * dxdt * dt ** 2
-        x = x + dxdt * dt
-        v.append(x[0])
-        s.append(p[0])
-        h.append(x[-1])
-        pitch.append(x[4] * 180 / pi)
-        de.append(u_0[1] * 180 / pi)
-        t = t + dt
-        t_out.append(t)
+    t_3, z_3, n_3 = _takeoff_phase(aircraft, z_2[-1], u_0, lambda t, z: z[11] - alt_f, rtol)
+    z = concatenate((z_1, z_2[1:], z_3[1:]))
+    t = concatenate((t_1, t_1[-1] + t_2[1:], t_1[-1] + t_2[-1] + t_3[1:]))
+    de_rotate = aircraft['horizontal']['control_1']['limits'][0] * 180 / pi
+    de = concatenate((zeros(len(t_1)), full(len(t_2) - 1, de_rotate), full(len(t_3) - 1, out[1])))
+    s_f = z[-1, 12]
+
     u_rto = u_0
     u_rto[-1] = 0.001
-    v_rto, s_rto = rejected_takeoff(aircraft, s[-1], x_rto, u_rto)
-    f_rto_i = InterpolatedUnivariateSpline(s_rto[0:int(floor(len(s) * 0.7))],
-                                           v_rto[0:int(floor(len(s) * 0.7))])
-    v_rto_i = f_rto_i(array(s[0:int(floor(len(s) * 0.7))]))
-    f_1 = InterpolatedUnivariateSpline(v[0:int(floor(len(s) * 0.7))] - v_rto_i, v[0:int(floor(len(s) * 0.7))])
-    v_1 = f_1(0)
+    v_rto, s_rto = rejected_takeoff(aircraft, s_f, x_rto, u_rto)
+    v_1 = decision_speed(z_1[:, 0], z_1[:, 12], v_rto, s_rto)
+    if not full_output:
+        return v_rotate, v_1, v_2, v_lof
+    return v_rotate, v_1, v_2, v_lof, {'t': t, 'x': z[:, 0:12], 's': z[:, 12], 'de': de, 'bfl': s_f,
+                                       'v_rto': v_rto, 's_rto': s_rto, 'n_fev': n_1 + n_2 + n_3 + 1}
 
-    plt.plot(s_rto, v_rto)
-    plt.xlim([0, 5000])
-    plt.ylim([0, 400])
 
-    plt.figure(figsize=(10, 8))
-    plt.subplot(3, 1, 1)
-    plt.plot(s, v)
-    plt.plot(s_rto, v_rto, 'r')
-    plt.ylabel('v [ft/s]')
-    plt.ylim((0, max(v) + 20))
-    plt.xlim((0, s[-1] + 10))
-    plt.grid(True)
-    plt.subplot(3, 1, 2)
-    plt.plot(s, h)
-    plt.ylabel('h [ft]')
-    plt.xlim((0, s[-1] + 10))
-    plt.grid(True)
-    plt.subplot(3, 1, 3)
-    plt.plot(s, pitch, label='pitch')
-    plt.plot(s, de, label='elevator')
-    plt.legend()
-    plt.ylabel('angles [deg]')
-    plt.xlabel('distance [ft]')
-    plt.xlim((0, s[-1] + 10))
-    plt.grid(True)
-    return v_rotate, v_1, v_2, v_lof
+def decision_speed(v_go, s_go, v_stop, s_stop):
+    """return v_1 [ft/s] where the accelerate go curve meets the accelerate stop curve, nan if none."""
+    go = InterpolatedUnivariateSpline(v_go, s_go)
+    stop = InterpolatedUnivariateSpline(flip(v_stop), flip(s_stop))
+
+    def margin(v):
+        return float(go(v) - stop(v))
+
+    if margin(v_go[-1]) <= 0:
+        return v_go[-1]
+    if margin(v_go[0]) > 0:
+        return nan
+    return brentq(margin, v_go[0], v_go[-1])
 
 
 def long_modes(aircraft, x_0, u_0):
@@ -146,20 +112,23 @@ def long_modes(aircraft, x_0, u_0):
 
 
 def l_d_analysis(plane):
-    if model_exists(plane['name']):
-        plane['aero_model'] = load_aero_model(plane['name'])
+    model = load_model(plane['name'])
+    if model is not None:
+        plane['aero_model'] = model
 
     cg = plane['weight']['cg'][0] * array([1, 1.03, 1.06, 1.09, 1.12, 1.15, 1.18, 1.21])
     altitude = 15000
     speed = 300
-    a = Atmosphere(15000).speed_of_sound()
+    a = speed_of_sound(15000)
     l_d = []
     de = []
     aoa = []
     sm = []
-    for ii in cg:
-        plane['weight']['cg'][0] = ii
-        c = trim_alpha_de_nonlinear(plane, speed, altitude, 0)
+    c_prev = []
+    for ii in range(0, len(cg)):
+        plane['weight']['cg'][0] = cg[ii]
+        c = trim_alpha_de_nonlinear(plane, speed, altitude, 0, x0=continuation_guess(cg[ii], cg[0:ii], c_prev))
+        c_prev.append(c)
         v = uvw(speed, c[0], 0)
         cfm = nonlinear_aero(plane, [v[0], v[1], v[2], 0, deg2rad(c[0]), 0, 0, 0, 0, 0, 0, altitude], [0, deg2rad(c[1]), 0, 0])
         de.append(c[1])
@@ -171,8 +140,9 @@ def l_d_analysis(plane):
 
 def l_over_d(aircraft, mach, altitude):
     """calculate specific excess power"""
-    c_d_0 = Aircraft(aircraft, mach).c_d_zero(altitude)
-    c_l_a = Aircraft(aircraft, mach).c_l_alpha()
+    ac = aircraft_derivatives(aircraft, mach)
+    c_d_0 = ac.c_d_zero(altitude)
+    c_l_a = ac.c_l_alpha()
     ar = aircraft['wing']['aspect_ratio']
     l_d = 1 / 2 * (((c_l_a / 2) * ar) / c_d_0) ** 0.5
     return l_d
@@ -180,7 +150,7 @@ def l_over_d(aircraft, mach, altitude):
 
 def maneuvering(aircraft, mach, altitude, n_z):
     """return trim parameters for given n_z vector."""
-    v = Atmosphere(altitude).speed_of_sound() * mach
+    v = speed_of_sound(altitude) * mach
     alpha_out = []
     de_out = []
     for ni in n_z:
@@ -192,7 +162,7 @@ def maneuvering(aircraft, mach, altitude, n_z):
 
 def maneuvering_envelope(plane, requirements, altitude):
     """return V-n diagram for given altitude."""
-    a = Atmosphere(altitude).speed_of_sound()
+    a = speed_of_sound(altitude)
     v_max = requirements['flight_envelope']['mach'][1] * a
     alpha_plus = plane['wing']['alpha_stall']
     alpha_minus = - plane['wing']['alpha_stall']
@@ -200,14 +170,12 @@ def maneuvering_envelope(plane, requirements, altitude):
     nz_minus = requirements['loads']['n_z'][0]
     nz_pluss = linspace(0.1, nz_plus, 5)
     nz_minuss = linspace(nz_minus, -0.1, 5)
-    v_plus = []
-    for inz in nz_pluss:
-        c = trim_vs_nonlinear(plane, altitude, alpha_plus, 0, n=inz)
-        v_plus.append(c[1])
-    v_minus = []
-    for inz in nz_minuss:
-        c = trim_vs_nonlinear(plane, altitude, alpha_minus, 0, n=inz)
-        v_minus.append(c[1])
+    c_plus = trim_continuation(lambda inz, x0: trim_vs_nonlinear(plane, altitude, alpha_plus, 0, n=inz, x0=x0),
+                               nz_pluss)
+    v_plus = [c[1] for c in c_plus]
+    c_minus = trim_continuation(lambda inz, x0: trim_vs_nonlinear(plane, altitude, alpha_minus, 0, n=inz, x0=x0),
+                                nz_minuss)
+    v_minus = [c[1] for c in c_minus]
     va_plus = v_plus[-1]
     va_minus = v_minus[0]
     v_plus.append(0)
@@ -229,12 +197,11 @@ def maneuvering_envelope(plane, requirements, altitude):
 
 def n_per_alpha(aircraft, x_0):
     """return acceleration sensitivity."""
-    rho = Atmosphere(x_0[-1]).air_density()  # [slug/ft3]
-    a = Atmosphere(x_0[-1]).speed_of_sound()  # [ft/s]
+    rho, a = air_properties(x_0[-1])  # [slug/ft3], [ft/s]
     v = sqrt(sum(x_0[0:3]**2))  # [ft/s]
     q_bar = 0.5*rho*v**2  # [psf]
     s = aircraft['wing']['planform']  # [ft2]
-    cla = Aircraft(aircraft, v / a).c_l_alpha()  # [1/rad]
+    cla = aircraft_derivatives(aircraft, v / a).c_l_alpha()  # [1/rad]
     n_a = cla*s*q_bar/aircraft['weight']['weight']  # [g/rad]
     return n_a
 
@@ -245,6 +212,33 @@ def phugoid_mode(aircraft, x_0, u_0):
     return wn_ph, zeta_ph
 
 
+def plot_balanced_field_length(out):
+    """plot takeoff histories returned by balanced_field_length with full_output."""
+    s = out['s']
+    v = out['x'][:, 0]
+    plt.figure(figsize=(10, 8))
+    plt.subplot(3, 1, 1)
+    plt.plot(s, v)
+    plt.plot(out['s_rto'], out['v_rto'], 'r')
+    plt.ylabel('v [ft/s]')
+    plt.ylim((0, max(v) + 20))
+    plt.xlim((0, s[-1] + 10))
+    plt.grid(True)
+    plt.subplot(3, 1, 2)
+    plt.plot(s, out['x'][:, 11])
+    plt.ylabel('h [ft]')
+    plt.xlim((0, s[-1] + 10))
+    plt.grid(True)
+    plt.subplot(3, 1, 3)
+    plt.plot(s, out['x'][:, 4] * 180 / pi, label='pitch')
+    plt.plot(s, out['de'], label='elevator')
+    plt.legend()
+    plt.ylabel('angles [deg]')
+    plt.xlabel('distance [ft]')
+    plt.xlim((0, s[-1] + 10))
+    plt.grid(True)
+
+
 def plot_sp():
     """short-period requirement patches."""
     x_lvl_1 = [0.35, 1.3, 1.3, 0.35, 0.35]
@@ -263,21 +257,20 @@ def plot_sp():
     plt.yscale("log")
 
 
-def rejected_takeoff(aircraft, s_f, x_0, u_0, v_max=350):
-    """return derivatives for aircraft on ground."""
-    v = linspace(5, v_max, 100)
+def rejected_takeoff(aircraft, s_f, x_0, u_0, v_max=350, n=100):
+    """return speeds descending from v_max and the distances at which braking from them stops at s_f [ft]."""
+    v = linspace(5, v_max, n)
     m = aircraft['weight']['weight']/g
     j = aircraft['weight']['inertia']
-    x = []
-    for vi in v:
-        x_0[0] = 0.707 * vi
-        c = c_f_m(aircraft, x_0, u_0)
-        c_t, c_g, normal_loads = landing_gear_loads(aircraft, x_0, c, True, brake=1)
-        dxdt = nonlinear_eom(x_0, m, j, c_t)
-        x.append(s_f + (vi ** 2) / (2 * dxdt[0]))
-    v = flip(v)
-    x = flip(x)
-    return v, x
+    x = tile(asarray(x_0, dtype=float), (n, 1))
+    x[:, 0] = 0.707 * v
+    u = tile(asarray(u_0, dtype=float), (n, 1))
+    fc = FlightCondition(x)
+    c = c_f_m_batch(aircraft, x, u, fc=fc)
+    c_t, c_g, normal_loads = landing_gear_loads_batch(aircraft, x, c, True, brake=1, fc=fc)
+    dxdt = nonlinear_eom_batch(x, m * ones(n), tile(array(j, dtype=float), (n, 1, 1)), c_t)
+    s = s_f + (v ** 2) / (2 * dxdt[:, 0])
+    return flip(v), flip(s)
 
 
 def short_period_mode(aircraft, x_0, u_0):
@@ -299,8 +292,9 @@ def specific_excess_power(aircraft, x, u):
 
 def static_margin(plane, mach):
     """return longitudinal static margin."""
-    c_m_a = Aircraft(plane, mach).c_m_alpha()
-    c_l_a = Aircraft(plane, mach).c_l_alpha()
+    ac = aircraft_derivatives(plane, mach)
+    c_m_a = ac.c_m_alpha()
+    c_l_a = ac.c_l_alpha()
     sm = -c_m_a / c_l_a * 100
     return sm
 
@@ -309,7 +303,7 @@ def static_margin_nonlinear(plane, mach, altitude, alpha, de, delta=0.01):
     """return longitudinal static margin using nonlinear model."""
     u = [0, de, 0, 0.01]
     alphas = alpha + array([-delta, 0, delta])
-    a = Atmosphere(altitude).speed_of_sound()
+    a = speed_of_sound(altitude)
     v = a * mach
     cl = []
     cm = []
@@ -330,7 +324,25 @@ def takeoff_ground_roll(aircraft, x_0, u_0):
     """return derivatives for aircraft on ground."""
     m = aircraft['weight']['weight']/g
     j = aircraft['weight']['inertia']
-    c = c_f_m(aircraft, x_0, u_0)
-    c_t, c_g, normal_loads = landing_gear_loads(aircraft, x_0, c, True)
+    fc = FlightCondition(x_0)
+    c = c_f_m(aircraft, x_0, u_0, fc=fc)
+    c_t, c_g, normal_loads = landing_gear_loads(aircraft, x_0, c, True, fc=fc)
     dxdt = nonlinear_eom(x_0, m, j, c_t)
     return dxdt
+
+
+def _takeoff_phase(aircraft, z_0, u, event, rtol, max_step=None, t_max=300):
+    """integrate ground state and distance z_0 until event rises through zero, return times, states and n_fev."""
+    if event(0, z_0) >= 0:
+        return array([0.0]), z_0[None, :], 0
+
+    def f(t, z):
+        return append(takeoff_ground_roll(aircraft, z[0:12], u), z[0])
+
+    event.terminal = True
+    event.direction = 1
+    t, z, info = integrate(f, z_0, t_max, dt=0.1, method='rk45', events=[event], rtol=rtol, atol=rtol,
+                           max_step=max_step)
+    if not info['events']:
+        raise RuntimeError('takeoff phase did not reach its event within %g s' % t_max)
+    return t, z, info['n_fev']
@@ -0,0 +1,86 @@
+"""Batched Monte Carlo simulation of dispersed aircraft."""
+import time
+from numpy import array, asarray, ceil, cos, cross, ones, random, sin, stack, tile, zeros
+from common import Gravity
+from src.analysis.simulation import control_schedule, rk4_step
+from src.modeling.FlightCondition import FlightCondition
+from src.modeling.force_model import c_f_m_batch, nonlinear_eom_batch
+g = Gravity(0).gravity()  # f/s2
+default_sigma = {'weight': 0.02, 'cg': [0.5, 0, 0.1], 'inertia': 0.05, 'aero': 0.05, 'gust': [5, 5, 5]}
+
+
+def sample_dispersions(aircraft, n, sigma=None, seed=None):
+    """return n normally dispersed members of aircraft, sigma entries override default_sigma."""
+    sigma = dict(default_sigma, **({} if sigma is None else sigma))
+    rng = random.default_rng(seed)
+    return {'weight': aircraft['weight']['weight'] * (1 + sigma['weight'] * rng.standard_normal(n)),
+            'cg': array(aircraft['weight']['cg'], dtype=float) + asarray(sigma['cg']) * rng.standard_normal((n, 3)),
+            'inertia': (array(aircraft['weight']['inertia'], dtype=float) *
+                        (1 + sigma['inertia'] * rng.standard_normal(n))[:, None, None]),
+            'aero_scale': 1 + sigma['aero'] * rng.standard_normal((n, 6)),
+            'gust': asarray(sigma['gust']) * rng.standard_normal((n, 3))}
+
+
+def nominal_members(aircraft, n):
+    """return n undispersed members of aircraft, same layout as sample_dispersions."""
+    return {'weight': aircraft['weight']['weight'] * ones(n),
+            'cg': tile(array(aircraft['weight']['cg'], dtype=float), (n, 1)),
+            'inertia': tile(array(aircraft['weight']['inertia'], dtype=float), (n, 1, 1)),
+            'aero_scale': ones((n, 6)),
+            'gust': zeros((n, 3))}
+
+
+def dispersed_c_f_m(aircraft, x, u, members, engine_out=False):
+    """return (n, 6) body axis forces and moments of the members at states x and controls u."""
+    x = asarray(x, dtype=float)
+    x_air = x.copy()
+    x_air[:, 0:3] = x[:, 0:3] - members['gust']
+    c = c_f_m_batch(aircraft, x_air, u, engine_out, fc=FlightCondition(x_air), aero_scale=members['aero_scale'],
+                    weight=members['weight'])
+    # weight acts at each member cg, only aero and thrust forces transfer moment
+    w = members['weight'][:, None] * stack((-sin(x[:, 4]), cos(x[:, 4]) * sin(x[:, 3]), cos(x[:, 4]) * cos(x[:, 3])),
+                                           axis=-1)
+    d = (members['cg'] - array(aircraft['weight']['cg'], dtype=float)) * array([1, -1, 1])
+    c[:, 3:6] = c[:, 3:6] + cross(d, c[:, 0:3] - w)
+    return c
+
+
+def monte_carlo(aircraft, x_0, u, t_final, members, dt=0.02, engine_out=False, callback=None, keep_states=False):
+    """integrate all members through the same maneuver, return times, state statistics and diagnostics."""
+    # u is as in simulate, callback(t, x) sees every step, keep_states adds the member states to the diagnostics
+    wall_0 = time.perf_counter()
+    n = len(members['weight'])
+    m = members['weight'] / g  # slug
+    j = members['inertia']
+    control = control_schedule(u)
+
+    def f(t, x):
+        u_t = asarray(control(t, x), dtype=float) * ones((n, 1))
+        return nonlinear_eom_batch(x, m, j, dispersed_c_f_m(aircraft, x, u_t, members, engine_out))
+
+    n_t = int(ceil(t_final / dt)) + 1
+    t_out = zeros(n_t)
+    statistics = {key: zeros((n_t, 12)) for key in ['mean', 'std', 'min', 'max']}
+    states = zeros((n_t, n, 12)) if keep_states else None
+    x = asarray(x_0, dtype=float) * ones((n, 1))
+    f_x = f(0.0, x)
+    info = {'n_fev': 1, 'real_time_factor': None}
+    for ii in range(0, n_t):
+        if ii > 0:
+            h = min(dt, t_final - t_out[ii - 1])
+            x, f_x, n_fev = rk4_step(f, t_out[ii - 1], x, f_x, h)
+            t_out[ii] = t_out[ii - 1] + h
+            info['n_fev'] = info['n_fev'] + n_fev
+        # statistics are streamed per step, member histories are only kept on request
+        statistics['mean'][ii] = x.mean(axis=0)
+        statistics['std'][ii] = x.std(axis=0)
+        statistics['min'][ii] = x.min(axis=0)
+        statistics['max'][ii] = x.max(axis=0)
+        if keep_states:
+            states[ii] = x
+        if callback is not None:
+            callback(t_out[ii], x)
+    info['real_time_factor'] = t_final / max(time.perf_counter() - wall_0, 1e-12)
+    if keep_states:
+        info['states'] = states
+    return t_out, statistics, info
@@ -1,109 +1,148 @@
-# """real time state-space simulator attempt, try building code in azure."""
-# from src.airplanes.example.plane import plane
-# from common import Gravity
-# from control import StateSpace
-# from common.equations_of_motion import nonlinear_eom_to_ss
-# from src.analysis.trim import trim_alpha_de
-# import matplotlib.pyplot as plt
-# from numpy import array, zeros, deg2rad, cos, sin, pi
-# import pygame
-# import time
-#
-# k_pitch = 0.2
-# k_roll = 0.1
-#
-# aircraft = plane
-# altitude = 30000  # ft
-# g = Gravity(altitude).gravity()  # f/s2
-# v = 500  # ft/s
-# dt = 0.01  # s
-# throttle = 1
-# trim_out = trim_alpha_de(aircraft, v, altitude, 0)
-# aoa = deg2rad(trim_out[0])  # rad
-# u = v*cos(aoa)  # ft/s
-# w = v*sin(aoa)  # ft/s
-# de = deg2rad(trim_out[1])  # rad
-# n_axis = 1
-# j = aircraft['weight']['inertia']
-# m = aircraft['weight']['weight']/g  # slug
-# cg = aircraft['weight']['cg']
-# x = array([float(u), 0, float(w), 0, float(aoa), 0, 0, 0, 0, 0, 0, altitude])
-# # x = [u v w phi theta psi p q r p_n p_e h]
-# x_ss = [0, 1, 2, 3, 4, 5, 6, 7, 8]
-# a, b, c, d = nonlinear_eom_to_ss(aircraft, x_ss, [0, 1, 2], x, array([0, float(de), 0, throttle]), m, j)
-#
-# sys = StateSpace(a, b, c, d)
-# sys.A = array(sys.A)
-# sys.B = array(sys.B)
-# sys.C = array(sys.C)
-# sys.D = array(sys.D)
-# pygame.init()
-# # Loop until the user clicks the close button.
-# done = False
-#
-# # Initialize the joysticks.
-# pygame.joystick.init()
-#
-# # -------- Main Program Loop -----------
-# in_tf = []
-# t = []
-# theta = []
-# phi = []
-# pitch_command = []
-# roll_command = []
-# u = []
-# axis = [0, 0]
-# x = zeros((sys.A.shape[0], 1))
-# t_0 = time.time()
-# # plt.style.use('fivethirtyeight')
-# joystick = pygame.joystick.Joystick(0)
-# joystick.init()
-# plt.figure(figsize=(8, 7))
-#
-# while not done:
-#     t.append(time.time() - t_0)
-#     for event in pygame.event.get():  # User did something.
-#         if event.type == pygame.QUIT:  # If user clicked close.
-#             done = True  # Flag that we are done so we exit this loop.
-#         elif event.type == pygame.JOYBUTTONDOWN:
-#             print("Joystick button pressed.")
-#         elif event.type == pygame.JOYBUTTONUP:
-#             print("Joystick button released.")
-#
-#     axis[0] = joystick.get_axis(0)
-#     axis[1] = joystick.get_axis(1)
-#     pitch_command.append(-axis[1] * k_pitch)
-#     roll_command.append(axis[0] * k_roll)
-#
-#     if len(t) == 1:
-#         theta.append(0)
-#         phi.append(0)
-#     else:
-#         u = array([[roll_command[-1]], [pitch_command[-1]], [0]])
-#         dxdt = sys.A @ x + sys.B @ u
-#         dt = t[-1] - t[-2]
-#         x = x + dxdt * dt
-#         y = sys.C @ x + sys.D @ u
-#         theta.append(x[4]*180/pi)
-#         phi.append(x[3]*180/pi)
-#
-#     plt.subplot(2, 1, 1)
-#     plt.title('Blue=Pitch, Red=Roll')
-#     plt.plot(t, theta, 'b')
-#     plt.plot(t, phi, 'r')
-#     plt.plot([0, 500], [5, 5], 'g--', linewidth=1)
-#     plt.plot([0, 500], [7, 7], 'g--', linewidth=1)
-#     plt.ylim((-15, 15))
-#     plt.xlim((t[-1]-10, t[-1]+10))
-#     plt.ylabel('Degrees')
-#
-#     plt.subplot(2, 1, 2)
-#     plt.plot(t, pitch_command, 'b', label='pitch')
-#     plt.plot(t, roll_command, 'r', label='roll')
-#     plt.ylim((-0.5, 0.5))
-#     plt.xlim((t[-1]-10, t[-1]+10))
-#     plt.ylabel('Controls')
-#     plt.xlabel('time (sec)')
-#     plt.pause(0.000001)
-#
-# pygame.quit()
+"""Nonlinear six degree of freedom time domain simulation."""
+import time
+from numpy import abs, array, asarray, ceil, concatenate, interp, isfinite, max, maximum, sqrt, zeros
+from scipy.optimize import brentq
+from common import Gravity
+from common.equations_of_motion import nonlinear_eom
+from src.modeling.Aircraft import derivatives_key
+from src.modeling.force_model import c_f_m
+g = Gravity(0).gravity()  # f/s2
+# dormand prince 5(4) tableau
+c_dp = array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+a_dp = [array([]),
+        array([1 / 5]),
+        array([3 / 40, 9 / 40]),
+        array([44 / 45, -56 / 15, 32 / 9]),
+        array([19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729]),
+        array([9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656]),
+        array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])]
+e_dp = array([71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40])
+
+
+def simulate(aircraft, x_0, u, t_final, dt=0.01, method='rk4', events=(), rtol=1e-6, atol=1e-6, engine_out=False):
+    """return times, states, controls and diagnostics of the nonlinear equations of motion from x_0."""
+    m = aircraft['weight']['weight'] / g  # slug
+    j = aircraft['weight']['inertia']
+    control = control_schedule(u)
+    # the geometry is hashed once, every stage of every step reuses the cached derivatives
+    geometry_key = derivatives_key(aircraft)
+
+    def f(t, x):
+        return nonlinear_eom(x, m, j, c_f_m(aircraft, x, control(t, x), engine_out, geometry_key=geometry_key))
+
+    t, x, info = integrate(f, x_0, t_final, dt=dt, method=method, events=events, rtol=rtol, atol=atol)
+    u_out = array([control(t[ii], x[ii]) for ii in range(0, len(t))], dtype=float).reshape(len(t), -1)
+    return t, x, u_out, info
+
+
+def control_schedule(u):
+    """return controls u(t, x) of a callable, a (times, controls) table or constant controls."""
+    if callable(u):
+        return u
+    if isinstance(u, tuple):
+        times = asarray(u[0], dtype=float)
+        table = asarray(u[1], dtype=float)
+        return lambda t, x: array([interp(t, times, table[:, ii]) for ii in range(0, table.shape[1])])
+    u = asarray(u, dtype=float)
+    return lambda t, x: u
+
+
+def integrate(f, x_0, t_final, dt=0.01, method='rk4', events=(), rtol=1e-6, atol=1e-6, max_step=None):
+    """return times, states and diagnostics of dx/dt = f(t, x), method 'rk4' with fixed step dt or adaptive 'rk45'."""
+    # events e(t, x) take direction and terminal attributes as in scipy.integrate.solve_ivp
+    wall_0 = time.perf_counter()
+    x = asarray(x_0, dtype=float).reshape(-1).copy()
+    info = {'success': True, 'message': 'reached t_final', 'n_fev': 1, 'n_steps': 0, 'n_rejected': 0,
+            'events': [], 'real_time_factor': None}
+    max_step = t_final if max_step is None else max_step
+    n_out = int(ceil(t_final / dt)) + 1
+    t_out = zeros(n_out)
+    x_out = zeros((n_out, len(x)))
+    x_out[0] = x
+    n = 1
+    t = 0.0
+    f_x = asarray(f(t, x), dtype=float)
+    g_x = [e(t, x) for e in events]
+    h = min(dt, max_step)
+    while t < t_final and info['success']:
+        h = min(h, t_final - t)
+        if method == 'rk4':
+            x_new, f_new, n_fev = rk4_step(f, t, x, f_x, h)
+            error = 0
+        else:
+            x_new, f_new, n_fev, error = _dp_step(f, t, x, f_x, h, rtol, atol)
+        info['n_fev'] = info['n_fev'] + n_fev
+        if not all(isfinite(x_new)):
+            info['success'] = False
+            info['message'] = 'state diverged at t = %g s' % t
+            break
+        if error > 1:
+            info['n_rejected'] = info['n_rejected'] + 1
+            h = h * maximum(0.2, 0.9 * error ** -0.2)
+            continue
+
+        t_new = t + h
+        g_new = [e(t_new, x_new) for e in events]
+        terminal = None
+        for ii in range(0, len(events)):
+            if _crossed(events[ii], g_x[ii], g_new[ii]):
+                s = brentq(lambda s_i: events[ii](t + s_i, _hermite(x, f_x, x_new, f_new, h, s_i)), 0, h)
+                info['events'].append((ii, t + s, _hermite(x, f_x, x_new, f_new, h, s)))
+                if getattr(events[ii], 'terminal', False) and (terminal is None or s < terminal[1]):
+                    terminal = (ii, s)
+        if terminal is not None:
+            # stop at the first terminal crossing, later events of this step never happened
+            t_new = t + terminal[1]
+            x_new = _hermite(x, f_x, x_new, f_new, h, terminal[1])
+            info['events'] = [event for event in info['events'] if event[1] <= t_new]
+            info['message'] = 'terminated by event %d at t = %g s' % (terminal[0], t_new)
+        if n == len(t_out):
+            t_out = concatenate((t_out, zeros(len(t_out))))
+            x_out = concatenate((x_out, zeros(x_out.shape)))
+        t_out[n] = t_new
+        x_out[n] = x_new
+        n = n + 1
+        info['n_steps'] = info['n_steps'] + 1
+        if terminal is not None:
+            break
+        t, x, f_x, g_x = t_new, x_new, f_new, g_new
+        if method != 'rk4':
+            h = min(h * min(5, 0.9 * max([error, 1e-10]) ** -0.2), max_step)
+    info['real_time_factor'] = t_out[n - 1] / maximum(time.perf_counter() - wall_0, 1e-12)
+    return t_out[0:n], x_out[0:n], info
+
+
+def rk4_step(f, t, x, f_x, h):
+    """return classical runge kutta step, derivative at its end and evaluations."""
+    k_2 = asarray(f(t + h / 2, x + h / 2 * f_x), dtype=float)
+    k_3 = asarray(f(t + h / 2, x + h / 2 * k_2), dtype=float)
+    k_4 = asarray(f(t + h, x + h * k_3), dtype=float)
+    x_new = x + h / 6 * (f_x + 2 * k_2 + 2 * k_3 + k_4)
+    # derivative at the end starts the next step
+    return x_new, asarray(f(t + h, x_new), dtype=float), 4
+
+
+def _crossed(event, g_0, g_1):
+    """return true if event changed sign in the direction it watches."""
+    direction = getattr(event, 'direction', 0)
+    if g_0 == 0 or g_0 * g_1 > 0:
+        return False
+    return direction == 0 or (direction > 0 and g_1 > g_0) or (direction < 0 and g_1 < g_0)
+
+
+def _dp_step(f, t, x, f_x, h, rtol, atol):
+    """return dormand prince step, derivative at its end, evaluations and scaled error norm."""
+    k = [f_x]
+    for ii in range(1, 7):
+        k.append(asarray(f(t + c_dp[ii] * h, x + h * sum([a * k_i for a, k_i in zip(a_dp[ii], k)])), dtype=float))
+    x_new = x + h * sum([a * k_i for a, k_i in zip(a_dp[6], k)])
+    error = h * sum([e * k_i for e, k_i in zip(e_dp, k)])
+    scale = atol + rtol * maximum(abs(x), abs(x_new))
+    return x_new, k[6], 6, sqrt(sum((error / scale) ** 2) / len(x))
+
+
+def _hermite(x_0, f_0, x_1, f_1, h, s):
+    """return cubic hermite interpolated state s seconds into a step of length h."""
+    tau = s / h
+    return ((2 * tau ** 3 - 3 * tau ** 2 + 1) * x_0 + (tau ** 3 - 2 * tau ** 2 + tau) * h * f_0 +
+            (-2 * tau ** 3 + 3 * tau ** 2) * x_1 + (tau ** 3 - tau ** 2) * h * f_1)
@@ -0,0 +1,101 @@
+"""Takeoff performance tables over gross weight, field elevation and temperature."""
+from concurrent.futures import ProcessPoolExecutor
+from os import makedirs, path
+from numpy import array, asarray, full, load, nan, savez_compressed, stack
+from src.analysis.longitudinal import balanced_field_length
+from src.analysis.trim import trim_plane_keys
+from src.modeling.atmosphere import density_altitude
+from src.modeling.cache import fingerprint, LruCache
+from src.modeling.GriddedTable import GriddedTable
+table_root = path.join(path.expanduser('~'), '.cache', 'aero_mdo', 'takeoff')
+takeoff_keys = ['bfl', 'v_1', 'v_r', 'v_2', 'v_lof']
+takeoff_cache = LruCache(maxsize=4096)
+
+
+def takeoff_point(aircraft, weight, elevation, temperature):
+    """return bfl [ft], v_1, v_r, v_2 and v_lof [ft/s] at gross weight [lbs], field elevation [ft] and oat [F]."""
+    plane = {key: value for key, value in aircraft.items()}
+    plane['weight'] = dict(aircraft['weight'], weight=float(weight))
+    key = takeoff_key(aircraft, weight, elevation, temperature)
+    value = takeoff_cache.get(key)
+    if value is None:
+        x_0 = array([0.01, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, density_altitude(float(elevation), float(temperature))])
+        u_0 = array([0.0, 0.0, 0.0, 1])
+        try:
+            v_r, v_1, v_2, v_lof, out = balanced_field_length(plane, x_0, u_0, full_output=True)
+            value = array([out['bfl'], v_1, v_r, v_2, v_lof], dtype=float)
+        except (RuntimeError, ValueError):
+            value = full(len(takeoff_keys), nan)
+        takeoff_cache.put(key, value)
+    return value
+
+
+def takeoff_grid(aircraft):
+    """return default gross weights [lbs], field elevations [ft] and temperatures [F] of an aircraft table."""
+    weight = aircraft['weight']['weight']
+    return [0.8 * weight, 0.9 * weight, weight], [0, 2500, 5000, 7500], [0, 59, 100]
+
+
+def takeoff_key(aircraft, weight, elevation, temperature):
+    """return takeoff_cache key of a table point, the plane subtrees the trims depend on and the field condition."""
+    plane = {key: aircraft[key] for key in trim_plane_keys if key in aircraft}
+    plane['weight'] = dict(aircraft['weight'], weight=float(weight))
+    return fingerprint([plane, float(elevation), float(temperature)])
+
+
+def takeoff_table(aircraft, weights, elevations, temperatures, n_workers=None, store=None):
+    """return takeoff table, a dict of the axes and (n_weight, n_elevation, n_temperature) arrays of takeoff_keys."""
+    # store is an optional directory of point results shared by the workers
+    jobs = [(aircraft, weight, elevation, temperature, store)
+            for weight in weights for elevation in elevations for temperature in temperatures]
+    if n_workers == 1 or len(jobs) == 1:
+        values = list(map(_takeoff_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            values = list(pool.map(_takeoff_job, jobs))
+    values = array(values).reshape(len(weights), len(elevations), len(temperatures), len(takeoff_keys))
+    table = {'name': aircraft['name'], 'weight': asarray(weights, dtype=float),
+             'elevation': asarray(elevations, dtype=float), 'temperature': asarray(temperatures, dtype=float)}
+    for ii, key in enumerate(takeoff_keys):
+        table[key] = values[..., ii]
+    return table
+
+
+def takeoff_table_file(name):
+    """return default table file of plane name."""
+    return path.join(table_root, '%s.npz' % name)
+
+
+def save_takeoff_table(table, file=None):
+    """write table as compressed npz, by default to takeoff_table_file, return the file."""
+    file = takeoff_table_file(table['name']) if file is None else file
+    makedirs(path.dirname(path.abspath(file)), exist_ok=True)
+    savez_compressed(file, **table)
+    return file
+
+
+def load_takeoff_table(file):
+    """return takeoff table saved by save_takeoff_table."""
+    with load(file) as data:
+        table = {key: data[key] for key in data.files}
+    table['name'] = str(table['name'])
+    return table
+
+
+def takeoff_lookup(table):
+    """return function of weight, elevation and temperature interpolating the table, clamped to its limits."""
+    grid = GriddedTable([table['weight'], table['elevation'], table['temperature']],
+                        stack([table[key] for key in takeoff_keys]))
+
+    def lookup(weight, elevation, temperature):
+        values = grid(weight, elevation, temperature)
+        return {key: values[..., ii] for ii, key in enumerate(takeoff_keys)}
+    return lookup
+
+
+def _takeoff_job(job):
+    """process pool entry point, one table point."""
+    aircraft, weight, elevation, temperature, store = job
+    # serial tables run in the caller's process, the store must not outlive the point
+    with takeoff_cache.backed_by(store):
+        return takeoff_point(aircraft, weight, elevation, temperature)
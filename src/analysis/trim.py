@@ -1,24 +1,35 @@
 """Trim aircraft longitudinally."""
+import warnings
+from functools import wraps
 from numpy import arcsin, array, cos, deg2rad, linalg, ones, rad2deg, sin, sqrt
 from scipy.optimize import minimize, Bounds
-from common import Atmosphere
 from common import Gravity
 from common.rotations import body_to_wind
-from src.modeling.Aircraft import Aircraft
+from src.analysis.trim_solver import newton_trim, slsqp_info
+from src.modeling.Aircraft import aircraft_derivatives
+from src.modeling.cache import fingerprint, LruCache
+from src.modeling.FlightCondition import FlightCondition
 from src.modeling.force_model import c_f_m, landing_gear_loads
 from src.modeling.trapezoidal_wing import mac, span
 from src.modeling import Propulsion
+from src.modeling.atmosphere import air_density, air_properties, speed_of_sound
+trim_plane_keys = ['type', 'wing', 'horizontal', 'vertical', 'fuselage', 'weight', 'propulsion', 'landing_gear',
+                   'aero_model']
+trim_cache = LruCache(maxsize=4096)
+newton_tol = 1e-8  # default residual norm tolerance of the newton trims []
+slsqp_tol = 1e-1  # default objective tolerance of the slsqp trims []
 
 
 # Linear Trims
 def trim_aileron(aircraft, v, altitude, p):
     """trim aircraft with aileron and rudder"""
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
+    a = speed_of_sound(altitude)  # [ft/s]
     mach = v / a
+    ac = aircraft_derivatives(aircraft, mach)
     b = span(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'])
     k = b / (2 * v)
-    c_l_p = Aircraft(aircraft, mach).c_r_roll_rate()  # []
-    c_l_da = Aircraft(aircraft, mach).c_r_delta_aileron()  # []
+    c_l_p = ac.c_r_roll_rate()  # []
+    c_l_da = ac.c_r_delta_aileron()  # []
     da = - c_l_p * p * k / c_l_da
     da = rad2deg(da)
     return da
@@ -26,20 +37,21 @@ def trim_aileron(aircraft, v, altitude, p):
 
 def trim_aileron_rudder(aircraft, v, altitude, alpha, beta, p, r):
     """trim aircraft with aileron and rudder"""
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
+    a = speed_of_sound(altitude)  # [ft/s]
     mach = v / a
+    ac = aircraft_derivatives(aircraft, mach)
     b = span(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'])
     k = b / (2 * v)
-    c_l_b = Aircraft(aircraft, mach).c_r_beta(alpha)
-    c_l_p = Aircraft(aircraft, mach).c_r_roll_rate()  # []
-    c_l_r = Aircraft(aircraft, mach).c_r_yaw_rate(alpha)  # []
-    c_l_da = Aircraft(aircraft, mach).c_r_delta_aileron()  # []
-    c_l_dr = Aircraft(aircraft, mach).c_r_delta_rudder()  # []
-    c_n_b = Aircraft(aircraft, mach).c_n_beta(alpha)  # []
-    c_n_p = Aircraft(aircraft, mach).c_n_roll_rate(alpha)  # []
-    c_n_r = Aircraft(aircraft, mach).c_n_yaw_rate(alpha)  # []
-    c_n_da = Aircraft(aircraft, mach).c_n_delta_aileron()  # []
-    c_n_dr = Aircraft(aircraft, mach).c_n_delta_rudder()  # []
+    c_l_b = ac.c_r_beta(alpha)
+    c_l_p = ac.c_r_roll_rate()  # []
+    c_l_r = ac.c_r_yaw_rate(alpha)  # []
+    c_l_da = ac.c_r_delta_aileron()  # []
+    c_l_dr = ac.c_r_delta_rudder()  # []
+    c_n_b = ac.c_n_beta(alpha)  # []
+    c_n_p = ac.c_n_roll_rate(alpha)  # []
+    c_n_r = ac.c_n_yaw_rate(alpha)  # []
+    c_n_da = ac.c_n_delta_aileron()  # []
+    c_n_dr = ac.c_n_delta_rudder()  # []
     a = array([[c_l_da, c_l_dr], [c_n_da, c_n_dr]])
     b = array([[-c_l_b * beta - c_l_p * p * k - c_l_r * r * k], [-c_n_b * beta - c_n_p * p * k - c_n_r * r * k]])
     c = linalg.solve(a, b)  # [rad]
@@ -48,20 +60,20 @@ def trim_aileron_rudder(aircraft, v, altitude, alpha, beta, p, r):
 
 def trim_alpha_de(aircraft, speed, altitude, gamma, n=1):
     """trim aircraft with angle of attack and elevator"""
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
-    rho = Atmosphere(altitude).air_density()  # [slug / ft^3]
+    rho, a = air_properties(altitude)  # [slug / ft^3], [ft/s]
     mach = speed / a  # []
-    c_l_a = Aircraft(aircraft, mach).c_l_alpha()  # [1/rad]
-    c_l_de = Aircraft(aircraft, mach).c_l_delta_elevator()  # [1/rad]
-    c_m_a = Aircraft(aircraft, mach).c_m_alpha()  # [1/rad]
-    c_m_de = Aircraft(aircraft, mach).c_m_delta_elevator()  # [1/rad]
-    c_l_0 = Aircraft(aircraft, mach).c_l_zero()  # []
+    ac = aircraft_derivatives(aircraft, mach)
+    c_l_a = ac.c_l_alpha()  # [1/rad]
+    c_l_de = ac.c_l_delta_elevator()  # [1/rad]
+    c_m_a = ac.c_m_alpha()  # [1/rad]
+    c_m_de = ac.c_m_delta_elevator()  # [1/rad]
+    c_l_0 = ac.c_l_zero()  # []
     a = array([[c_l_a, c_l_de], [c_m_a, c_m_de]])
     w = aircraft['weight']['weight']*n  # [lb]
     q_bar = 0.5 * rho * speed ** 2  # [psf]
     s_w = aircraft['wing']['planform']  # [ft^2]
     c_l_1 = w * cos(deg2rad(gamma)) / (s_w * q_bar)  # []
-    c_m_0 = Aircraft(aircraft, mach).c_m_zero(altitude)
+    c_m_0 = ac.c_m_zero(altitude)
     b = array([[c_l_1 - c_l_0], [- c_m_0]])
     c = linalg.solve(a, b)  # [rad]
     return rad2deg(c)
@@ -69,15 +81,15 @@ def trim_alpha_de(aircraft, speed, altitude, gamma, n=1):
 
 def trim_alpha_de_throttle(aircraft, speed, altitude, gamma, n=1):
     """trim aircraft with angle of attack, elevator, and throttle"""
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
-    rho = Atmosphere(altitude).air_density()  # [slug / ft^3]
+    rho, a = air_properties(altitude)  # [slug / ft^3], [ft/s]
     mach = speed / a  # []
-    c_l_a = Aircraft(aircraft, mach).c_l_alpha()  # [1/rad]
-    c_l_de = Aircraft(aircraft, mach).c_l_delta_elevator()  # [1/rad]
-    c_m_a = Aircraft(aircraft, mach).c_m_alpha()  # [1/rad]
-    c_m_de = Aircraft(aircraft, mach).c_m_delta_elevator()  # [1/rad]
-    c_l_0 = Aircraft(aircraft, mach).c_l_zero()  # []
-    c_d_0 = Aircraft(aircraft, mach).c_d_zero(altitude)  # []
+    ac = aircraft_derivatives(aircraft, mach)
+    c_l_a = ac.c_l_alpha()  # [1/rad]
+    c_l_de = ac.c_l_delta_elevator()  # [1/rad]
+    c_m_a = ac.c_m_alpha()  # [1/rad]
+    c_m_de = ac.c_m_delta_elevator()  # [1/rad]
+    c_l_0 = ac.c_l_zero()  # []
+    c_d_0 = ac.c_d_zero(altitude)  # []
     w = aircraft['weight']['weight']*n  # [lb]
     q_bar = 0.5 * rho * speed ** 2  # [psf]
     s_w = aircraft['wing']['planform']  # [ft^2]
@@ -88,7 +100,7 @@ def trim_alpha_de_throttle(aircraft, speed, altitude, gamma, n=1):
     a = array([[-c_l_a, -c_l_de, 0],
                [c_m_a, c_m_de, (t[4]) / (s_w * q_bar * c_bar)],
                [-2 * c_l_1, 0, t[0] / (s_w * q_bar)]])
-    c_m_0 = Aircraft(aircraft, mach).c_m_zero(altitude)
+    c_m_0 = ac.c_m_zero(altitude)
     b = array([[-c_l_1 + c_l_0], [- c_m_0], [w * sin(deg2rad(gamma)) / (s_w * q_bar) + c_d_0]])
     c = linalg.solve(a, b)  # [rad]
     c[0:2] = rad2deg(c[0:2])
@@ -97,17 +109,18 @@ def trim_alpha_de_throttle(aircraft, speed, altitude, gamma, n=1):
 
 def trim_vs(aircraft, altitude, gamma, n=1):
     """trim aircraft with angle of attack and elevator"""
-    rho = Atmosphere(altitude).air_density()  # [slug / ft^3]
+    rho = air_density(altitude)  # [slug / ft^3]
     mach = 0.3  # [] assume moderate mach number
-    c_l_a = Aircraft(aircraft, mach).c_l_alpha()  # [1/rad]
-    c_l_de = Aircraft(aircraft, mach).c_l_delta_elevator()  # [1/rad]
-    c_m_a = Aircraft(aircraft, mach).c_m_alpha()  # [1/rad]
-    c_m_de = Aircraft(aircraft, mach).c_m_delta_elevator()  # [1/rad]
-    c_l_0 = Aircraft(aircraft, mach).c_l_zero()  # []
+    ac = aircraft_derivatives(aircraft, mach)
+    c_l_a = ac.c_l_alpha()  # [1/rad]
+    c_l_de = ac.c_l_delta_elevator()  # [1/rad]
+    c_m_a = ac.c_m_alpha()  # [1/rad]
+    c_m_de = ac.c_m_delta_elevator()  # [1/rad]
+    c_l_0 = ac.c_l_zero()  # []
     w = aircraft['weight']['weight'] * n  # [lb]
     s_w = aircraft['wing']['planform']  # [ft^2]
     a_s = deg2rad(aircraft['wing']['alpha_stall'])
-    c_m_0 = Aircraft(aircraft, mach).c_m_zero(altitude)
+    c_m_0 = ac.c_m_zero(altitude)
     a = array([[- w * cos(deg2rad(gamma)) / (0.5 * rho * s_w), c_l_de], [0, c_m_de]])
     b = array([[-c_l_0 - c_l_a * a_s], [- c_m_0 - c_m_a * a_s]])
     c = linalg.solve(a, b)  # [rad]
@@ -116,8 +129,66 @@ def trim_vs(aircraft, altitude, gamma, n=1):
 
 
 # Nonlinear trims
-def trim_aileron_nonlinear(aircraft, speed, altitude, roll_rate, tol=1e-1):
+def cached_trim(trim):
+    """memoize converged trims on the plane subtrees they depend on and the flight condition."""
+    # x0 is not keyed, full_output bypasses the cache
+    @wraps(trim)
+    def cached(aircraft, *args, **kwargs):
+        if kwargs.get('full_output'):
+            return trim(aircraft, *args, **kwargs)
+        plane = {key: aircraft[key] for key in trim_plane_keys if key in aircraft}
+        condition = {key: value for key, value in kwargs.items() if key not in ['x0', 'full_output']}
+        key = fingerprint([trim.__name__, plane, list(args), condition])
+        c = trim_cache.get(key)
+        if c is None:
+            c, info = trim(aircraft, *args, **dict(kwargs, full_output=True))
+            c = array(c, dtype=float)
+            if info['success']:
+                trim_cache.put(key, c)
+            else:
+                _warn_unconverged(info)
+        if c.ndim == 0:
+            return float(c)
+        return c.copy()
+    return cached
+
+
+def initial_guess(x0, default, n_angle):
+    """return trim starting point, x0 given in trim output units with the first n_angle entries in degrees."""
+    if x0 is None:
+        return default
+    x0 = array(x0, dtype=float).reshape(-1)
+    x0[0:n_angle] = deg2rad(x0[0:n_angle])
+    return x0
+
+
+def continuation_guess(s, s_prev, c_prev):
+    """return trim starting point at s, extrapolated from the last two converged solutions."""
+    if len(c_prev) == 0:
+        return None
+    c_1 = array(c_prev[-1], dtype=float).reshape(-1)
+    if len(c_prev) == 1 or s_prev[-1] == s_prev[-2]:
+        return c_1
+    c_2 = array(c_prev[-2], dtype=float).reshape(-1)
+    return c_1 + (c_1 - c_2) * (s - s_prev[-1]) / (s_prev[-1] - s_prev[-2])
+
+
+def trim_continuation(trim, s, x0=None):
+    """return trims along sweep parameter s, trim(s_i, x0) is seeded from previous solutions."""
+    c_out = []
+    for ii in range(0, len(s)):
+        if ii > 0:
+            x0 = continuation_guess(s[ii], s[0:ii], c_out)
+        c_out.append(trim(s[ii], x0))
+    return c_out
+
+
+@cached_trim
+def trim_aileron_nonlinear(aircraft, speed, altitude, roll_rate, tol=None, x0=None, solver='newton',
+                           full_output=False):
     """trim with aileron, nonlinear."""
+    b = span(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'])  # [ft]
+
     def obj(x):
         out = abs(x)
         return out
@@ -128,18 +199,26 @@ def trim_aileron_nonlinear(aircraft, speed, altitude, roll_rate, tol=1e-1):
         dxdt = c_f_m(aircraft, x, u)
         return sqrt(sum(dxdt ** 2)) / 1000
 
+    def residual(x):
+        u = array([x[0], 0, 0, 0.01])
+        x = array([speed, 0, 0, 0, 0, 0, roll_rate, 0, 0, 0, 0, altitude])
+        cfm = c_f_m(aircraft, x, u)
+        return array([cfm[3] / b]) / aircraft['weight']['weight']
+
     lim_ail = aircraft['wing']['control_1']['limits']
     lim = Bounds(deg2rad(lim_ail[0]), deg2rad(lim_ail[1]))
-    x0 = array([0.0])
-    u_out = minimize(obj, x0, bounds=lim, tol=tol,
-                     constraints=({'type': 'eq', 'fun': aileron}),
-                     options=({'maxiter': 200}))
-    c = rad2deg(u_out['x'])
-    return c
+    x0 = initial_guess(x0, array([0.0]), 1)
+    u_out, info = _solve(solver, obj, aileron, residual, x0, lim, tol, 200)
+    c = rad2deg(u_out)
+    return _output(c, info, full_output)
 
 
-def trim_aileron_rudder_nonlinear(aircraft, speed, altitude, alpha, beta, roll_rate, yaw_rate, tol=1e-1):
+@cached_trim
+def trim_aileron_rudder_nonlinear(aircraft, speed, altitude, alpha, beta, roll_rate, yaw_rate, tol=None, x0=None,
+                                  solver='newton', full_output=False):
     """trim with aileron and rudder, nonlinear."""
+    b = span(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'])  # [ft]
+
     def obj(x):
         out = sum(abs(x))
         return out
@@ -152,18 +231,26 @@ def trim_aileron_rudder_nonlinear(aircraft, speed, altitude, alpha, beta, roll_r
         dxdt = c_f_m(aircraft, x, u)
         return sqrt(sum(dxdt ** 2)) / 1000
 
+    def residual(x):
+        u = array([x[0], 0, x[1], 0.01])
+        b2w = body_to_wind(alpha, beta)
+        v_b = linalg.inv(b2w) @ array([speed, 0, 0])
+        x = array([v_b[0], v_b[1], v_b[2], 0, alpha, 0, roll_rate, 0, yaw_rate, 0, 0, altitude])
+        cfm = c_f_m(aircraft, x, u)
+        return array([cfm[3] / b, cfm[5] / b]) / aircraft['weight']['weight']
+
     lim_ail = aircraft['wing']['control_1']['limits']
     lim_rud = aircraft['vertical']['control_1']['limits']
     lim = ([deg2rad(lim_ail[0]), deg2rad(lim_ail[1])], [deg2rad(lim_rud[0]), deg2rad(lim_rud[1])])
-    x0 = array([0.0, 0.0])
-    u_out = minimize(obj, x0, bounds=lim, tol=tol,
-                     constraints=({'type': 'eq', 'fun': aileron_rudder}),
-                     options=({'maxiter': 200}))
-    c = rad2deg(u_out['x'])
-    return c
+    x0 = initial_guess(x0, array([0.0, 0.0]), 2)
+    u_out, info = _solve(solver, obj, aileron_rudder, residual, x0, lim, tol, 200)
+    c = rad2deg(u_out)
+    return _output(c, info, full_output)
 
 
-def trim_aileron_rudder_speed_nonlinear(aircraft, altitude, beta, roll_rate, yaw_rate, tol=1e-1):
+@cached_trim
+def trim_aileron_rudder_speed_nonlinear(aircraft, altitude, beta, roll_rate, yaw_rate, tol=1e-1, x0=None,
+                                        full_output=False):
     """trim with aileron and rudder, nonlinear."""
     def obj(x):
         out = sum(abs(x))
@@ -183,17 +270,21 @@ def trim_aileron_rudder_speed_nonlinear(aircraft, altitude, beta, roll_rate, yaw
     lim_ele = aircraft['horizontal']['control_1']['limits']
     lim = ([deg2rad(lim_ail[0]), deg2rad(lim_ail[1])], [deg2rad(lim_rud[0]), deg2rad(lim_rud[1])],
            [-5/57.3, aircraft['wing']['alpha_stall']/57.3], [deg2rad(lim_ele[0]), deg2rad(lim_ele[1])], [10, 500])
-    x0 = array([0.0, 0.0, 0.0, 0.0, 500])
+    x0 = initial_guess(x0, array([0.0, 0.0, 0.0, 0.0, 500]), 4)
     u_out = minimize(obj, x0, bounds=lim, tol=tol,
                      constraints=({'type': 'eq', 'fun': aileron_rudder_speed}),
                      options=({'maxiter': 200}))
+    info = slsqp_info(u_out, aileron_rudder_speed)
     c = u_out['x']
     c[0:4] = rad2deg(c[0:4])
-    return c
+    return _output(c, info, full_output)
 
 
-def trim_alpha_de_nonlinear(aircraft, speed, altitude, gamma, n=1, tol=1e-1):
+@cached_trim
+def trim_alpha_de_nonlinear(aircraft, speed, altitude, gamma, n=1, tol=None, x0=None, solver='newton',
+                            full_output=False):
     """trim nonlinear aircraft with angle of attack and elevator."""
+    c_bar = mac(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'], aircraft['wing']['taper'])  # [ft]
     w_in = aircraft['weight']['weight']
     aircraft['weight']['weight'] = w_in * n
 
@@ -207,18 +298,23 @@ def trim_alpha_de_nonlinear(aircraft, speed, altitude, gamma, n=1, tol=1e-1):
         cfm = c_f_m(aircraft, x, u)
         return abs(cfm[2]) + abs(cfm[4])
 
+    def residual(x):
+        u = array([0, x[1], 0, 0.01])
+        x = array([speed * cos(x[0]), 0, speed * sin(x[0]), 0, x[0] + deg2rad(gamma), 0, 0, 0, 0, 0, 0, altitude])
+        cfm = c_f_m(aircraft, x, u)
+        return array([cfm[2], cfm[4] / c_bar]) / aircraft['weight']['weight']
+
     lim_ele = aircraft['horizontal']['control_2']['limits']
     lim = ([-5/57.3, aircraft['wing']['alpha_stall']/57.3], [deg2rad(lim_ele[0]), deg2rad(lim_ele[1])])
-    x0 = array([aircraft['wing']['alpha_stall']/57.3, 0])
-    u_out = minimize(obj, x0, bounds=lim, tol=tol,
-                     constraints=({'type': 'eq', 'fun': alpha_stab}),
-                     options=({'maxiter': 400}))
-    c = rad2deg(u_out['x'])
+    x0 = initial_guess(x0, array([aircraft['wing']['alpha_stall']/57.3, 0]), 2)
+    u_out, info = _solve(solver, obj, alpha_stab, residual, x0, lim, tol, 400)
+    c = rad2deg(u_out)
     aircraft['weight']['weight'] = w_in
-    return c
+    return _output(c, info, full_output)
 
 
-def trim_vfs(aircraft, altitude, tol=1e-1):
+@cached_trim
+def trim_vfs(aircraft, altitude, tol=1e-1, x0=None, full_output=False):
     """trim nonlinear aircraft to best rate of climb."""
     th = 1
     g = Gravity(altitude).gravity()
@@ -244,16 +340,18 @@ def trim_vfs(aircraft, altitude, tol=1e-1):
 
     lim_ele = aircraft['horizontal']['control_2']['limits']
     lim = ([-5/57.3, aircraft['wing']['alpha_stall']/57.3], [deg2rad(lim_ele[0]), deg2rad(lim_ele[1])], [0.1, 1000])
-    x0 = array([0.01, -0.01, 20])
+    x0 = initial_guess(x0, array([0.01, -0.01, 20]), 2)
     u_out = minimize(obj, x0, bounds=lim, tol=tol,
                      constraints=({'type': 'eq', 'fun': alpha_stab}),
                      options=({'maxiter': 200}))
+    info = slsqp_info(u_out, alpha_stab)
     c = u_out['x']
     c[0:2] = rad2deg(c[0:2])
-    return c
+    return _output(c, info, full_output)
 
 
-def trim_vr(aircraft, altitude, u_0, tol=1e-1):
+@cached_trim
+def trim_vr(aircraft, altitude, u_0, tol=None, x0=None, solver='newton', full_output=False):
     """return nose unstick speed."""
     def obj(x):
         out = x[0]
@@ -261,20 +359,24 @@ def trim_vr(aircraft, altitude, u_0, tol=1e-1):
 
     def v_stab(x):
         x = array([x[0], 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, altitude])
-        c = c_f_m(aircraft, x, u_0)
-        c_t, c_g, normal_loads = landing_gear_loads(aircraft, x, c)
+        fc = FlightCondition(x)
+        c = c_f_m(aircraft, x, u_0, fc=fc)
+        c_t, c_g, normal_loads = landing_gear_loads(aircraft, x, c, fc=fc)
         return float(normal_loads[0])
 
+    def residual(x):
+        return array([v_stab(x)]) / aircraft['weight']['weight']
+
     lim = Bounds(10, 500)
-    x0 = array([10])
-    u_out = minimize(obj, x0, bounds=lim, tol=tol,
-                     constraints=({'type': 'eq', 'fun': v_stab}),
-                     options=({'maxiter': 200}))
-    return float(u_out['x'])
+    x0 = initial_guess(x0, array([10]), 0)
+    u_out, info = _solve(solver, obj, v_stab, residual, x0, lim, tol, 200)
+    return _output(float(u_out[0]), info, full_output)
 
 
-def trim_vs_nonlinear(aircraft, altitude, alpha, gamma, n=1, tol=1e-1):
+@cached_trim
+def trim_vs_nonlinear(aircraft, altitude, alpha, gamma, n=1, tol=None, x0=None, solver='newton', full_output=False):
     """trim nonlinear aircraft with speed and elevator."""
+    c_bar = mac(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'], aircraft['wing']['taper'])  # [ft]
     alpha = deg2rad(alpha)
     w_in = aircraft['weight']['weight']
     aircraft['weight']['weight'] = w_in * n
@@ -289,19 +391,24 @@ def trim_vs_nonlinear(aircraft, altitude, alpha, gamma, n=1, tol=1e-1):
         cfm = c_f_m(aircraft, x_in, u)
         return abs(cfm[2]) + abs(cfm[4])
 
+    def residual(x):
+        u = array([0, x[0], 0, 0.01])
+        x_in = array([x[1] * cos(alpha), 0, x[1] * sin(alpha), 0, alpha + deg2rad(gamma), 0, 0, 0, 0, 0, 0, altitude])
+        cfm = c_f_m(aircraft, x_in, u)
+        return array([cfm[2], cfm[4] / c_bar]) / aircraft['weight']['weight']
+
     lim_ele = aircraft['horizontal']['control_2']['limits']
     lim = ([deg2rad(lim_ele[0]), deg2rad(lim_ele[1])], [10, 500])
-    x0 = array([deg2rad(lim_ele[0]), 500])
-    u_out = minimize(obj, x0, bounds=lim, tol=tol,
-                     constraints=({'type': 'eq', 'fun': v_stab}),
-                     options=({'maxiter': 500}))
-    c = u_out['x']
-    c[0] = rad2deg(u_out['x'][0])
+    x0 = initial_guess(x0, array([deg2rad(lim_ele[0]), 500]), 1)
+    u_out, info = _solve(solver, obj, v_stab, residual, x0, lim, tol, 500)
+    c = u_out
+    c[0] = rad2deg(u_out[0])
     aircraft['weight']['weight'] = w_in
-    return c
+    return _output(c, info, full_output)
 
 
-def trim_vx(aircraft, altitude, tol=1e-1):
+@cached_trim
+def trim_vx(aircraft, altitude, tol=1e-1, x0=None, full_output=False):
     """trim nonlinear aircraft to best climb angle."""
     th = 1
 
@@ -323,16 +430,18 @@ def trim_vx(aircraft, altitude, tol=1e-1):
 
     lim_ele = aircraft['horizontal']['control_2']['limits']
     lim = ([-5/57.3, aircraft['wing']['alpha_stall']/57.3], [deg2rad(lim_ele[0]), deg2rad(lim_ele[1])], [0.1, 1000])
-    x0 = array([0.01, -0.01, 100])
+    x0 = initial_guess(x0, array([0.01, -0.01, 100]), 2)
     u_out = minimize(obj, x0, bounds=lim, tol=tol,
                      constraints=({'type': 'eq', 'fun': alpha_stab}),
                      options=({'maxiter': 500}))
+    info = slsqp_info(u_out, alpha_stab)
     c = u_out['x']
     c[0:2] = rad2deg(c[0:2])
-    return c
+    return _output(c, info, full_output)
 
 
-def trim_vy(aircraft, altitude, tol=1e-1):
+@cached_trim
+def trim_vy(aircraft, altitude, tol=1e-1, x0=None, full_output=False):
     """trim nonlinear aircraft to best rate of climb."""
     th = 1
 
@@ -353,10 +462,36 @@ def trim_vy(aircraft, altitude, tol=1e-1):
 
     lim_ele = aircraft['horizontal']['control_2']['limits']
     lim = ([-5/57.3, aircraft['wing']['alpha_stall']/57.3], [deg2rad(lim_ele[0]), deg2rad(lim_ele[1])], [0.1, 1000])
-    x0 = array([0.01, -0.01, 20])
+    x0 = initial_guess(x0, array([0.01, -0.01, 20]), 2)
     u_out = minimize(obj, x0, bounds=lim, tol=tol,
                      constraints=({'type': 'eq', 'fun': alpha_stab}),
                      options=({'maxiter': 200}))
+    info = slsqp_info(u_out, alpha_stab)
     c = u_out['x']
     c[0:2] = rad2deg(c[0:2])
+    return _output(c, info, full_output)
+
+
+def _solve(solver, obj, constraint, residual, x0, lim, tol, max_iter):
+    """solve trim with newton backend on residual, or slsqp on obj subject to constraint, None tol uses its default."""
+    if solver == 'newton':
+        return newton_trim(residual, x0, bounds=lim, tol=newton_tol if tol is None else tol)
+    u_out = minimize(obj, x0, bounds=lim, tol=slsqp_tol if tol is None else tol,
+                     constraints=({'type': 'eq', 'fun': constraint}),
+                     options=({'maxiter': max_iter}))
+    return u_out['x'], slsqp_info(u_out, residual)
+
+
+def _output(c, info, full_output):
+    """return trim, with diagnostics when full_output, otherwise warn when the solver did not converge."""
+    if full_output:
+        return c, info
+    _warn_unconverged(info)
     return c
+
+
+def _warn_unconverged(info):
+    """warn when trim diagnostics report failure."""
+    if not info['success']:
+        warnings.warn('trim did not converge: %s, residual norm %g' % (info['message'], info['residual_norm']),
+                      RuntimeWarning, stacklevel=3)
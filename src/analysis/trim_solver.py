@@ -0,0 +1,100 @@
+"""Damped Newton trim solver for residual equations."""
+from numpy import abs, array, asarray, clip, diag, dot, full, inf, linalg, maximum, outer, zeros
+from scipy.optimize import Bounds
+
+
+def newton_trim(fun, x0, bounds=None, tol=1e-8, max_iter=50, step=1e-6, broyden=True):
+    """solve fun(x) = 0 with bounded levenberg-marquardt and broyden updates, return solution and diagnostics."""
+    x = asarray(x0, dtype=float).reshape(-1).copy()
+    lower, upper = trim_bounds(bounds, len(x))
+    x = clip(x, lower, upper)
+    f = asarray(fun(x), dtype=float).reshape(-1)
+    info = {'success': False, 'iterations': 0, 'residual_norm': linalg.norm(f), 'n_fev': 1, 'n_jac': 0,
+            'message': 'maximum iterations reached'}
+
+    j = _jacobian(fun, x, f, lower, upper, step, info)
+    fresh = True
+    mu = 1e-3
+    for ii in range(0, max_iter):
+        if info['residual_norm'] <= tol:
+            info['success'] = True
+            info['message'] = 'residual below tolerance'
+            break
+        info['iterations'] = ii + 1
+        a = j.T @ j
+        g = j.T @ f
+        # hold variables on a bound the gradient pushes against
+        free = ~(((x <= lower) & (g > 0)) | ((x >= upper) & (g < 0)))
+        dx = zeros(len(x))
+        a_free = a[free][:, free]
+        dx[free] = linalg.lstsq(a_free + mu * diag(maximum(diag(a_free), 1e-12)), -g[free], rcond=None)[0]
+        x_new = clip(x + dx, lower, upper)
+        s = x_new - x
+        if dot(s, s) == 0:
+            if fresh:
+                info['message'] = 'step blocked by bounds'
+                break
+            j = _jacobian(fun, x, f, lower, upper, step, info)
+            fresh = True
+            continue
+        f_new = asarray(fun(x_new), dtype=float).reshape(-1)
+        info['n_fev'] = info['n_fev'] + 1
+        norm_new = linalg.norm(f_new)
+        if norm_new < info['residual_norm']:
+            if broyden:
+                j = j + outer(f_new - f - j @ s, s) / dot(s, s)
+                fresh = False
+            else:
+                j = _jacobian(fun, x_new, f_new, lower, upper, step, info)
+            x = x_new
+            f = f_new
+            info['residual_norm'] = norm_new
+            mu = max(mu / 3, 1e-12)
+            if linalg.norm(s) <= 1e-10 * (1 + linalg.norm(x)) and norm_new > tol:
+                info['message'] = 'step below tolerance'
+                break
+        elif not fresh:
+            j = _jacobian(fun, x, f, lower, upper, step, info)
+            fresh = True
+        else:
+            mu = mu * 4
+            if mu > 1e12:
+                info['message'] = 'no descent direction, damping limit reached'
+                break
+    else:
+        if info['residual_norm'] <= tol:
+            info['success'] = True
+            info['message'] = 'residual below tolerance'
+    return x, info
+
+
+def trim_bounds(bounds, n):
+    """return lower and upper bound arrays from Bounds or a sequence of (min, max) pairs."""
+    if bounds is None:
+        return full(n, -inf), full(n, inf)
+    if isinstance(bounds, Bounds):
+        return full(n, 1.0) * bounds.lb, full(n, 1.0) * bounds.ub
+    bounds = array(bounds, dtype=float).reshape(n, 2)
+    return bounds[:, 0], bounds[:, 1]
+
+
+def slsqp_info(result, fun):
+    """return newton_trim style diagnostics for scipy minimize result, fun is the trim residual."""
+    return {'success': bool(result['success']), 'iterations': result['nit'],
+            'residual_norm': linalg.norm(fun(result['x'])), 'n_fev': result['nfev'], 'n_jac': result['njev'],
+            'message': result['message']}
+
+
+def _jacobian(fun, x, f, lower, upper, step, info):
+    """forward difference jacobian, steps reversed at upper bounds."""
+    j = zeros((len(f), len(x)))
+    for ii in range(0, len(x)):
+        h = step * max(1.0, abs(x[ii]))
+        if x[ii] + h > upper[ii]:
+            h = -h
+        x_h = x.copy()
+        x_h[ii] = x_h[ii] + h
+        j[:, ii] = (asarray(fun(x_h), dtype=float).reshape(-1) - f) / h
+    info['n_fev'] = info['n_fev'] + len(x)
+    info['n_jac'] = info['n_jac'] + 1
+    return j
@@ -0,0 +1,86 @@
+"""Compiled lookup of nonlinear aero model tables."""
+from copy import deepcopy
+from numpy import asarray, ndarray, stack
+from src.modeling.GriddedTable import GriddedTable
+names = ['cd', 'cy', 'cl', 'cmr', 'cmp', 'cmy']
+sweeps = {'baseline': 'alpha', 'lat_dir': 'beta', 'aileron': 'd_aileron', 'elevator': 'd_elevator',
+          'rudder': 'd_rudder', 'p': 'p', 'q': 'q', 'r': 'r'}
+n_compiled = 16
+_compiled = {}
+
+
+class AeroModel:
+    def __init__(self, model, method='linear'):
+        self.mrc = model['mrc']
+        self.tables = {sweep: sweep_table(model[sweep], key, method) for sweep, key in sweeps.items()}
+
+    def lookup(self, sweep, mach, y):
+        """return all six coefficients of sweep table, clamped to table limits, inputs may be arrays."""
+        return self.tables[sweep](mach, y)
+
+    def c_f_m(self, mach, alpha, beta, p, q, r, d_aileron, d_elevator, d_rudder):
+        """return stability axis force and moment coefficients, angles and rates in degrees, inputs may be arrays."""
+        c_0 = self.lookup('baseline', mach, 0)
+        c = (self.lookup('baseline', mach, alpha) +
+             (self.lookup('lat_dir', mach, beta) - c_0) +
+             (self.lookup('aileron', mach, d_aileron) - c_0) +
+             (self.lookup('elevator', mach, d_elevator) - c_0) +
+             (self.lookup('rudder', mach, d_rudder) - c_0) +
+             (self.lookup('p', mach, p) - c_0) +
+             (self.lookup('q', mach, q) - c_0) +
+             (self.lookup('r', mach, r) - c_0))
+        return c
+
+
+def sweep_table(model_sweep, key, method='linear'):
+    """return (mach, key) gridded table of the six coefficients of one create_aero_model_avl sweep."""
+    if 'values' in model_sweep:
+        values = model_sweep['values']
+    else:
+        values = stack([asarray(model_sweep['cfm'][cfm], dtype=float) for cfm in names])
+    return GriddedTable([model_sweep['mach'], model_sweep[key]], values, method=method)
+
+
+def compile_aero_model(model, method='linear'):
+    """return compiled aero model, rebuilt when the method or a table changes, table arrays are made read-only."""
+    key = id(model)
+    stamp = _stamp(model)
+    entry = _compiled.get(key)
+    if entry is None or entry[0] is not model or entry[1] != method or not _same(entry[2], stamp):
+        if key not in _compiled and len(_compiled) >= n_compiled:
+            _compiled.pop(next(iter(_compiled)))
+        # in place edits of a compiled table raise instead of leaving a stale lookup, replaced tables are rebuilt
+        for sweep in sweeps:
+            for leaf in _stamp(model[sweep]):
+                if isinstance(leaf, ndarray):
+                    leaf.flags.writeable = False
+        # the entry holds model and tables so their ids cannot be reused while it is cached
+        entry = (model, method, stamp, AeroModel(model, method))
+        _compiled[key] = entry
+    return entry[3]
+
+
+def _same(a, b):
+    """return true if two stamps hold the same arrays and equal other entries."""
+    if len(a) != len(b):
+        return False
+    for a_i, b_i in zip(a, b):
+        if isinstance(a_i, ndarray) or isinstance(b_i, ndarray):
+            if a_i is not b_i:
+                return False
+        elif a_i != b_i:
+            return False
+    return True
+
+
+def _stamp(tree):
+    """return the arrays of a nested dict and copies of its other entries, in key order."""
+    stamp = []
+    for value in tree.values():
+        if isinstance(value, dict):
+            stamp.extend(_stamp(value))
+        elif isinstance(value, ndarray):
+            stamp.append(value)
+        else:
+            stamp.append(deepcopy(value))
+    return stamp
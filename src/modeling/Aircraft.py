@@ -1,11 +1,16 @@
 """Returns force and moment coefficients for total aircraft, empirical methods."""
+from copy import deepcopy
 from numpy import array, cos, deg2rad, interp, pi, sin, tan
 from common.rotations import ned_to_body
+from src.modeling.cache import fingerprint, LruCache
 from src.modeling.flap import c_f_m_flap
 from src.modeling.Fuselage import Fuselage
 from src.modeling.LiftingSurface import LiftingSurface
 from src.modeling.trapezoidal_wing import mac, span, x_mac, y_mac
 k_yv = 0.7
+geometry_keys = ['wing', 'horizontal', 'vertical', 'fuselage']
+mach_resolution = 1e-5
+aircraft_cache = LruCache(maxsize=256)
 
 
 class Aircraft:
@@ -108,8 +113,9 @@ class Aircraft:
         c_l_adt = 2 * self.c_l_alpha_ht * s_ht / s_w * (x_ac_ht_bar - cg_bar) * self.downwash
         return c_l_adt
 
-    def c_m_zero(self, altitude):
-        """baseline lift coefficient."""
+    def c_m_zero(self, altitude, mach=None, drags=None):
+        """baseline lift coefficient, mach optionally replaces the derivatives mach in the skin friction terms."""
+        drags = self.parasite_drags(altitude, mach) if drags is None else drags
         wing = self.plane['wing']
         s_w = wing['planform']  # [ft^2]
         ht = self.plane['horizontal']
@@ -138,10 +144,10 @@ class Aircraft:
         z_vt = (z_cg - (vt['waterline'] + b_vt / 2)) / c_bar
         z_f = (z_cg - self.plane['fuselage']['height'] / 2) / c_bar
 
-        c_m_0_w_d = - LiftingSurface(wing).parasite_drag(self.mach, altitude) * z_w
-        c_m_0_ht_d = - LiftingSurface(ht).parasite_drag(self.mach, altitude) * s_ht / s_w * z_ht
-        c_m_0_vt_d = - LiftingSurface(vt).parasite_drag(self.mach, altitude) * s_vt / s_w * z_vt
-        c_m_0_f_d = - Fuselage(self.plane).parasite_drag_fuselage(self.mach, altitude) * z_f
+        c_m_0_w_d = - drags[0] * z_w
+        c_m_0_ht_d = - drags[1] * z_ht
+        c_m_0_vt_d = - drags[2] * z_vt
+        c_m_0_f_d = - drags[3] * z_f
         c_m_0_ht = c_l_0_ht * (x_ac_ht_bar - cg_bar)
         c_m_0 = (c_m_0_w + c_m_0_ht
                  + c_m_0_w_d + c_m_0_ht_d + c_m_0_vt_d + c_m_0_f_d)  # []
@@ -190,19 +196,10 @@ class Aircraft:
         c_m_adt = - 2 * self.c_l_alpha_ht * s_ht / s_w * self.downwash * (x_ac_ht_bar - cg_bar) ** 2
         return c_m_adt
 
-    def c_d_zero(self, altitude):
-        """returns faired drag coefficient."""
-        wing = self.plane['wing']
-        s_w = wing['planform']  # [ft^2]
-        ht = self.plane['horizontal']
-        s_ht = ht['planform']  # [ft^2]
-        vt = self.plane['vertical']
-        s_vt = vt['planform']  # [ft^2]
-        c_d_0_w = LiftingSurface(wing).parasite_drag(self.mach, altitude)
-        c_d_0_ht = LiftingSurface(ht).parasite_drag(self.mach, altitude) * s_ht / s_w
-        c_d_0_vt = LiftingSurface(vt).parasite_drag(self.mach, altitude) * s_vt / s_w
-        c_d_0_f = Fuselage(self.plane).parasite_drag_fuselage(self.mach, altitude)
-        c_d_0 = c_d_0_w + c_d_0_ht + c_d_0_vt + c_d_0_f
+    def c_d_zero(self, altitude, mach=None, drags=None):
+        """returns faired drag coefficient, mach optionally replaces the derivatives mach, both may be arrays."""
+        drags = self.parasite_drags(altitude, mach) if drags is None else drags
+        c_d_0 = drags[0] + drags[1] + drags[2] + drags[3]
         return c_d_0
 
     def c_y_beta(self):
@@ -418,3 +415,38 @@ class Aircraft:
     def c_n_delta_rudder(self):
         """returns yawing moment coefficient wrt rudder deflection."""
         return self.cfm_dr[5]
+
+    def parasite_drags(self, altitude, mach=None):
+        """returns wing, horizontal, vertical and fuselage faired drag coefficients referenced to the wing area."""
+        mach = self.mach if mach is None else mach
+        wing = self.plane['wing']
+        s_w = wing['planform']  # [ft^2]
+        ht = self.plane['horizontal']
+        s_ht = ht['planform']  # [ft^2]
+        vt = self.plane['vertical']
+        s_vt = vt['planform']  # [ft^2]
+        c_d_0_w = LiftingSurface(wing).parasite_drag(mach, altitude)
+        c_d_0_ht = LiftingSurface(ht).parasite_drag(mach, altitude) * s_ht / s_w
+        c_d_0_vt = LiftingSurface(vt).parasite_drag(mach, altitude) * s_vt / s_w
+        c_d_0_f = Fuselage(self.plane).parasite_drag_fuselage(mach, altitude)
+        return c_d_0_w, c_d_0_ht, c_d_0_vt, c_d_0_f
+
+
+def aircraft_derivatives(aircraft, mach, geometry_key=None):
+    """return memoized Aircraft for geometry, cg and quantized mach, geometry_key is its derivatives_key."""
+    mach = round(float(mach) / mach_resolution) * mach_resolution
+    key = (derivatives_key(aircraft) if geometry_key is None else geometry_key, mach)
+    ac = aircraft_cache.get(key)
+    if ac is None:
+        # keep a private copy so later edits of the plane dict cannot leak into the cached derivatives
+        plane = {key: deepcopy(value) for key, value in aircraft.items() if key != 'aero_model'}
+        ac = Aircraft(plane, mach)
+        aircraft_cache.put(key, ac)
+    return ac
+
+
+def derivatives_key(aircraft):
+    """return fingerprint of the geometry and cg the derivatives depend on."""
+    geometry = {key: aircraft[key] for key in geometry_keys}
+    geometry['cg'] = aircraft['weight']['cg']
+    return fingerprint(geometry)
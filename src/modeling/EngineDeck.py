@@ -0,0 +1,91 @@
+"""Engine decks of gridded propeller and jet performance maps."""
+import json
+from os import path
+from numpy import array, asarray, broadcast_arrays, concatenate, deg2rad, cos, sin, stack
+from scipy.interpolate import RectBivariateSpline
+from src.modeling.atmosphere import air_density, atmosphere
+from src.modeling.GriddedTable import GriddedTable
+deck_root = path.join(path.dirname(path.abspath(__file__)), '..', '..', 'data', 'engine_decks')
+default_decks = {'prop': 'propeller', 'jet': 'jet'}
+_decks = {}
+
+
+class PropellerDeck:
+    def __init__(self, deck):
+        """thrust and power coefficient maps over blade pitch [deg] and advance ratio []."""
+        pitch = asarray(deck['axes']['pitch'], dtype=float)
+        j = asarray(deck['axes']['j'], dtype=float)
+        k_j = min(3, len(j) - 1)
+        self.c_t = RectBivariateSpline(pitch, j, asarray(deck['c_t'], dtype=float), kx=1, ky=k_j)
+        self.c_p = RectBivariateSpline(pitch, j, asarray(deck['c_p'], dtype=float), kx=1, ky=k_j)
+
+    def thrust(self, engines, v, altitude, throttle, rho=None):
+        """return (..., n_engines) thrust [lbs] of engines at speed v [ft/s] and throttle (..., n_engines)."""
+        pitch, diameter, n, j = self._operating_point(engines, v, throttle)
+        # thrust is referenced to sea level density, sizing lapses the required thrust instead
+        return air_density(0) * n ** 2 * diameter ** 4 * self.c_t(pitch, j, grid=False)
+
+    def power(self, engines, v, altitude, throttle):
+        """return (..., n_engines) shaft power [ft lbs/s] of engines at speed v [ft/s] and throttle (..., n_engines)."""
+        pitch, diameter, n, j = self._operating_point(engines, v, throttle)
+        return air_density(0) * n ** 3 * diameter ** 5 * self.c_p(pitch, j, grid=False)
+
+    def _operating_point(self, engines, v, throttle):
+        """return broadcast pitch, diameter, revolutions per second and advance ratio."""
+        pitch = array([engine['pitch'] for engine in engines], dtype=float)
+        diameter = array([engine['diameter'] for engine in engines], dtype=float)
+        n = array([engine['rpm_max'] for engine in engines], dtype=float) * asarray(throttle) / 60  # [1/s]
+        j = asarray(v)[..., None] / (diameter * n)
+        pitch, diameter, n, j = broadcast_arrays(pitch, diameter, n, j)
+        return pitch, diameter, n, j
+
+
+class JetDeck:
+    def __init__(self, deck):
+        """thrust lapse and thrust specific fuel consumption maps over mach, altitude [ft] and throttle."""
+        axes = [deck['axes']['mach'], deck['axes']['altitude'], deck['axes']['throttle']]
+        self.table = GriddedTable(axes, stack([deck['thrust_lapse'], deck['tsfc']]))
+
+    def thrust(self, engines, v, altitude, throttle, rho=None):
+        """return (..., n_engines) thrust [lbs], sea level static thrust scaled by density ratio and thrust lapse."""
+        mach, rho = self._condition(v, altitude, rho)
+        lapse = self.table(mach[..., None], asarray(altitude)[..., None], throttle)[..., 0]
+        sigma = asarray(rho / air_density(0))[..., None]
+        return array([engine['thrust'] for engine in engines], dtype=float) * sigma * lapse
+
+    def tsfc(self, engines, v, altitude, throttle):
+        """return (..., n_engines) thrust specific fuel consumption [1/hr]."""
+        mach, rho = self._condition(v, altitude, None)
+        return self.table(mach[..., None], asarray(altitude)[..., None], throttle)[..., 1]
+
+    def _condition(self, v, altitude, rho):
+        """return mach and air density of speed v [ft/s] and altitude [ft]."""
+        rho_h, a, t, p, mu = atmosphere(asarray(altitude, dtype=float))
+        return asarray(asarray(v) / a), rho_h if rho is None else asarray(rho)
+
+
+def engine_deck(name):
+    """return compiled engine deck of data/engine_decks/<name>.json, each deck is read and compiled once."""
+    if name not in _decks:
+        with open(path.join(deck_root, '%s.json' % name)) as f:
+            deck = json.load(f)
+        _decks[name] = PropellerDeck(deck) if deck['type'] == 'prop' else JetDeck(deck)
+    return _decks[name]
+
+
+def engine_deck_name(engine):
+    """return deck name of engine, its 'deck' entry or the default deck of its type."""
+    return engine.get('deck', default_decks[engine['type']])
+
+
+def thrust_loads(engines, cg, t):
+    """return (..., 6) body axis forces and moments about cg of engine thrusts t (..., n_engines)."""
+    phi = deg2rad([engine['thrust_angle'] for engine in engines])
+    psi = deg2rad([engine['toe_angle'] for engine in engines])
+    direction = stack([cos(phi) * cos(psi), sin(psi), -sin(phi)], axis=-1)
+    r = array([[-engine['station'], engine['buttline'], -engine['waterline']] for engine in engines]) + array(cg)
+    f = asarray(t)[..., None] * direction
+    # r x f by components, numpy cross costs more than the rest of the loads for a handful of engines
+    m = stack([r[:, 1] * f[..., 2] - r[:, 2] * f[..., 1], r[:, 2] * f[..., 0] - r[:, 0] * f[..., 2],
+               r[:, 0] * f[..., 1] - r[:, 1] * f[..., 0]], axis=-1)
+    return concatenate((f.sum(axis=-2), m.sum(axis=-2)), axis=-1)
@@ -0,0 +1,38 @@
+"""State derived flight condition shared through the force model."""
+from numpy import arctan, asarray, cos, sin, sqrt, zeros
+from src.modeling.atmosphere import air_properties
+
+
+class FlightCondition:
+    def __init__(self, x):
+        """derive speed, mach, aero angles, air properties and rotations of a (12,) or (n, 12) state once."""
+        x = asarray(x, dtype=float)
+        altitude = x[..., -1]  # [ft]
+        rho, a = air_properties(altitude)  # [slug/ft3], [ft/s]
+        v = sqrt(x[..., 0] ** 2 + x[..., 1] ** 2 + x[..., 2] ** 2)  # [ft/s]
+        alpha = arctan(x[..., 2] / x[..., 0])  # [rad]
+        beta = arctan(x[..., 1] / x[..., 0])  # [rad]
+        b_2_w = body_to_wind_matrix(alpha, beta)
+        values = {'x': x, 'altitude': altitude, 'rho': rho, 'a': a, 'v': v, 'mach': v / a, 'alpha': alpha,
+                  'beta': beta, 'q_bar': 0.5 * rho * v ** 2, 'b_2_w': b_2_w, 'w_2_b': b_2_w.swapaxes(-1, -2)}
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('flight condition is immutable, build a new one from the state')
+
+
+def body_to_wind_matrix(alpha, beta):
+    """return (..., 3, 3) body to wind axis rotations of scalar or array angles, same convention as body_to_wind."""
+    alpha = asarray(alpha, dtype=float)
+    beta = asarray(beta, dtype=float)
+    r = zeros(alpha.shape + (3, 3))
+    r[..., 0, 0] = cos(alpha) * cos(beta)
+    r[..., 0, 1] = sin(beta)
+    r[..., 0, 2] = sin(alpha) * cos(beta)
+    r[..., 1, 0] = - cos(alpha) * sin(beta)
+    r[..., 1, 1] = cos(beta)
+    r[..., 1, 2] = - sin(alpha) * sin(beta)
+    r[..., 2, 0] = - sin(alpha)
+    r[..., 2, 2] = cos(alpha)
+    return r
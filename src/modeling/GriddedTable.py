@@ -0,0 +1,89 @@
+"""N-dimensional regular grid coefficient tables."""
+from numpy import arange, argsort, asarray, broadcast_arrays, clip, cumprod, empty, moveaxis, ones, searchsorted, zeros
+
+
+class GriddedTable:
+    def __init__(self, axes, values, method='linear'):
+        """axes is a list of breakpoint vectors, values has shape (n_coefficients, len(axes[0]), ...)."""
+        self.axes = []
+        values = asarray(values, dtype=float)
+        for ii, axis in enumerate(axes):
+            axis = asarray(axis, dtype=float).reshape(-1)
+            order = argsort(axis)
+            if any(order != arange(len(axis))):
+                values = values.take(order, axis=ii + 1)
+            self.axes.append(axis[order])
+        if values.shape[1:] != tuple(len(axis) for axis in self.axes):
+            raise ValueError('table shape %s does not match breakpoints' % (values.shape[1:],))
+        self.values = values
+        self.flat = values.reshape(values.shape[0], -1)
+        self.method = method
+        self.n_dim = len(self.axes)
+        self.strides = ones(self.n_dim, dtype=int)
+        self.strides[0:-1] = cumprod([len(axis) for axis in self.axes[:0:-1]])[::-1]
+
+    def __call__(self, *x):
+        """return (..., n_coefficients) table values, inputs broadcast and are clamped to the table limits."""
+        x = broadcast_arrays(*[asarray(xi, dtype=float) for xi in x])
+        shape = x[0].shape
+        x = [clip(xi, axis[0], axis[-1]).reshape(-1) for xi, axis in zip(x, self.axes)]
+        if self.method == 'cubic':
+            index, weight = zip(*[_cubic_weights(axis, xi) for xi, axis in zip(x, self.axes)])
+        else:
+            index, weight = zip(*[_linear_weights(axis, xi) for xi, axis in zip(x, self.axes)])
+        c = zeros((self.flat.shape[0], len(x[0])))
+        for corner in _corners([len(w) for w in weight]):
+            flat = zeros(len(x[0]), dtype=int)
+            w = ones(len(x[0]))
+            for ii in range(0, self.n_dim):
+                flat = flat + index[ii][corner[ii]] * self.strides[ii]
+                w = w * weight[ii][corner[ii]]
+            c = c + self.flat[:, flat] * w
+        return moveaxis(c, 0, -1).reshape(shape + (self.flat.shape[0],))
+
+
+def _corners(n):
+    """return every combination of corner indices for stencils of size n."""
+    corners = [[]]
+    for ni in n:
+        corners = [corner + [ii] for corner in corners for ii in range(0, ni)]
+    return corners
+
+
+def _interval(axis, x):
+    """return lower breakpoint index and fraction of interval containing x."""
+    if len(axis) == 1:
+        return zeros(len(x), dtype=int), zeros(len(x)), ones(len(x))
+    i = clip(searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+    dx = axis[i + 1] - axis[i]
+    return i, (x - axis[i]) / dx, dx
+
+
+def _linear_weights(axis, x):
+    """return two point stencil indices and weights."""
+    i, t, dx = _interval(axis, x)
+    if len(axis) == 1:
+        return [i], [ones(len(x))]
+    return [i, i + 1], [1 - t, t]
+
+
+def _cubic_weights(axis, x):
+    """return four point cubic hermite stencil indices and weights, slopes from neighbouring breakpoints."""
+    if len(axis) < 3:
+        return _linear_weights(axis, x)
+    n = len(axis)
+    i, t, dx = _interval(axis, x)
+    i_0 = clip(i - 1, 0, n - 1)
+    i_3 = clip(i + 2, 0, n - 1)
+    h_00 = 2 * t ** 3 - 3 * t ** 2 + 1
+    h_10 = t ** 3 - 2 * t ** 2 + t
+    h_01 = -2 * t ** 3 + 3 * t ** 2
+    h_11 = t ** 3 - t ** 2
+    k_1 = dx / (axis[i + 1] - axis[i_0])
+    k_2 = dx / (axis[i_3] - axis[i])
+    w = empty((4, len(x)))
+    w[0] = -h_10 * k_1
+    w[1] = h_00 - h_11 * k_2
+    w[2] = h_01 + h_10 * k_1
+    w[3] = h_11 * k_2
+    return [i_0, i, i + 1, i_3], list(w)
@@ -1,10 +1,14 @@
 from matplotlib import pyplot as plt
 from numpy import array, ceil, cos, deg2rad, pi
-from common import Atmosphere, Gravity, constants
+from common import Gravity, constants
 from src.modeling import LiftingSurface
 from src.modeling.Propulsion import propeller
 from src.modeling.trapezoidal_wing import span, sweep_x
+from src.modeling.atmosphere import air_density
+from src.modeling.cache import fingerprint, LruCache
+from src.modeling.fixed_point import fixed_point
 g = Gravity(0).gravity()  # [f/s2]
+buildup_cache = LruCache(maxsize=256)
 
 
 class MassProperties:
@@ -50,15 +54,20 @@ class MassProperties:
         i_xz = ((w / g) * (0.3 * b / 2) ** 2) / 3
         return i_xz
 
-    def weight_buildup(self, requirements, tol=10e-2, iplot=False):
-        """return component buildup mass properties."""
-        mtow = self.aircraft['weight']['weight']
+    def weight_buildup(self, requirements, tol=10e-2, iplot=False, mtow_0=None, method='anderson',
+                       full_output=False):
+        """return component buildup mtow and cg, cached without the weight, full_output adds solver diagnostics."""
         aircraft = self.aircraft
+        key = fingerprint([{name: value for name, value in aircraft.items() if name not in ['weight', 'aero_model']},
+                           requirements, tol, method])
+        cached = buildup_cache.get(key)
+        if cached is not None and not (iplot or full_output):
+            return cached[0], cached[1:].copy()
+        mtow_0 = aircraft['weight']['weight'] if mtow_0 is None else mtow_0
         r = requirements['performance']['range']
         mach = requirements['performance']['cruise_mach']
         n = max(abs(array(requirements['loads']['n_z'])))
 
-        res = 10
         w_ai = anti_icing_weight(aircraft)
         w_avi = avionics_weight(aircraft, r)
         w_car = cargo_weight(aircraft)
@@ -69,23 +78,14 @@ class MassProperties:
         w_prp = propulsion_weight(aircraft)
         w_ful = aircraft['propulsion']['fuel_mass'] * g
         w_fixed = w_avi + w_car + w_ele + w_fus + w_pnt + w_pax + w_prp + w_ful + w_ai
-        w_fcs = 0
-        w_ht = 0
-        w_mg = 0
-        w_ng = 0
-        w_vt = 0
-        w_w = 0
-        while abs(res) > tol:
-            w_fcs = fcs_weight(aircraft, mtow, mach)
-            w_ht = ht_weight(aircraft, mtow)
-            w_mg = main_gear_weight(aircraft, mtow)
-            w_ng = nose_gear_weight(aircraft, mtow)
-            w_vt = vt_weight(aircraft, mtow)
-            w_w = wing_weight(aircraft, mtow, mach, n)
-            w_iter = w_fcs + w_ht + w_mg + w_ng + w_vt + w_w
-            mtow_out = w_iter + w_fixed
-            res = mtow - mtow_out
-            mtow = mtow_out
+
+        def components(mtow):
+            return (fcs_weight(aircraft, mtow, mach), ht_weight(aircraft, mtow), main_gear_weight(aircraft, mtow),
+                    nose_gear_weight(aircraft, mtow), vt_weight(aircraft, mtow), wing_weight(aircraft, mtow, mach, n))
+
+        mtow, info = fixed_point(lambda mtow: sum(components(mtow)) + w_fixed, mtow_0, tol=tol, method=method)
+        w_fcs, w_ht, w_mg, w_ng, w_vt, w_w = components(mtow)
+        mtow = w_fcs + w_ht + w_mg + w_ng + w_vt + w_w + w_fixed
 
         w_payload = w_pax + w_car
         w_af = mtow - w_payload - w_prp - w_ful
@@ -128,6 +128,9 @@ class MassProperties:
 
         # j = inertia tensor
         # cg = [x, y, z]
+        buildup_cache.put(key, array([mtow, cg[0], cg[1], cg[2]]))
+        if full_output:
+            return mtow, cg, info
         return mtow, cg
 
 
@@ -250,7 +253,7 @@ def propulsion_weight(aircraft):
         if engine['type'] == 'prop':
             t = propeller(engine, [0, 0, 0], 0, 1)
             t = (sum(t[0:3] ** 2)) ** 0.5
-            rho = Atmosphere(0).air_density()
+            rho = air_density(0)
             d = engine['diameter']
             a = pi * (d / 2) ** 2
             u_e = (2 * t / (rho * a)) ** 0.5
@@ -1,63 +1,44 @@
-from numpy import array, cos as c, cross, deg2rad, sin as s, sum, zeros
-from common import Atmosphere
-from scipy.interpolate import RectBivariateSpline
+from numpy import asarray, zeros
+from src.modeling.EngineDeck import engine_deck, engine_deck_name, thrust_loads
 
 
 class Propulsion:
-    def __init__(self, propulsion, x, throttle, cg):
+    def __init__(self, propulsion, x, throttle, cg, fc=None):
+        """fc is an optional FlightCondition of x, its air density is reused by the engines."""
         self.propulsion = propulsion
         self.x = x
         self.throttle = throttle
         self.cg = cg
+        self.fc = fc
 
     def thrust_f_m(self):
-        """returns total propulsion forces and moments."""
-        c_f_m = zeros((self.propulsion['n_engines'], 6))
-        for ii in range(0, self.propulsion['n_engines']):
-            engine = self.propulsion["engine_%d" % (ii + 1)]
-            if engine['type'] == 'jet':
-                c_f_m[ii, :] = jet_engine(engine, self.cg, self.x[-1], self.throttle[ii])
-            elif engine['type'] == 'prop':
-                c_f_m[ii, :] = propeller(engine, self.cg, self.x[0], self.throttle[ii])
-        c_f_m = sum(c_f_m, axis=0)
+        """returns total propulsion forces and moments, x and throttle may be stacked (n, :) arrays."""
+        x = asarray(self.x, dtype=float)
+        throttle = asarray(self.throttle, dtype=float)
+        rho = None if self.fc is None else self.fc.rho
+        c_f_m = zeros(x.shape[:-1] + (6,))
+        for name, index in self.decks().items():
+            engines = [self.propulsion["engine_%d" % (ii + 1)] for ii in index]
+            t = engine_deck(name).thrust(engines, x[..., 0], x[..., -1], throttle[..., index], rho=rho)
+            c_f_m = c_f_m + thrust_loads(engines, self.cg, t)
         return c_f_m
 
+    def decks(self):
+        """return deck name to engine indices of propulsion system."""
+        decks = {}
+        for ii in range(0, self.propulsion['n_engines']):
+            decks.setdefault(engine_deck_name(self.propulsion["engine_%d" % (ii + 1)]), []).append(ii)
+        return decks
+
 
 # Public Methods #######################################################################################################
-def jet_engine(engine, cg, altitude, throttle):
-    """returns jet engine forces and moments."""
-    rho = Atmosphere(altitude).air_density()
-    rho_sl = Atmosphere(0).air_density()
-    t_slo = engine['thrust']*throttle
-    phi = deg2rad(engine['thrust_angle'])
-    psi = deg2rad(engine['toe_angle'])
-    r = array([-engine['station'], engine['buttline'], -engine['waterline']])+array(cg)
-    t = t_slo*rho/rho_sl  # [lbs]
-    t = t*array([c(phi)*c(psi), s(psi), -s(phi)])
-    m = cross(r, t)
-    c_f_m = array([t[0], t[1], t[2], m[0], m[1], m[2]])
-    return c_f_m
+def jet_engine(engine, cg, altitude, throttle, rho=None, v=0):
+    """returns jet engine forces and moments, rho is the air density at altitude when already known."""
+    t = engine_deck(engine_deck_name(engine)).thrust([engine], v, altitude, asarray(throttle)[..., None], rho=rho)
+    return thrust_loads([engine], cg, t)
 
 
 def propeller(engine, cg, v, throttle):
     """returns propeller system forces and moments."""
-    # thrust coefficient table
-    c_t = array([[0.14, 0.08, 0, -0.07, -0.15, -0.21],
-                 [0.16, 0.15, 0.1, 0.02, -0.052, -0.1],
-                 [0.18, 0.172, 0.16, 0.12, 0.04, -0.025]])
-    pitch_c_t = [15, 25, 35]
-    j_c_t = [0, 0.4, 0.8, 1.2, 1.6, 2.0]
-
-    rpm = engine['rpm_max'] * throttle / 60
-    j = array([v/(engine['diameter'] * rpm)])
-    f = RectBivariateSpline(pitch_c_t, j_c_t, c_t, kx=1)
-    c_t_i = f(engine['pitch'], j)
-    rho = Atmosphere(0).air_density()
-    t = float(rho * (rpm ** 2) * (engine['diameter'] ** 4) * c_t_i)
-    phi = deg2rad(engine['thrust_angle'])
-    psi = deg2rad(engine['toe_angle'])
-    r = array([-engine['station'], engine['buttline'], -engine['waterline']]) + array(cg)
-    t = t * array([c(phi) * c(psi), s(psi), -s(phi)])
-    m = cross(r, t)
-    c_f_m = array([t[0], t[1], t[2], m[0], m[1], m[2]])
-    return c_f_m
+    t = engine_deck(engine_deck_name(engine)).thrust([engine], v, 0, asarray(throttle)[..., None])
+    return thrust_loads([engine], cg, t)
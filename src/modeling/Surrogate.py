@@ -0,0 +1,170 @@
+"""Kriging surrogate of AVL force and moment coefficients."""
+from numpy import abs, argsort, array, asarray, diag, exp, full, inf, isfinite, linspace, log, maximum, ones, sqrt, \
+    sum, unique, vstack, zeros
+from scipy.linalg import cho_factor, cho_solve, LinAlgError
+from scipy.optimize import minimize
+from src.modeling.aerodynamics import avl_controls, avl_runs, avl_surface_keys, max_avl_cases
+from src.modeling.cache import fingerprint
+# numeric avl geometry inputs the surrogate generalizes over, the same surfaces, controls and cg avl_case_key uses
+geometry_features = ([(surface, key) for surface, control in avl_controls for key in avl_surface_keys
+                      if key != 'airfoil'] +
+                     [(surface, control, key) for surface, control in avl_controls for key in ['cf_c', 'b_1', 'b_2']] +
+                     [('weight', 'cg', ii) for ii in range(0, 3)])
+# inputs that cannot be interpolated, samples are discarded when they change
+configuration_features = [(surface, 'airfoil') for surface, control in avl_controls]
+flight_features = ['mach', 'alpha', 'beta', 'p', 'q', 'r', 'd_aileron', 'd_elevator', 'd_rudder']
+
+
+class Kriging:
+    def __init__(self, nugget=1e-8, theta_bounds=(-3, 3)):
+        """gaussian process with anisotropic squared exponential correlation and constant mean."""
+        self.nugget = nugget
+        self.theta_bounds = theta_bounds
+        self.log_theta = None
+        self.x = None
+
+    def fit(self, x, y):
+        """fit to samples x (n, d) and outputs y (n, k), all outputs share one correlation model."""
+        x = asarray(x, dtype=float)
+        y = asarray(y, dtype=float)
+        self.lower = x.min(axis=0)
+        self.scale = maximum(x.max(axis=0) - self.lower, 1e-2 * maximum(abs(self.lower), 1))
+        self.mean = y.mean(axis=0)
+        self.std = y.std(axis=0)
+        self.std[self.std == 0] = 1
+        self.x = (x - self.lower) / self.scale
+        self.y = (y - self.mean) / self.std
+        self.d = (self.x[:, None, :] - self.x[None, :, :]) ** 2
+        if self.log_theta is None or len(self.log_theta) != x.shape[1]:
+            self.log_theta = zeros(x.shape[1])
+        # warm start from the previous fit, refits after a few new samples move the optimum little
+        result = minimize(self._likelihood, self.log_theta, method='L-BFGS-B',
+                          bounds=[self.theta_bounds] * x.shape[1])
+        if isfinite(result['fun']):
+            self.log_theta = result['x']
+        self._factor()
+        return self
+
+    def predict(self, x):
+        """return mean and standard deviation (m, k) of outputs at points x (m, d)."""
+        x = (asarray(x, dtype=float).reshape(-1, self.x.shape[1]) - self.lower) / self.scale
+        r = self._correlation(x, self.x)
+        mean = self.mean + (r @ self.alpha) * self.std
+        s = 1 - sum(r * cho_solve(self.factor, r.T).T, axis=1)
+        std = sqrt(maximum(s, 0))[:, None] * sqrt(self.sigma2)[None, :] * self.std
+        return mean, std
+
+    def _correlation(self, a, b):
+        """return correlation matrix between scaled points a and b."""
+        d = (a[:, None, :] - b[None, :, :]) ** 2
+        return exp(-d @ 10 ** self.log_theta)
+
+    def _factor(self):
+        """factor training correlation matrix and store weights and process variances."""
+        r = exp(-self.d @ 10 ** self.log_theta) + self.nugget * diag(ones(len(self.x)))
+        self.factor = cho_factor(r, lower=True)
+        self.alpha = cho_solve(self.factor, self.y)
+        self.sigma2 = maximum(sum(self.y * self.alpha, axis=0) / len(self.x), 1e-16)
+
+    def _likelihood(self, log_theta):
+        """return concentrated negative log likelihood of log_theta."""
+        n = len(self.x)
+        r = exp(-self.d @ 10 ** log_theta) + self.nugget * diag(ones(n))
+        try:
+            factor = cho_factor(r, lower=True)
+        except LinAlgError:
+            return inf
+        sigma2 = maximum(sum(self.y * cho_solve(factor, self.y), axis=0) / n, 1e-16)
+        log_det = 2 * sum(log(diag(factor[0])))
+        return n / 2 * sum(log(sigma2)) + self.y.shape[1] / 2 * log_det
+
+
+class AvlSurrogate:
+    def __init__(self, tol=2e-3, batch=max_avl_cases, max_samples=600, runner=avl_runs):
+        """kriging model of the six avl coefficients, cases predicted less certain than tol are run through runner."""
+        self.tol = tol
+        self.batch = batch
+        self.max_samples = max_samples
+        self.runner = runner
+        self.model = Kriging()
+        self.x = zeros((0, len(geometry_features) + len(flight_features)))
+        self.y = zeros((0, 6))
+        self.fitted = False
+        self.configuration = None
+        self.n_avl = 0
+        self.n_predicted = 0
+
+    def features(self, aircraft, cases):
+        """return (n, d) feature matrix of run_avl argument tuples."""
+        geometry = [_feature(aircraft, path) for path in geometry_features]
+        return array([geometry + [mach, alpha, beta, p, q, r, u[0], u[1], u[2]]
+                      for mach, alpha, beta, p, q, r, u in cases], dtype=float)
+
+    def add(self, x, y):
+        """add samples and refit, the oldest samples are dropped beyond max_samples."""
+        self.x = vstack((self.x, x))[-self.max_samples:]
+        self.y = vstack((self.y, y))[-self.max_samples:]
+        _, i = unique(self.x, axis=0, return_index=True)
+        i.sort()
+        self.x = self.x[i]
+        self.y = self.y[i]
+        self.model.fit(self.x, self.y)
+        self.fitted = True
+
+    def predict(self, aircraft, cases):
+        """return mean and standard deviation of coefficients of run_avl argument tuples without running avl."""
+        if not self.fitted or _configuration(aircraft) != self.configuration:
+            return zeros((len(cases), 6)), full((len(cases), 6), inf)
+        return self.model.predict(self.features(aircraft, cases))
+
+    def evaluate(self, aircraft, cases, n_workers=None):
+        """return coefficients and standard deviations of run_avl argument tuples, querying avl only when uncertain."""
+        configuration = _configuration(aircraft)
+        if configuration != self.configuration:
+            self.x = zeros((0, self.x.shape[1]))
+            self.y = zeros((0, 6))
+            self.fitted = False
+            self.configuration = configuration
+        x = self.features(aircraft, cases)
+        cfm, std = self.predict(aircraft, cases)
+        done = zeros(len(cases), dtype=bool)
+        while True:
+            uncertain = (~done) & (std.max(axis=1) > self.tol)
+            if not uncertain.any():
+                break
+            pending = uncertain.nonzero()[0]
+            if self.fitted:
+                pending = pending[argsort(-std[pending].max(axis=1))][0:self.batch]
+            else:
+                # nothing to rank by yet, spread the first batch over the cases
+                pending = unique(pending[linspace(0, len(pending) - 1, min(self.batch, len(pending))).astype(int)])
+            y = asarray(self.runner(aircraft, [cases[ii] for ii in pending], n_workers), dtype=float)
+            self.n_avl = self.n_avl + len(pending)
+            done[pending] = True
+            self.add(x[pending], y)
+            rest = (~done).nonzero()[0]
+            if len(rest) > 0:
+                cfm[rest], std[rest] = self.model.predict(x[rest])
+            cfm[pending] = y
+            std[pending] = 0
+        self.n_predicted = self.n_predicted + int(len(cases) - done.sum())
+        return cfm, std
+
+    def info(self):
+        """return sample, avl query and prediction counters."""
+        return {'samples': len(self.x), 'avl': self.n_avl, 'predicted': self.n_predicted}
+
+
+def _configuration(aircraft):
+    """return hash of the plane inputs the surrogate cannot interpolate over."""
+    return fingerprint([_feature(aircraft, path, None) for path in configuration_features])
+
+
+def _feature(aircraft, path, default=0.0):
+    """return plane entry at key path, default where it is absent or None."""
+    value = aircraft
+    for key in path:
+        if isinstance(value, dict) and key not in value:
+            return default
+        value = value[key]
+    return default if value is None else value
@@ -3,3 +3,7 @@ from .Fuselage import Fuselage
 from .LiftingSurface import LiftingSurface
 from .MassProperties import MassProperties
 from .Propulsion import Propulsion
+from .AeroModel import AeroModel
+from .FlightCondition import FlightCondition
+from .GriddedTable import GriddedTable
+from .Surrogate import AvlSurrogate, Kriging
@@ -0,0 +1,76 @@
+"""Memory-mapped columnar store of aero model tables."""
+import json
+from os import makedirs, path, replace
+from numpy import asarray, load, save, stack
+from common.report_tools import load_aero_model, model_exists
+from src.modeling.AeroModel import names, sweeps
+store_root = path.join(path.expanduser('~'), '.cache', 'aero_mdo', 'models')
+header_file = 'header.json'
+
+
+class AeroTables(dict):
+    """aero model dict backed by read-only memory maps, pickles as a reference to its store."""
+    def __init__(self, directory, model):
+        super().__init__(model)
+        self.directory = directory
+
+    def __reduce__(self):
+        return open_aero_tables, (self.directory,)
+
+
+def aero_store(name):
+    """return store directory of plane name."""
+    return path.join(store_root, name)
+
+
+def aero_tables_exist(name):
+    """return true if plane name has a table store."""
+    return path.isfile(path.join(aero_store(name), header_file))
+
+
+def save_aero_tables(model, name):
+    """write one (coefficient, mach, y) float64 array per sweep and a json header of breakpoints."""
+    directory = aero_store(name)
+    makedirs(directory, exist_ok=True)
+    header = {'mrc': asarray(model['mrc'], dtype=float).tolist(), 'names': names, 'sweeps': {}}
+    for sweep, key in sweeps.items():
+        values = stack([asarray(model[sweep]['cfm'][cfm], dtype=float) for cfm in names])
+        # replace rather than overwrite, open memory maps keep reading the previous file
+        save(path.join(directory, '%s.tmp.npy' % sweep), values, allow_pickle=False)
+        replace(path.join(directory, '%s.tmp.npy' % sweep), path.join(directory, '%s.npy' % sweep))
+        header['sweeps'][sweep] = {'file': '%s.npy' % sweep,
+                                   'axes': {axis: asarray(value, dtype=float).tolist()
+                                            for axis, value in model[sweep].items() if axis not in ['cfm', 'values']}}
+    # header last, a store is only visible once complete
+    with open(path.join(directory, header_file + '.tmp'), 'w') as f:
+        json.dump(header, f)
+    replace(path.join(directory, header_file + '.tmp'), path.join(directory, header_file))
+    return directory
+
+
+def load_aero_tables(name):
+    """return aero model of plane name with coefficient tables memory mapped read-only."""
+    return open_aero_tables(aero_store(name))
+
+
+def open_aero_tables(directory):
+    """return aero model of store directory with coefficient tables memory mapped read-only."""
+    with open(path.join(directory, header_file)) as f:
+        header = json.load(f)
+    model = {'mrc': asarray(header['mrc'])}
+    for sweep, entry in header['sweeps'].items():
+        values = load(path.join(directory, entry['file']), mmap_mode='r')
+        model[sweep] = {axis: asarray(value) for axis, value in entry['axes'].items()}
+        model[sweep]['cfm'] = {cfm: values[ii] for ii, cfm in enumerate(header['names'])}
+        model[sweep]['values'] = values
+    return AeroTables(directory, model)
+
+
+def load_model(name):
+    """return memory mapped aero model of plane name, converting a saved model on first use, None if absent."""
+    if aero_tables_exist(name):
+        return load_aero_tables(name)
+    if model_exists(name):
+        save_aero_tables(load_aero_model(name), name)
+        return load_aero_tables(name)
+    return None
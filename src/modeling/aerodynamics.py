@@ -1,72 +1,108 @@
 """Contains aerodynamic calculations."""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from os import path
+import tempfile
 import avlwrapper as avl
-from numpy import array, concatenate, deg2rad, linspace, log10, pi, sort, sqrt, tan, unique, zeros
-from common import Atmosphere
+from numpy import abs, array, asarray, concatenate, deg2rad, linspace, log10, moveaxis, ndim, pi, sort, sqrt, tan, \
+    unique, where, zeros
 from common.report_tools import save_aero_model
+from src.modeling.aero_store import save_aero_tables
+from src.modeling.atmosphere import air_properties, atmosphere, speed_of_sound
+from src.modeling.cache import fingerprint, LruCache
 from src.modeling.trapezoidal_wing import mac, root_chord, span, sweep_x, y_chord
+avl_surface_keys = ['aspect_ratio', 'planform', 'taper', 'station', 'buttline', 'waterline', 'sweep_LE', 'dihedral',
+                    'airfoil']
+# aileron, elevator and rudder surfaces modeled in avl
+avl_controls = [('wing', 'control_1'), ('horizontal', 'control_2'), ('vertical', 'control_1')]
+avl_cfm_names = ['cd', 'cy', 'cl', 'cmr', 'cmp', 'cmy']
+max_avl_cases = 25  # cases per avl session
+max_avl_store = 20000  # avl results kept on disk, the least recently used are removed beyond it
+# delete the store directory to clear it, results are recomputed on demand
+avl_cache = LruCache(maxsize=4096, store=path.join(path.expanduser('~'), '.cache', 'aero_mdo', 'avl'),
+                     store_size=max_avl_store)
+logger = logging.getLogger(__name__)
+
+
+def create_aero_model_avl(aircraft, requirements, n_workers=None, adaptive=False, tol=1e-3, budget=120):
+    """create aero model using aircraft requirements with linear AVL method."""
+    # adaptive refines 3 point sweeps to tol within budget table cases
+    n_mach, n = (3, 3) if adaptive else (4, 5)
+    mach, alpha, sweeps = avl_sweeps(aircraft, requirements, n_mach, n)
+    grids = {name: (mach, y, case) for name, (key, y, case) in sweeps.items()}
+    if adaptive:
+        tables = adaptive_sweep_avl(aircraft, grids, tol=tol, budget=budget, n_workers=n_workers)
+    else:
+        cfm = sweep_avl(aircraft, grids, n_workers=n_workers)
+        tables = {name: (mach, y, cfm[name]) for name, (key, y, case) in sweeps.items()}
+
+    model = {'mrc': aircraft['weight']['cg']}
+    for name, (key, y, case) in sweeps.items():
+        model[name] = {'mach': tables[name][0], key: tables[name][1], 'cfm': tables[name][2]}
+    model['rudder']['alpha'] = alpha
+    logger.info('avl cache %s', avl_cache.info())
+    save_aero_model(model, aircraft['name'])  # create directory if it doesn't exist
+    save_aero_tables(model, aircraft['name'])
+    return model
 
 
-def create_aero_model_avl(aircraft, requirements):
-    """create aero model using aircraft requirements with linear AVL method."""
-    # baseline_sweep
-    mach = linspace(requirements['flight_envelope']['mach'][0], requirements['flight_envelope']['mach'][1], num=4)
-    alpha = linspace(requirements['flight_envelope']['alpha'][0], requirements['flight_envelope']['alpha'][1], num=5)
+def create_aero_model_surrogate(aircraft, requirements, surrogate, n_workers=None):
+    """create aero model tables of create_aero_model_avl from a surrogate, avl is only run where it is uncertain."""
+    mach, alpha, sweeps = avl_sweeps(aircraft, requirements)
+    cases = [case(ix, iy) for name, (key, y, case) in sweeps.items() for ix in mach for iy in y]
+    cfm, std = surrogate.evaluate(aircraft, cases, n_workers=n_workers)
+
+    model = {'mrc': aircraft['weight']['cg']}
+    i_run = 0
+    for name, (key, y, case) in sweeps.items():
+        values = cfm[i_run:i_run + len(mach) * len(y)].reshape(len(mach), len(y), len(avl_cfm_names))
+        model[name] = {'mach': mach, key: y,
+                       'cfm': {cfm_name: values[:, :, kk] for kk, cfm_name in enumerate(avl_cfm_names)}}
+        i_run = i_run + len(mach) * len(y)
+    model['rudder']['alpha'] = alpha
+    return model
+
+
+def avl_sweeps(aircraft, requirements, n_mach=4, n=5):
+    """return mach and alpha breakpoints and model sweeps, name maps to (key, y, case), case returns run_avl args."""
+    mach = linspace(requirements['flight_envelope']['mach'][0], requirements['flight_envelope']['mach'][1], num=n_mach)
+    alpha = linspace(requirements['flight_envelope']['alpha'][0], requirements['flight_envelope']['alpha'][1], num=n)
     alpha = sort(unique(concatenate((alpha, array([0])))))
-    beta = linspace(requirements['flight_envelope']['beta'][0], requirements['flight_envelope']['beta'][1], num=5)
-    p = linspace(requirements['flight_envelope']['p'][0], requirements['flight_envelope']['p'][1], num=5)
-    q = linspace(requirements['flight_envelope']['q'][0], requirements['flight_envelope']['q'][1], num=5)
-    r = linspace(requirements['flight_envelope']['r'][0], requirements['flight_envelope']['r'][1], num=5)
-    d_a = linspace(aircraft['wing']['control_1']['limits'][0], aircraft['wing']['control_1']['limits'][1], num=5)
+    beta = linspace(requirements['flight_envelope']['beta'][0], requirements['flight_envelope']['beta'][1], num=n)
+    p = linspace(requirements['flight_envelope']['p'][0], requirements['flight_envelope']['p'][1], num=n)
+    q = linspace(requirements['flight_envelope']['q'][0], requirements['flight_envelope']['q'][1], num=n)
+    r = linspace(requirements['flight_envelope']['r'][0], requirements['flight_envelope']['r'][1], num=n)
+    d_a = linspace(aircraft['wing']['control_1']['limits'][0], aircraft['wing']['control_1']['limits'][1], num=n)
     d_e = linspace(aircraft['horizontal']['control_2']['limits'][0],
-                   aircraft['horizontal']['control_2']['limits'][1], num=4)
+                   aircraft['horizontal']['control_2']['limits'][1], num=n - 1)
     d_e = sort(unique(concatenate((d_e, array([0])))))
     d_r = linspace(aircraft['vertical']['control_1']['limits'][0],
-                   aircraft['vertical']['control_1']['limits'][1], num=5)
-
-    model = {'mrc': aircraft['weight']['cg'],
-             'baseline': {'mach': mach, 'alpha': alpha,
-                          'cfm': sweep_avl_2d(aircraft, mach, alpha,
-                                              'run_avl(aircraft, ix, iy, 0, 0, 0, 0, [0, 0, 0, 0])')},
-             'lat_dir': {'mach': mach, 'beta': beta,
-                         'cfm': sweep_avl_2d(aircraft, mach, beta,
-                                             'run_avl(aircraft, ix, 0, iy, 0, 0, 0, [0, 0, 0, 0])')},
-             'aileron': {'mach': mach, 'd_aileron': d_a,
-                         'cfm': sweep_avl_2d(aircraft, mach, d_a,
-                                             'run_avl(aircraft, ix, 0, 0, 0, 0, 0, [iy, 0, 0, 0])')},
-             'elevator': {'mach': mach, 'd_elevator': d_e,
-                          'cfm': sweep_avl_2d(aircraft, mach, d_e,
-                                              'run_avl(aircraft, ix, 0, 0, 0, 0, 0, [0, iy, 0, 0])')},
-             'rudder': {'mach': mach, 'd_rudder': d_r, 'alpha': alpha,
-                        'cfm': sweep_avl_2d(aircraft, mach, d_r,
-                                            'run_avl(aircraft, ix, 0, 0, 0, 0, 0, [0, 0, iy, 0])')},
-             'p': {'mach': mach, 'p': p,
-                   'cfm': sweep_avl_2d(aircraft, mach, p, 'run_avl(aircraft, ix, 0, 0, iy, 0, 0, [0, 0, 0, 0])')},
-             'q': {'mach': mach, 'q': q,
-                   'cfm': sweep_avl_2d(aircraft, mach, q, 'run_avl(aircraft, ix, 0, 0, 0, iy, 0, [0, 0, 0, 0])')},
-             'r': {'mach': mach, 'r': r,
-                   'cfm': sweep_avl_2d(aircraft, mach, r, 'run_avl(aircraft, ix, 0, 0, 0, 0, iy, [0, 0, 0, 0])')},
-             }
-    save_aero_model(model, aircraft['name'])  # create directory if it doesn't exist
-    return model
+                   aircraft['vertical']['control_1']['limits'][1], num=n)
+
+    sweeps = {'baseline': ('alpha', alpha, lambda ix, iy: (ix, iy, 0, 0, 0, 0, [0, 0, 0, 0])),
+              'lat_dir': ('beta', beta, lambda ix, iy: (ix, 0, iy, 0, 0, 0, [0, 0, 0, 0])),
+              'aileron': ('d_aileron', d_a, lambda ix, iy: (ix, 0, 0, 0, 0, 0, [iy, 0, 0, 0])),
+              'elevator': ('d_elevator', d_e, lambda ix, iy: (ix, 0, 0, 0, 0, 0, [0, iy, 0, 0])),
+              'rudder': ('d_rudder', d_r, lambda ix, iy: (ix, 0, 0, 0, 0, 0, [0, 0, iy, 0])),
+              'p': ('p', p, lambda ix, iy: (ix, 0, 0, iy, 0, 0, [0, 0, 0, 0])),
+              'q': ('q', q, lambda ix, iy: (ix, 0, 0, 0, iy, 0, [0, 0, 0, 0])),
+              'r': ('r', r, lambda ix, iy: (ix, 0, 0, 0, 0, iy, [0, 0, 0, 0]))}
+    return mach, alpha, sweeps
 
 
 def dynamic_pressure(mach, altitude):
     """returns incompressible dynamic pressure."""
-    rho = Atmosphere(altitude).air_density()
-    a = Atmosphere(altitude).speed_of_sound()
+    rho, a = air_properties(altitude)
     v = mach * a
     q_bar = 0.5 * rho * v ** 2
     return q_bar
 
 
 def friction_coefficient(mach, altitude, x_ref):
-    """return air friction coefficient for flight condition."""
+    """return air friction coefficient for flight condition, array machs and altitudes return arrays."""
     re = reynolds_number(mach, altitude, x_ref)  # []
-    if re < 500000:
-        c_f = 1.328 / sqrt(re)  # []
-    else:
-        c_f = 0.455 / (log10(re)) ** 2.58  # []
-    return c_f
+    c_f = where(re < 500000, 1.328 / sqrt(re), 0.455 / (log10(re)) ** 2.58)  # []
+    return c_f if ndim(c_f) else float(c_f)
 
 
 def polhamus(c_l_alpha, ar, mach, taper, sweep_le):
@@ -93,25 +129,64 @@ def pressure_drag(t_c):
 
 def reynolds_number(mach, altitude, x_ref):
     """return reynolds number."""
-    rho = Atmosphere(altitude).air_density()  # [slug/ft^3]
-    mu = Atmosphere(altitude).viscosity()
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
+    rho, a, t, p, mu = atmosphere(altitude)  # [slug/ft^3], [ft/s], [R], [psf], [slug/ft s]
     v = mach * a  # [ft/s]
     re = rho * v * x_ref / mu  # []
     return re
 
 
 def run_avl(aircraft, mach, alpha, beta, p, q, r, u, iplot=0):
-    """run Athena Vortex Lattice Method."""
+    """run Athena Vortex Lattice Method, results are cached on geometry and run case."""
+    key = avl_case_key(aircraft, mach, alpha, beta, p, q, r, u)
+    if not iplot:
+        cfm = avl_cache.get(key)
+        if cfm is not None:
+            return list(cfm)
     case_name = 'zero_alpha'
-    roll_rate = deg2rad(p)  # [rad/s]
-    pitch_rate = deg2rad(q)  # [rad/s]
-    yaw_rate = deg2rad(r)  # [rad/s]
-    d_aileron = u[0]  # deg
-    d_elevator = u[1]  # deg
-    d_rudder = -u[2]  # deg
-    gains = [-1, 1, 1]
+    geometry = avl_geometry(aircraft, mach)
+
+    def show_treffz(session_1):
+        if 'gs_bin' in session_1.config.settings:
+            images = session_1.save_trefftz_plots()
+            for iimg in images:
+                avl.show_image(iimg)
+        else:
+            for idx, _ in enumerate(session_1.cases):
+                session_1.show_trefftz_plot(idx + 1)  # cases start from 1
+
+    simple_case = avl_case(case_name, aircraft, mach, alpha, beta, p, q, r, u)
+    session = avl.Session(geometry=geometry, cases=[simple_case])
+
+    if iplot:
+        if 'gs_bin' in session.config.settings:
+            img = session.save_geometry_plot()[0]
+            avl.show_image(img)
+        else:
+            session.show_geometry()
+
+        show_treffz(session)
+
+    # results are in a dictionary
+    result = session.run_all_cases()
+    cfm = avl_totals(result[case_name])
+    print("cfm= {}".format(cfm))
+    avl_cache.put(key, array(cfm))
+    return cfm
+
+
+def run_avl_cases(aircraft, mach, cases):
+    """run several cases at one mach in a single AVL session, cases are (alpha, beta, p, q, r, u) tuples."""
+    if len(cases) > max_avl_cases:
+        raise ValueError('AVL supports at most %d cases per session' % max_avl_cases)
+    names = ['case_%d' % ii for ii in range(0, len(cases))]
+    session = avl.Session(geometry=avl_geometry(aircraft, mach),
+                          cases=[avl_case(name, aircraft, mach, *case) for name, case in zip(names, cases)])
+    result = session.run_all_cases()
+    return [avl_totals(result[name]) for name in names]
 
+
+def avl_geometry(aircraft, mach):
+    """return avl geometry of wing, horizontal and vertical tail."""
     wing = aircraft['wing']
     ht = aircraft['horizontal']
     vt = aircraft['vertical']
@@ -126,7 +201,6 @@ def run_avl(aircraft, mach, alpha, beta, p, q, r, u, iplot=0):
     vt_area = vt['planform']
     vt_root_le_pnt = avl.Point(vt['station'], vt['buttline'], vt['waterline'])
 
-    a = Atmosphere(0).speed_of_sound()
     ref_pnt = avl.Point(aircraft['weight']['cg'][0], aircraft['weight']['cg'][1], aircraft['weight']['cg'][2])
 
     # Wing -------------------------------------------------------------------------------------------------------------
@@ -187,50 +261,53 @@ def run_avl(aircraft, mach, alpha, beta, p, q, r, u, iplot=0):
                                 span_spacing=avl.Spacing.cosine,
                                 sections=sections)
     # Setup ------------------------------------------------------------------------------------------------------------
-    aircraft = avl.Geometry(name='aircraft',
+    geometry = avl.Geometry(name='aircraft',
                             reference_area=wing_area,
                             reference_chord=wing_mac,
                             reference_span=wing_span,
                             reference_point=ref_pnt,
                             mach=mach,
                             surfaces=[wing, horizontal_tail, vertical_tail])
+    return geometry
 
-    def show_treffz(session_1):
-        if 'gs_bin' in session_1.config.settings:
-            images = session_1.save_trefftz_plots()
-            for iimg in images:
-                avl.show_image(iimg)
-        else:
-            for idx, _ in enumerate(session_1.cases):
-                session_1.show_trefftz_plot(idx + 1)  # cases start from 1
-
-    simple_case = avl.Case(name=case_name,
-                           alpha=alpha, beta=beta,
-                           aileron=gains[0] * d_aileron, elevator=gains[1] * d_elevator, rudder=gains[2] * d_rudder,
-                           roll_rate=roll_rate * wing_span/(2 * mach * a),
-                           pitch_rate=pitch_rate * wing_mac/(2 * mach * a),
-                           yaw_rate=yaw_rate * wing_span/(2 * mach * a))
-    session = avl.Session(geometry=aircraft, cases=[simple_case])
 
-    if iplot:
-        if 'gs_bin' in session.config.settings:
-            img = session.save_geometry_plot()[0]
-            avl.show_image(img)
-        else:
-            session.show_geometry()
-
-        show_treffz(session)
-
-    # results are in a dictionary
-    result = session.run_all_cases()
-    cd = result[case_name]['Totals']['CXtot']
-    cy = result[case_name]['Totals']['CYtot']
-    cl = result[case_name]['Totals']['CLtot']
-    cmr = result[case_name]['Totals']['Cltot']
-    cmp = result[case_name]['Totals']['Cmtot']
-    cmy = result[case_name]['Totals']['Cntot']
-    print("cfm= {}".format([cd, cy, cl, cmr, cmp, cmy]))
-    return [cd, cy, cl, cmr, cmp, cmy]
+def avl_case(name, aircraft, mach, alpha, beta, p, q, r, u):
+    """return avl run case, angles and rates in degrees."""
+    roll_rate = deg2rad(p)  # [rad/s]
+    pitch_rate = deg2rad(q)  # [rad/s]
+    yaw_rate = deg2rad(r)  # [rad/s]
+    d_aileron = u[0]  # deg
+    d_elevator = u[1]  # deg
+    d_rudder = -u[2]  # deg
+    gains = [-1, 1, 1]
+    wing_span = span(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'])
+    wing_mac = mac(aircraft['wing']['aspect_ratio'], aircraft['wing']['planform'], aircraft['wing']['taper'])
+    a = speed_of_sound(0)
+    case = avl.Case(name=name,
+                    alpha=alpha, beta=beta,
+                    aileron=gains[0] * d_aileron, elevator=gains[1] * d_elevator, rudder=gains[2] * d_rudder,
+                    roll_rate=roll_rate * wing_span/(2 * mach * a),
+                    pitch_rate=pitch_rate * wing_mac/(2 * mach * a),
+                    yaw_rate=yaw_rate * wing_span/(2 * mach * a))
+    return case
+
+
+def avl_totals(result):
+    """return body axis coefficients of one avl case result."""
+    totals = result['Totals']
+    return [totals['CXtot'], totals['CYtot'], totals['CLtot'], totals['Cltot'], totals['Cmtot'], totals['Cntot']]
+
+
+def avl_case_key(aircraft, mach, alpha, beta, p, q, r, u):
+    """return content hash of the avl geometry inputs and run case."""
+    # hinge chord ratios only enter the key when their control is deflected
+    geometry = {'cg': aircraft['weight']['cg']}
+    for (surface, control), deflection in zip(avl_controls, u):
+        geometry[surface] = {key: aircraft[surface][key] for key in avl_surface_keys if key in aircraft[surface]}
+        geometry[surface][control] = {key: aircraft[surface][control][key] for key in ['b_1', 'b_2']}
+        if deflection != 0:
+            geometry[surface][control]['cf_c'] = aircraft[surface][control]['cf_c']
+    return fingerprint([geometry, [mach, alpha, beta, p, q, r], list(u[0:3])])
 
 
 def avl_section(y, cs, wing, mirror, cs_name, duplicate_sign=1):
@@ -264,27 +341,130 @@ def avl_section(y, cs, wing, mirror, cs_name, duplicate_sign=1):
     return section
 
 
-def sweep_avl_2d(aircraft, x, y, run_string):
-    """execute sweep of key in AVL."""
-    out = {
-        'cd': zeros((len(x), len(y))),
-        'cy': zeros((len(x), len(y))),
-        'cl': zeros((len(x), len(y))),
-        'cmr': zeros((len(x), len(y))),
-        'cmp': zeros((len(x), len(y))),
-        'cmy': zeros((len(x), len(y))),
-    }
-    ii = 0
-    for ix in x:
-        jj = 0
-        for iy in y:
-            out_avl = eval(run_string)
-            out['cd'][ii, jj] = out_avl[0]
-            out['cy'][ii, jj] = out_avl[1]
-            out['cl'][ii, jj] = out_avl[2]
-            out['cmr'][ii, jj] = out_avl[3]
-            out['cmp'][ii, jj] = out_avl[4]
-            out['cmy'][ii, jj] = out_avl[5]
-            jj = jj + 1
-        ii = ii + 1
+def sweep_avl(aircraft, sweeps, n_workers=None):
+    """execute 2d sweeps in AVL, sweeps maps name to (x, y, case) and case(ix, iy) returns run_avl arguments."""
+    cases = {}
+    for name, (x, y, case) in sweeps.items():
+        cases[name] = [case(x[ii], y[jj]) for ii in range(0, len(x)) for jj in range(0, len(y))]
+    cfm = avl_runs(aircraft, [args for name in sweeps for args in cases[name]], n_workers=n_workers)
+
+    out = {}
+    i_run = 0
+    for name, (x, y, case) in sweeps.items():
+        out[name] = {cfm_name: zeros((len(x), len(y))) for cfm_name in avl_cfm_names}
+        for ii in range(0, len(x)):
+            for jj in range(0, len(y)):
+                for kk, cfm_name in enumerate(avl_cfm_names):
+                    out[name][cfm_name][ii, jj] = cfm[i_run][kk]
+                i_run = i_run + 1
     return out
+
+
+def avl_runs(aircraft, cases, n_workers=None):
+    """return force and moment coefficients of each run_avl argument tuple in cases, cached cases are not rerun."""
+    keys = []
+    cfm = {}
+    runs = {}
+    for args in cases:
+        key = avl_case_key(aircraft, *args)
+        keys.append(key)
+        if key in cfm or key in runs:
+            continue
+        cached = avl_cache.get(key)
+        if cached is None:
+            runs[key] = args
+        else:
+            cfm[key] = cached
+
+    # one geometry per mach, avl limits a session to max_avl_cases
+    plane = {key: value for key, value in aircraft.items() if key != 'aero_model'}
+    by_mach = {}
+    for key, args in runs.items():
+        by_mach.setdefault(args[0], []).append(key)
+    jobs = []
+    for mach, mach_keys in by_mach.items():
+        for ii in range(0, len(mach_keys), max_avl_cases):
+            job_keys = mach_keys[ii:ii + max_avl_cases]
+            jobs.append((job_keys, plane, mach, [runs[key][1:] for key in job_keys]))
+    if n_workers == 1 or len(jobs) <= 1:
+        results = list(map(_avl_session, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_avl_worker_init) as pool:
+            results = list(pool.map(_avl_session, jobs))
+    for job_keys, job_cfm in results:
+        for key, c in zip(job_keys, job_cfm):
+            cfm[key] = array(c)
+            avl_cache.put(key, cfm[key])
+    return [cfm[key] for key in keys]
+
+
+def sweep_avl_2d(aircraft, x, y, case, n_workers=None):
+    """execute sweep of key in AVL, case(ix, iy) returns run_avl arguments."""
+    return sweep_avl(aircraft, {'sweep': (x, y, case)}, n_workers=n_workers)['sweep']
+
+
+def adaptive_sweep_avl(aircraft, sweeps, tol=1e-3, budget=120, max_level=4, n_workers=None):
+    """refine 2d AVL sweeps where leave-one-out interpolation error exceeds tol, return breakpoints and tables."""
+    # all sweeps share one mach axis and budget table cases, intervals are halved at most max_level times
+    names = list(sweeps)
+    mach = array(sweeps[names[0]][0], dtype=float)
+    if any([len(sweeps[name][0]) != len(mach) or any(array(sweeps[name][0]) != mach) for name in names]):
+        raise ValueError('adaptive sweeps must share one mach axis')
+    y = {name: array(sweeps[name][1], dtype=float) for name in names}
+    while True:
+        # cached cases are not rerun, each pass only evaluates the new breakpoints
+        out = sweep_avl(aircraft, {name: (mach, y[name], sweeps[name][2]) for name in names}, n_workers=n_workers)
+        intervals = []
+        for name in names:
+            values = array([out[name][cfm_name] for cfm_name in avl_cfm_names])
+            intervals = intervals + [(e, axis, mid, name) for e, axis, mid in
+                                     _refine_intervals(sweeps[name][0:2], mach, y[name], values, tol, max_level)]
+        mach_new = list(mach)
+        y_new = {name: list(y[name]) for name in names}
+        n_y = sum([len(y[name]) for name in names])
+        for e, axis, mid, name in sorted(intervals, key=lambda interval: interval[0], reverse=True):
+            if axis == 0 and mid not in mach_new and (len(mach_new) + 1) * n_y <= budget:
+                mach_new.append(mid)
+            elif axis == 1 and mid not in y_new[name] and len(mach_new) * (n_y + 1) <= budget:
+                y_new[name].append(mid)
+                n_y = n_y + 1
+        if len(mach_new) == len(mach) and all([len(y_new[name]) == len(y[name]) for name in names]):
+            return {name: (mach, y[name], out[name]) for name in names}
+        mach = sort(array(mach_new))
+        y = {name: sort(array(y_new[name])) for name in names}
+
+
+def _refine_intervals(coarse, x, y, values, tol, max_level):
+    """return (error, axis, midpoint) of intervals next to nodes whose leave-one-out error exceeds tol."""
+    intervals = []
+    for axis, grid in enumerate([x, y]):
+        error = _loo_error(grid, values, axis + 1)
+        min_width = (coarse[axis][-1] - coarse[axis][0]) / 2 ** max_level
+        for ii in range(0, len(grid) - 1):
+            # interval error from its end nodes, boundary nodes have no estimate
+            e = max(error[ii], error[ii + 1])
+            if e > tol and grid[ii + 1] - grid[ii] > 2 * min_width:
+                intervals.append((e, axis, 0.5 * (grid[ii] + grid[ii + 1])))
+    return intervals
+
+
+def _loo_error(grid, values, axis):
+    """return max over coefficients and other axis of |v_i - linear interpolation of neighbours| per node."""
+    error = zeros(len(grid))
+    if len(grid) < 3:
+        return error
+    v = moveaxis(values, axis, 0)
+    t = ((grid[1:-1] - grid[0:-2]) / (grid[2:] - grid[0:-2])).reshape((-1,) + (1,) * (v.ndim - 1))
+    error[1:-1] = abs(v[1:-1] - (v[0:-2] + t * (v[2:] - v[0:-2]))).reshape(len(grid) - 2, -1).max(axis=1)
+    return error
+
+
+def _avl_session(job):
+    """process pool entry point, run one multi-case session."""
+    job_keys, plane, mach, cases = job
+    return job_keys, run_avl_cases(plane, mach, cases)
+
+
+def _avl_worker_init():
+    """give each pool worker its own temporary directory for avl session files."""
+    tempfile.tempdir = tempfile.mkdtemp(prefix='avl_worker_')
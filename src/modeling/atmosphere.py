@@ -0,0 +1,79 @@
+"""Tabulated standard atmosphere shared by the force models and analyses."""
+from numpy import arange, array, asarray, clip, floor, interp, ndim
+from common import Atmosphere
+from src.modeling.cache import LruCache
+h_step = 50  # table spacing [ft]
+h_limits = [-5000, 100000]  # table range, altitudes outside are evaluated exactly [ft]
+r_air = 1716.49  # gas constant of air [ft lbf / slug R]
+atmosphere_memo = LruCache(maxsize=1024)
+_table = []
+
+
+def atmosphere(altitude):
+    """return density [slug/ft^3], speed of sound [ft/s], temperature [R], pressure [psf] and viscosity [slug/ft s]."""
+    if ndim(altitude) == 0:
+        key = float(altitude)
+        value = atmosphere_memo.get(key)
+        if value is None:
+            value = tuple(float(v) for v in _interpolate(array([key]))[:, 0])
+            atmosphere_memo.put(key, value)
+        return value
+    altitude = asarray(altitude, dtype=float)
+    values = _interpolate(altitude.reshape(-1))
+    return tuple(v.reshape(altitude.shape) for v in values)
+
+
+def air_properties(altitude):
+    """returns air density and speed of sound for scalar or array altitudes."""
+    rho, a, t, p, mu = atmosphere(altitude)
+    return rho, a
+
+
+def air_density(altitude):
+    """return air density [slug/ft^3] for scalar or array altitudes."""
+    return atmosphere(altitude)[0]
+
+
+def speed_of_sound(altitude):
+    """return speed of sound [ft/s] for scalar or array altitudes."""
+    return atmosphere(altitude)[1]
+
+
+def density_altitude(altitude, temperature):
+    """return density altitude [ft] of pressure altitude [ft] at outside air temperature [F], scalars or arrays."""
+    p = atmosphere(altitude)[3]
+    rho = p / (r_air * (asarray(temperature, dtype=float) + 459.67))
+    h, table = atmosphere_table()
+    # standard density falls with altitude, interp needs rising breakpoints
+    return interp(-rho, -table[0], h)
+
+
+def atmosphere_table():
+    """return altitudes and (5, n) table of atmosphere properties at h_step spacing, built on first use."""
+    if not _table:
+        h = arange(h_limits[0], h_limits[1] + h_step, h_step, dtype=float)
+        _table.extend([h, _exact(h)])
+    return _table[0], _table[1]
+
+
+def _exact(h):
+    """return (5, n) atmosphere properties evaluated point by point."""
+    values = []
+    for hi in h:
+        air = Atmosphere(hi)
+        rho = air.air_density()
+        p = air.pressure()
+        values.append([rho, air.speed_of_sound(), p / (rho * r_air), p, air.viscosity()])
+    return array(values, dtype=float).reshape(-1, 5).T
+
+
+def _interpolate(h):
+    """return (5, n) atmosphere properties at altitudes h, linear in the table and exact outside it."""
+    h_table, table = atmosphere_table()
+    i = clip(floor((h - h_limits[0]) / h_step).astype(int), 0, len(h_table) - 2)
+    t = (h - h_table[i]) / h_step
+    values = table[:, i] * (1 - t) + table[:, i + 1] * t
+    outside = (h < h_limits[0]) | (h > h_limits[1])
+    if outside.any():
+        values[:, outside] = _exact(h[outside])
+    return values
@@ -0,0 +1,132 @@
+"""Contains hashing and LRU helpers for caching model evaluations."""
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import blake2b
+from os import getpid, makedirs, path, remove, replace, scandir, utime
+from numpy import ascontiguousarray, asarray, bool_, floating, integer, load, ndarray, save
+
+
+def fingerprint(obj):
+    """return stable content hash of nested dict, list, array and scalar data."""
+    h = blake2b(digest_size=16)
+    _update(h, obj)
+    return h.hexdigest()
+
+
+def _update(h, obj):
+    """feed object content to hash."""
+    if isinstance(obj, dict):
+        h.update(b'd%d' % len(obj))
+        for key in sorted(obj, key=str):
+            _update(h, str(key))
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'l%d' % len(obj))
+        for item in obj:
+            _update(h, item)
+    elif isinstance(obj, ndarray):
+        a = ascontiguousarray(obj)
+        h.update(('a%s%s' % (a.dtype.str, a.shape)).encode())
+        h.update(a.tobytes())
+    elif isinstance(obj, str):
+        h.update(b's' + obj.encode())
+    elif isinstance(obj, (bool, bool_)) or obj is None:
+        h.update(('b%r' % obj).encode())
+    elif isinstance(obj, (int, float, integer, floating)):
+        h.update(('f%r' % float(obj)).encode())
+    else:
+        h.update(('o%r' % obj).encode())
+
+
+class LruCache:
+    def __init__(self, maxsize=128, store=None, store_size=None):
+        """store is an optional directory backing string keyed array values as .npy files, store_size bounds it."""
+        self.maxsize = maxsize
+        self.store = store
+        self.store_size = store_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """return cached value and mark it as recently used."""
+        if key in self.data:
+            self.data.move_to_end(key)
+            self.hits = self.hits + 1
+            return self.data[key]
+        if self.store is not None and path.isfile(self._file(key)):
+            value = load(self._file(key))
+            if self.store_size is not None:
+                self._touch(key)
+            self._insert(key, value)
+            self.hits = self.hits + 1
+            return value
+        self.misses = self.misses + 1
+        return default
+
+    def put(self, key, value):
+        """store value, evicting the least recently used entry when full."""
+        self._insert(key, value)
+        if self.store is not None:
+            makedirs(self.store, exist_ok=True)
+            # write then rename so concurrent readers never see a partial file
+            tmp = path.join(self.store, '%s.%d.tmp.npy' % (key, getpid()))
+            save(tmp, asarray(value), allow_pickle=False)
+            replace(tmp, self._file(key))
+            if self.store_size is not None:
+                self._prune()
+
+    def clear(self):
+        """drop all in memory entries and reset counters, the backing store is kept."""
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def backed_by(self, store):
+        """use directory store as backing store inside the with block, None keeps the current one."""
+        previous = self.store
+        if store is not None:
+            self.store = store
+        try:
+            yield self
+        finally:
+            self.store = previous
+
+    def info(self):
+        """return hit, miss and size counters."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.data), 'maxsize': self.maxsize}
+
+    def _insert(self, key, value):
+        """insert in memory, evicting the least recently used entry when full."""
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def _file(self, key):
+        """return backing file of key."""
+        return path.join(self.store, '%s.npy' % key)
+
+    def _prune(self):
+        """remove the least recently used store files beyond store_size."""
+        files = []
+        for entry in scandir(self.store):
+            try:
+                if entry.name.endswith('.npy') and '.tmp.' not in entry.name:
+                    files.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                continue
+        for mtime, file in sorted(files)[0:max(len(files) - self.store_size, 0)]:
+            try:
+                remove(file)
+            except OSError:
+                # another process pruned it first
+                continue
+
+    def _touch(self, key):
+        """mark store file of key as recently used."""
+        try:
+            utime(self._file(key))
+        except OSError:
+            pass
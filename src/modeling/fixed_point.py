@@ -0,0 +1,56 @@
+"""Accelerated fixed point iteration for sizing loops."""
+from numpy import asarray, dot, isfinite, linalg, stack
+
+
+def fixed_point(g, x0, tol=1e-8, max_iter=100, method='anderson', memory=3):
+    """solve x = g(x) until |g(x) - x| <= tol with method 'picard', 'aitken', 'secant' or 'anderson'."""
+    scalar = asarray(x0).ndim == 0
+    x = asarray(x0, dtype=float).reshape(-1).copy()
+    if method == 'secant':
+        method = 'anderson'
+        memory = 1
+
+    def fun(x_i):
+        info['n_fev'] = info['n_fev'] + 1
+        return asarray(g(x_i[0] if scalar else x_i), dtype=float).reshape(-1)
+
+    info = {'success': False, 'iterations': 0, 'residual_norm': None, 'n_fev': 0, 'history': [],
+            'message': 'maximum iterations reached'}
+    g_x = fun(x)
+    f = g_x - x
+    d_g = []
+    d_f = []
+    for ii in range(0, max_iter + 1):
+        info['residual_norm'] = linalg.norm(f)
+        info['history'].append(info['residual_norm'])
+        if info['residual_norm'] <= tol:
+            info['success'] = True
+            info['message'] = 'residual below tolerance'
+            break
+        if ii == max_iter:
+            break
+        info['iterations'] = ii + 1
+        if method == 'anderson' and d_f:
+            # least squares mix of previous residual differences, x = g(x) - dg gamma
+            gamma = linalg.lstsq(stack(d_f, axis=1), f, rcond=None)[0]
+            x_new = g_x - stack(d_g, axis=1) @ gamma
+        elif method == 'aitken' and d_f and ii % 2 == 1:
+            # irons tuck delta squared extrapolation over the last two substitutions
+            d_2 = d_f[-1]
+            x_new = g_x - dot(f, d_2) / max(dot(d_2, d_2), 1e-300) * f
+        else:
+            x_new = g_x
+        g_new = fun(x_new)
+        f_new = g_new - x_new
+        if not all(isfinite(f_new)) or linalg.norm(f_new) > 10 * info['residual_norm']:
+            # extrapolation overshot, fall back to plain substitution and restart the memory
+            x_new = g_x
+            g_new = fun(x_new)
+            f_new = g_new - x_new
+            d_g = []
+            d_f = []
+        else:
+            d_g = (d_g + [g_new - g_x])[-memory:]
+            d_f = (d_f + [f_new - f])[-memory:]
+        x, g_x, f = x_new, g_new, f_new
+    return (x[0] if scalar else x), info
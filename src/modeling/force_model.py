@@ -1,23 +1,22 @@
-from numpy import array, arctan, cos, linalg, ones, sin, sqrt, rad2deg
-from scipy.interpolate import interp2d
-from common.rotations import body_to_wind, translate_mrc
-from src.modeling.aerodynamics import dynamic_pressure
-from common import Atmosphere
+from numpy import array, asarray, column_stack, concatenate, cos, cross, einsum, floor, identity, linalg, maximum, \
+    ones, sin, rad2deg, stack, tan, unique, where, zeros
+from common.rotations import translate_mrc
 from common.report_tools import load_aero_model, model_exists
-from src.modeling import Aircraft, Propulsion
+from src.modeling import Propulsion
+from src.modeling.Aircraft import aircraft_derivatives, derivatives_key
+from src.modeling.AeroModel import compile_aero_model
+from src.modeling.FlightCondition import FlightCondition
 from src.modeling.trapezoidal_wing import mac, span
+mach_step = 0.01  # spacing of the mach grid the empirical derivatives are interpolated from []
 
 
-def c_f_m(aircraft, x, u, engine_out=False):
-    """return aircraft body axis forces and moments."""
+def c_f_m(aircraft, x, u, engine_out=False, fc=None, geometry_key=None):
+    """return aircraft body axis forces and moments, fc and geometry_key optionally reuse x and aircraft hashing."""
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
     s = aircraft['wing']['planform']  # [ft2]
-    altitude = x[-1]  # [ft]
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
-    v = sqrt(x[0]**2 + x[1]**2 + x[2]**2)  # [ft/s]
-    mach = v/a  # []
-    alpha = arctan(x[2]/x[0])  # [rad]
-    beta = arctan(x[1]/x[0])  # [rad]
-    weight = array([0, 0, 0, 0, 0, 0])
+    weight = zeros(6)
 
     c_bar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
     b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
@@ -26,32 +25,66 @@ def c_f_m(aircraft, x, u, engine_out=False):
         throttle[0] = 0.01
 
     # get thrust contributions
-    c_f_m_t = Propulsion(aircraft['propulsion'], x, throttle, aircraft['weight']['cg']) .thrust_f_m()
+    c_f_m_t = Propulsion(aircraft['propulsion'], x, throttle, aircraft['weight']['cg'], fc=fc).thrust_f_m()
 
     # get weight contributions
     weight[0:3] = aircraft['weight']['weight'] * array([-sin(x[4]), cos(x[4]) * sin(x[3]), cos(x[4]) * cos(x[3])])
 
-    q_bar = dynamic_pressure(mach, altitude)  # [psf]
+    if 'aero_model' in aircraft.keys():
+        c_aero = nonlinear_aero(aircraft, x, u, fc=fc, geometry_key=geometry_key)
+    else:
+        c_aero = linear_aero(aircraft, x, u, fc=fc, geometry_key=geometry_key)
+
+    c = array([- c_aero[0], c_aero[1], - c_aero[2], c_aero[3]*b, c_aero[4]*c_bar, c_aero[5]*b])*fc.q_bar*s
+    c[0:3] = fc.w_2_b @ c[0:3]
+    c[3:6] = fc.w_2_b @ c[3:6]
+    c = c + c_f_m_t + weight
+    return c
+
+
+def c_f_m_batch(aircraft, x, u, engine_out=False, fc=None, aero_scale=None, weight=None):
+    """return aircraft body axis forces and moments for (n, 12) states and (n, 4) controls."""
+    # aero_scale optionally scales the (n, 6) aero coefficients, weight optionally gives (n,) weights [lbs]
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
+    u = asarray(u, dtype=float)
     s = aircraft['wing']['planform']  # [ft2]
 
+    c_bar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
+    b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
+    throttle = u[:, 3:4] * ones((1, aircraft['propulsion']['n_engines']))  # []
+    if engine_out:
+        throttle[:, 0] = 0.01
+
+    # get thrust contributions
+    c_f_m_t = Propulsion(aircraft['propulsion'], x, throttle, aircraft['weight']['cg'], fc=fc).thrust_f_m()
+
+    # get weight contributions
+    w = aircraft['weight']['weight'] if weight is None else asarray(weight, dtype=float)[:, None]
+    weight = zeros((len(x), 6))
+    weight[:, 0:3] = w * column_stack((-sin(x[:, 4]), cos(x[:, 4]) * sin(x[:, 3]), cos(x[:, 4]) * cos(x[:, 3])))
+
     if 'aero_model' in aircraft.keys():
-        c_aero = nonlinear_aero(aircraft, x, u)
+        c_aero = nonlinear_aero_batch(aircraft, x, u, fc=fc)
     else:
-        c_aero = linear_aero(aircraft, x, u)
+        c_aero = linear_aero_batch(aircraft, x, u, fc=fc)
+    if aero_scale is not None:
+        c_aero = c_aero * aero_scale
 
-    c = array([- c_aero[0], c_aero[1], - c_aero[2], c_aero[3]*b, c_aero[4]*c_bar, c_aero[5]*b])*q_bar*s
-    b_2_w = body_to_wind(alpha, beta)
-    c[0:3] = linalg.inv(b_2_w) @ c[0:3]
-    c[3:6] = linalg.inv(b_2_w) @ c[3:6]
+    c = column_stack((- c_aero[:, 0], c_aero[:, 1], - c_aero[:, 2],
+                      c_aero[:, 3]*b, c_aero[:, 4]*c_bar, c_aero[:, 5]*b)) * (fc.q_bar*s)[:, None]
+    c[:, 0:3] = einsum('nij,nj->ni', fc.w_2_b, c[:, 0:3])
+    c[:, 3:6] = einsum('nij,nj->ni', fc.w_2_b, c[:, 3:6])
     c = c + c_f_m_t + weight
     return c
 
 
-def landing_gear_loads(aircraft, x, c, fix=False, brake=0):
-    """return landing gear loads."""
-    v = (x[0]**2+x[1]**2+x[2]**2)**0.5
-    rho = Atmosphere(x[-1]).air_density()
-    q_bar = 0.5*rho*v**2
+def landing_gear_loads(aircraft, x, c, fix=False, brake=0, fc=None):
+    """return landing gear loads, fc is an optional FlightCondition of x."""
+    if fc is None:
+        fc = FlightCondition(x)
+    q_bar = fc.q_bar
     # normal loads
     x_1 = aircraft['weight']['cg'][0] - aircraft['landing_gear']['nose'][0]
     x_2 = aircraft['weight']['cg'][0] - aircraft['landing_gear']['main'][0]
@@ -79,15 +112,44 @@ def landing_gear_loads(aircraft, x, c, fix=False, brake=0):
     return c_total, c_gear, normal_loads
 
 
-def linear_aero(aircraft, x, u):
-    """return aircraft aero stability axis linear force and moment coefficients."""
+def landing_gear_loads_batch(aircraft, x, c, fix=False, brake=0, fc=None):
+    """return landing gear loads for (n, 12) states and (n, 6) forces and moments, same model as landing_gear_loads."""
+    if fc is None:
+        fc = FlightCondition(x)
+    c = asarray(c, dtype=float)
+    x_1 = aircraft['weight']['cg'][0] - aircraft['landing_gear']['nose'][0]
+    x_2 = aircraft['weight']['cg'][0] - aircraft['landing_gear']['main'][0]
+    z_1 = aircraft['weight']['cg'][2] - aircraft['landing_gear']['nose'][2]
+    z_2 = aircraft['weight']['cg'][2] - aircraft['landing_gear']['main'][2]
+    mu_b = aircraft['landing_gear']['mu_brake']
+    mu_r = aircraft['landing_gear']['mu_roll']
+
+    mu = (mu_b - mu_r) * brake + mu_r
+
+    a = array([[x_1 - mu * z_1, (x_2 - mu * z_2)], [-1, -1]])
+    normal_loads = linalg.solve(a, column_stack((c[:, 4], c[:, 2])).T).T
+    if fix:
+        normal_loads[normal_loads > 0] = 0
+    n_total = normal_loads[:, 0] + normal_loads[:, 1]
+    c_gear = zeros(c.shape)
+    c_gear[:, 0] = n_total * mu + aircraft['landing_gear']['c_d'] * fc.q_bar * aircraft['wing']['planform']
+    c_gear[:, 2] = n_total
+    c_gear[:, 4] = (normal_loads[:, 0] * -x_1 + normal_loads[:, 1] * -x_2 +
+                    (normal_loads[:, 0] * z_1 + normal_loads[:, 1] * z_2) * mu)
+    return c + c_gear, c_gear, normal_loads
+
+
+def linear_aero(aircraft, x, u, fc=None, geometry_key=None):
+    """return aircraft aero stability axis linear force and moment coefficients, mach interpolated on mach_step."""
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
     s = aircraft['wing']['planform']  # [ft2]
-    altitude = x[-1]  # [ft]
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
-    v = sqrt(x[0] ** 2 + x[1] ** 2 + x[2] ** 2)  # [ft/s]
-    mach = v / a  # []
-    alpha = arctan(x[2] / x[0])  # [rad]
-    beta = arctan(x[1] / x[0])  # [rad]
+    altitude = fc.altitude  # [ft]
+    v = fc.v  # [ft/s]
+    mach = fc.mach  # []
+    alpha = fc.alpha  # [rad]
+    beta = fc.beta  # [rad]
 
     c_bar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
     b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
@@ -100,10 +162,142 @@ def linear_aero(aircraft, x, u):
     d_elevator = u[1]  # [rad]
     d_rudder = u[2]  # [rad]
 
+    i, t = _mach_nodes(mach)
+    c_aero = zeros(6)
+    geometry_key = derivatives_key(aircraft) if geometry_key is None else geometry_key
+    drags = None
+    for node, w in ((i, 1 - t), (i + 1, t)):
+        ac = aircraft_derivatives(aircraft, node * mach_step, geometry_key)
+        # skin friction uses the state mach, both nodes share the parasite drags
+        drags = ac.parasite_drags(altitude, mach) if drags is None else drags
+        c_aero = c_aero + w * _linear_coefficients(aircraft, ac, mach, altitude, alpha, beta, p_hat, q_hat, r_hat,
+                                                   d_aileron, d_elevator, d_rudder, drags)
+    return c_aero
+
+
+def linear_aero_batch(aircraft, x, u, fc=None):
+    """return linear stability axis coefficients for (n, 12) states and (n, 4) controls, same model as linear_aero."""
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
+    u = asarray(u, dtype=float)
+    s = aircraft['wing']['planform']  # [ft2]
+    v = fc.v  # [ft/s]
+    mach = fc.mach  # []
+    alpha = fc.alpha  # [rad]
+    beta = fc.beta  # [rad]
+
+    c_bar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
+    b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
+
+    p_hat = x[:, 6] * b / (2 * v)  # []
+    q_hat = x[:, 7] * c_bar / (2 * v)  # []
+    r_hat = x[:, 8] * b / (2 * v)  # []
+
+    # one vectorized evaluation per mach grid node, each state is weighted onto the two nodes around its mach
+    c_aero = zeros((len(x), 6))
+    i, t = _mach_nodes(mach)
+    geometry_key = derivatives_key(aircraft)
+    drags = aircraft_derivatives(aircraft, mach_step, geometry_key).parasite_drags(x[:, -1], mach)
+    for node in unique(concatenate((i, i + 1))):
+        k = (i == node) | (i + 1 == node)
+        w = where(i[k] == node, 1 - t[k], t[k])
+        ac = aircraft_derivatives(aircraft, node * mach_step, geometry_key)
+        c_aero[k, :] += w[:, None] * _linear_coefficients(aircraft, ac, mach[k], x[k, -1], alpha[k], beta[k], p_hat[k],
+                                                          q_hat[k], r_hat[k], u[k, 0], u[k, 1], u[k, 2],
+                                                          [drag[k] for drag in drags]).T
+    return c_aero
+
+
+def nonlinear_aero(aircraft, x, u, fc=None, geometry_key=None):
+    """return aircraft aero stability axis nonlinear force and moment coefficients."""
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
+    altitude = fc.altitude  # [ft]
+    mach = fc.mach  # []
+    alpha = rad2deg(fc.alpha)
+    beta = rad2deg(fc.beta)
+    model = aircraft['aero_model']
+    s = aircraft['wing']['planform']  # [ft2]
+    cbar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
+    b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
+    p = rad2deg(x[6])
+    q = rad2deg(x[7])
+    r = rad2deg(x[8])
+
+    d_aileron = rad2deg(u[0])  # [rad]
+    d_elevator = rad2deg(u[1])  # [rad]
+    d_rudder = rad2deg(u[2])  # [rad]
+
+    c = compile_aero_model(model).c_f_m(mach, alpha, beta, p, q, r, d_aileron, d_elevator, d_rudder)
+    # the zero lift drag depends on mach through skin friction only, any grid node derivatives evaluate it
+    c_d_0 = aircraft_derivatives(aircraft, mach_step, geometry_key).c_d_zero(altitude, mach)
+    c_aero = (array(c) + array([c_d_0, 0, 0, 0, 0, 0]))
+    c_aero_cg = translate_mrc(model['mrc'], aircraft['weight']['cg'], c_aero * array([1, 1, 1, -b, cbar, -b]))
+    c_aero_cg = c_aero_cg * array([1, 1, 1, -1 / b, 1 / cbar, -1 / b])
+    return c_aero_cg
+
+
+def nonlinear_aero_batch(aircraft, x, u, fc=None):
+    """return nonlinear stability axis coefficients for (n, 12) states and (n, 4) controls."""
+    if fc is None:
+        fc = FlightCondition(x)
+    x = fc.x
+    u = asarray(u, dtype=float)
+    mach = fc.mach  # []
+    alpha = rad2deg(fc.alpha)
+    beta = rad2deg(fc.beta)
+    model = aircraft['aero_model']
+    s = aircraft['wing']['planform']  # [ft2]
+    cbar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
+    b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
+    p = rad2deg(x[:, 6])
+    q = rad2deg(x[:, 7])
+    r = rad2deg(x[:, 8])
+    d = rad2deg(u[:, 0:3])  # [deg]
+
+    c_aero = compile_aero_model(model).c_f_m(mach, alpha, beta, p, q, r, d[:, 0], d[:, 1], d[:, 2])
+    c_aero[:, 0] = c_aero[:, 0] + aircraft_derivatives(aircraft, mach_step).c_d_zero(x[:, -1], mach)
+    t = _translate_mrc_matrix(model['mrc'], aircraft['weight']['cg'])
+    c_aero_cg = (c_aero * array([1, 1, 1, -b, cbar, -b])) @ t.T
+    c_aero_cg = c_aero_cg * array([1, 1, 1, -1 / b, 1 / cbar, -1 / b])
+    return c_aero_cg
+
+
+def nonlinear_eom_batch(x, m, j, c):
+    """return (n, 12) state derivatives of nonlinear_eom for stacked states, masses, inertias and loads."""
+    x = asarray(x, dtype=float)
+    vel = x[:, 0:3]
+    phi = x[:, 3]
+    theta = x[:, 4]
+    psi = x[:, 5]
+    omega = x[:, 6:9]
+    p, q, r = omega[:, 0], omega[:, 1], omega[:, 2]
+    dxdt = zeros(x.shape)
+    dxdt[:, 0:3] = c[:, 0:3] / asarray(m)[:, None] - cross(omega, vel)
+    h = einsum('nij,nj->ni', j, omega)
+    dxdt[:, 6:9] = linalg.solve(j, (c[:, 3:6] - cross(omega, h))[..., None])[..., 0]
+
+    c_phi, s_phi, c_theta, s_theta, c_psi, s_psi = cos(phi), sin(phi), cos(theta), sin(theta), cos(psi), sin(psi)
+    dxdt[:, 3] = p + tan(theta) * (q * s_phi + r * c_phi)
+    dxdt[:, 4] = q * c_phi - r * s_phi
+    dxdt[:, 5] = (q * s_phi + r * c_phi) / c_theta
+    u, v, w = vel[:, 0], vel[:, 1], vel[:, 2]
+    dxdt[:, 9] = (u * c_theta * c_psi + v * (s_phi * s_theta * c_psi - c_phi * s_psi) +
+                  w * (c_phi * s_theta * c_psi + s_phi * s_psi))
+    dxdt[:, 10] = (u * c_theta * s_psi + v * (s_phi * s_theta * s_psi + c_phi * c_psi) +
+                   w * (c_phi * s_theta * s_psi - s_phi * c_psi))
+    dxdt[:, 11] = u * s_theta - v * s_phi * c_theta - w * c_phi * c_theta
+    return dxdt
+
+
+def _linear_coefficients(aircraft, ac, mach, altitude, alpha, beta, p_hat, q_hat, r_hat, d_aileron, d_elevator,
+                         d_rudder, drags=None):
+    """return linear stability axis coefficients from aircraft derivatives, inputs may be arrays."""
     alpha_dot = 0  # []
 
-    ac = Aircraft(aircraft, mach)
-    cd = (ac.c_d_zero(altitude) +
+    cd = (ac.c_d_zero(altitude, mach, drags) +
           ((ac.c_l_zero() + ac.c_l_alpha() * alpha +
               ac.c_l_alpha_dot() * alpha_dot +
               ac.c_l_pitch_rate() * q_hat +
@@ -127,7 +321,7 @@ def linear_aero(aircraft, x, u):
            ac.c_r_delta_aileron() * d_aileron +
            ac.c_r_delta_rudder() * d_rudder)
 
-    cmp = (ac.c_m_zero(altitude) +
+    cmp = (ac.c_m_zero(altitude, mach, drags) +
            ac.c_m_alpha() * alpha +
            ac.c_m_alpha_dot() * alpha_dot +
            ac.c_m_pitch_rate() * q_hat +
@@ -142,47 +336,13 @@ def linear_aero(aircraft, x, u):
     return c_aero
 
 
-def nonlinear_aero(aircraft, x, u):
-    """return aircraft aero stability axis nonlinear force and moment coefficients."""
-    altitude = x[-1]  # [ft]
-    a = Atmosphere(altitude).speed_of_sound()  # [ft/s]
-    v = sqrt(x[0] ** 2 + x[1] ** 2 + x[2] ** 2)  # [ft/s]
-    mach = v / a  # []
-    alpha = rad2deg(arctan(x[2] / x[0]))
-    beta = rad2deg(arctan(x[1] / x[0]))
-    model = aircraft['aero_model']
-    s = aircraft['wing']['planform']  # [ft2]
-    cbar = mac(aircraft['wing']['aspect_ratio'], s, aircraft['wing']['taper'])  # [ft]
-    b = span(aircraft['wing']['aspect_ratio'], s)  # [ft]
-    p = rad2deg(x[6])
-    q = rad2deg(x[7])
-    r = rad2deg(x[8])
+def _mach_nodes(mach):
+    """return index of the mach_step node below mach and the weight of the node above, clamped to the first node."""
+    mach = maximum(mach, mach_step) / mach_step
+    i = floor(mach)
+    return i, mach - i
 
-    d_aileron = rad2deg(u[0])  # [rad]
-    d_elevator = rad2deg(u[1])  # [rad]
-    d_rudder = rad2deg(u[2])  # [rad]
 
-    names = ['cd', 'cy', 'cl', 'cmr', 'cmp', 'cmy']
-    c = []
-    for cfm in names:
-        f_bas = interp2d(model['baseline']['alpha'], model['baseline']['mach'], model['baseline']['cfm'][cfm])
-        f_lat = interp2d(model['lat_dir']['beta'], model['lat_dir']['mach'], model['lat_dir']['cfm'][cfm])
-        f_ail = interp2d(model['aileron']['d_aileron'], model['aileron']['mach'], model['aileron']['cfm'][cfm])
-        f_ele = interp2d(model['elevator']['d_elevator'], model['elevator']['mach'], model['elevator']['cfm'][cfm])
-        f_rud = interp2d(model['rudder']['d_rudder'], model['rudder']['mach'], model['rudder']['cfm'][cfm])
-        f_p = interp2d(model['p']['p'], model['p']['mach'], model['p']['cfm'][cfm])
-        f_q = interp2d(model['q']['q'], model['q']['mach'], model['q']['cfm'][cfm])
-        f_r = interp2d(model['r']['r'], model['r']['mach'], model['r']['cfm'][cfm])
-        c.append(float(f_bas(alpha, mach)) +
-                 float(f_lat(beta, mach) - f_bas(0, mach)) +
-                 float(f_ail(d_aileron, mach) - f_bas(0, mach)) +
-                 float(f_ele(d_elevator, mach) - f_bas(0, mach)) +
-                 float(f_rud(d_rudder, mach) - f_bas(0, mach)) +
-                 float(f_p(p, mach) - f_bas(0, mach)) +
-                 float(f_q(q, mach) - f_bas(0, mach)) +
-                 float(f_r(r, mach) - f_bas(0, mach)))
-    ac = Aircraft(aircraft, mach)
-    c_aero = (array(c) + array([ac.c_d_zero(altitude), 0, 0, 0, 0, 0]))
-    c_aero_cg = translate_mrc(model['mrc'], aircraft['weight']['cg'], c_aero * array([1, 1, 1, -b, cbar, -b]))
-    c_aero_cg = c_aero_cg * array([1, 1, 1, -1 / b, 1 / cbar, -1 / b])
-    return c_aero_cg
+def _translate_mrc_matrix(mrc, cg, n=6):
+    """return linear map of translate_mrc, so stacked coefficients move with one product."""
+    return stack([translate_mrc(mrc, cg, e) for e in identity(n)], axis=1)
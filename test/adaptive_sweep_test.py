@@ -0,0 +1,47 @@
+from numpy import array, cos, linspace, sin
+from src.airplanes.example.plane import plane
+from src.modeling import aerodynamics
+from src.modeling.aerodynamics import adaptive_sweep_avl, avl_cfm_names
+
+
+def analytic_runs(aircraft, cases, n_workers=None):
+    """analytic stand-in for avl, lift curves steep in mach and alpha, elevator increments linear."""
+    runs.extend(cases)
+    return [array([0.01 * alpha ** 2, 0, 0.1 * alpha * (1 + 8 * mach ** 6) + 0.02 * u[1], 0,
+                   sin(alpha / 5) + 0.01 * u[1], cos(mach * 3)]) for mach, alpha, beta, p, q, r, u in cases]
+
+
+runs = []
+aerodynamics.avl_runs = analytic_runs
+mach = linspace(0.2, 0.8, 3)
+sweeps = {'baseline': (mach, linspace(-10, 10, 3), lambda m, a: (m, a, 0, 0, 0, 0, [0, 0, 0, 0])),
+          'elevator': (mach, linspace(-20, 20, 3), lambda m, d: (m, 2, 0, 0, 0, 0, [0, d, 0, 0]))}
+tables = adaptive_sweep_avl(plane, sweeps, tol=1e-3, budget=60)
+runs.clear()
+coarse = adaptive_sweep_avl(plane, sweeps, tol=10, budget=60)
+n_coarse = len(runs)
+try:
+    adaptive_sweep_avl(plane, dict(sweeps, elevator=(linspace(0.2, 0.8, 4),) + sweeps['elevator'][1:]))
+    mismatch = False
+except ValueError:
+    mismatch = True
+
+out = list()
+out.append(all(tables['baseline'][0] == tables['elevator'][0]) and len(tables['baseline'][0]) > 3)
+out.append(sum([len(tables[name][0]) * len(tables[name][1]) for name in tables]) <= 60)
+out.append(len(tables['baseline'][1]) > 3 and len(tables['elevator'][1]) < len(tables['baseline'][1]))
+# mach curvature grows with mach, the refinement should too
+out.append(max(tables['baseline'][0][1:] - tables['baseline'][0][0:-1]) > 0.15 and
+           min(tables['baseline'][0][1:] - tables['baseline'][0][0:-1]) < 0.1)
+for name, (x, y, cfm) in tables.items():
+    for ii in range(0, len(x)):
+        for jj in range(0, len(y)):
+            c = analytic_runs(plane, [sweeps[name][2](x[ii], y[jj])])[0]
+            out.append(all([abs(cfm[cfm_name][ii, jj] - c[kk]) < 1e-12 for kk, cfm_name in enumerate(avl_cfm_names)]))
+out.append(all([len(coarse[name][0]) == 3 and len(coarse[name][1]) == 3 for name in coarse]) and n_coarse == 18)
+out.append(mismatch)
+
+if all(out):
+    print("adaptive sweep test passed!")
+else:
+    print("adaptive sweep test failed")
@@ -0,0 +1,39 @@
+from numpy import array, linspace, outer, ones
+from src.modeling.AeroModel import compile_aero_model, names, sweeps
+from test.test_library import is_close
+mach = linspace(0.2, 0.6, 4)
+model = {'mrc': [10, 0, 1]}
+for sweep, key in sweeps.items():
+    y = linspace(-10, 10, 5)
+    model[sweep] = {'mach': mach, key: y, 'cfm': {}}
+    for ii, cfm in enumerate(names):
+        model[sweep]['cfm'][cfm] = 0.01 * (ii + 1) * outer(ones(len(mach)), y) + outer(mach, ones(len(y)))
+
+f = compile_aero_model(model)
+c = f.c_f_m(0.3, 5, 0, 0, 0, 0, 0, 0, 0)
+c_clamp = f.c_f_m(0.9, 20, 0, 0, 0, 0, 0, 0, 0)
+c_sum = f.c_f_m(0.3, 5, 2, 0, 0, 0, 0, 0, 0)
+
+out = list()
+out.append(is_close(c[0], 0.35))
+out.append(is_close(c[5], 0.6))
+out.append(is_close(c_clamp[2], 0.9))
+out.append(is_close(c_sum[1], c[1] + 0.04))
+out.append(compile_aero_model(model) is f)
+model['baseline']['cfm']['cd'] = model['baseline']['cfm']['cd'] * 2
+f_2 = compile_aero_model(model)
+out.append(f_2 is not f and compile_aero_model(model) is f_2)
+try:
+    model['lat_dir']['cfm']['cd'][0, 0] = 1
+    stale = True
+except ValueError:
+    stale = False
+out.append(not stale)
+model['mrc'][0] = 11
+out.append(compile_aero_model(model) is not f_2)
+out.append(compile_aero_model(model, 'cubic') is not compile_aero_model(model))
+
+if all(out):
+    print("aero model test passed!")
+else:
+    print("aero model test failed")
@@ -0,0 +1,34 @@
+import pickle
+from tempfile import mkdtemp
+from numpy import linspace, memmap, outer, ones
+from src.modeling import aero_store
+from src.modeling.AeroModel import AeroModel, names, sweeps
+from test.test_library import is_close
+
+aero_store.store_root = mkdtemp()
+mach = linspace(0.2, 0.6, 4)
+model = {'mrc': [10, 0, 1]}
+for sweep, key in sweeps.items():
+    y = linspace(-10, 10, 5)
+    model[sweep] = {'mach': mach, key: y, 'cfm': {}}
+    for ii, cfm in enumerate(names):
+        model[sweep]['cfm'][cfm] = 0.01 * (ii + 1) * outer(ones(len(mach)), y) + outer(mach, ones(len(y)))
+
+aero_store.save_aero_tables(model, 'test_plane')
+tables = aero_store.load_model('test_plane')
+c = AeroModel(model).c_f_m(0.3, 5, 2, 0, 0, 0, 0, 0, 0)
+c_store = AeroModel(tables).c_f_m(0.3, 5, 2, 0, 0, 0, 0, 0, 0)
+copy = pickle.loads(pickle.dumps(tables))
+
+out = list()
+out.append(aero_store.aero_tables_exist('test_plane'))
+out.append(isinstance(tables['baseline']['cfm']['cd'], memmap))
+out.append(all(is_close(c[ii], c_store[ii]) for ii in range(0, 6)))
+out.append(len(pickle.dumps(tables)) < 1000)
+out.append(isinstance(copy['elevator']['cfm']['cl'], memmap))
+out.append(aero_store.load_model('missing_plane') is None)
+
+if all(out):
+    print("aero store test passed!")
+else:
+    print("aero store test failed")
@@ -1,4 +1,6 @@
-from src.modeling.aerodynamics import dynamic_pressure, friction_coefficient, polhamus, reynolds_number
+from copy import deepcopy
+from src.airplanes.example.plane import plane
+from src.modeling.aerodynamics import avl_case_key, dynamic_pressure, friction_coefficient, polhamus, reynolds_number
 from test.test_library import is_close
 from numpy import pi
 mach = 0.3
@@ -34,6 +36,15 @@ out.append(is_close(c_f, 0.00307937))
 out.append(is_close(re, 8566969.2773))
 out.append(is_close(c_l_alpha_w, 3.63125))
 
+plane_2 = deepcopy(plane)
+plane_2['horizontal']['control_2']['cf_c'] = plane['horizontal']['control_2']['cf_c'] + 0.1
+key_0 = avl_case_key(plane, 0.3, 2, 0, 0, 0, 0, [0, 0, 0, 0])
+key_e = avl_case_key(plane, 0.3, 2, 0, 0, 0, 0, [0, 5, 0, 0])
+out.append(key_0 == avl_case_key(plane_2, 0.3, 2, 0, 0, 0, 0, [0, 0, 0, 0]))
+out.append(key_e != avl_case_key(plane_2, 0.3, 2, 0, 0, 0, 0, [0, 5, 0, 0]))
+plane_2['wing']['planform'] = plane['wing']['planform'] + 1
+out.append(key_0 != avl_case_key(plane_2, 0.3, 2, 0, 0, 0, 0, [0, 0, 0, 0]))
+
 if any(out):
     print("aerodynamics test passed!")
 else:
@@ -1,8 +1,15 @@
+from numpy import array
 from common import Atmosphere
+from src.modeling.atmosphere import air_properties, atmosphere, atmosphere_memo
 from test.test_library import is_close
 
 h_0 = Atmosphere(0)
 h_40k = Atmosphere(40000)
+h_1234 = Atmosphere(1234.5)
+rho, a, t, p, mu = atmosphere(1234.5)
+hits = atmosphere_memo.hits
+atmosphere(1234.5)
+rho_v, a_v = air_properties(array([[0, 1234.5], [40000, 150000]]))
 
 out = list()
 out.append((is_close(h_0.air_density(), 0.002379)))
@@ -13,8 +20,16 @@ out.append((is_close(h_0.speed_of_sound(), 1116.462)))
 out.append(is_close(h_40k.speed_of_sound(), 967.723))
 out.append((is_close(h_0.viscosity(), 3.737e-07)))
 out.append(is_close(h_40k.viscosity(), 2.967e-07))
+out_table = list()
+out_table.append(is_close(rho, h_1234.air_density(), rel_tol=1e-6) and is_close(p, h_1234.pressure(), rel_tol=1e-6))
+out_table.append(is_close(a, h_1234.speed_of_sound(), rel_tol=1e-6) and is_close(mu, h_1234.viscosity(), rel_tol=1e-6))
+out_table.append(is_close(t, p / (rho * 1716.49)) and isinstance(rho, float))
+out_table.append(atmosphere_memo.hits == hits + 1)
+out_table.append(rho_v.shape == (2, 2) and is_close(rho_v[0, 1], rho, rel_tol=1e-12))
+out_table.append(is_close(a_v[1, 0], h_40k.speed_of_sound(), rel_tol=1e-6))
+out_table.append(is_close(rho_v[1, 1], Atmosphere(150000).air_density(), rel_tol=1e-12))
 
-if any(out):
+if any(out) and all(out_table):
     print("atmosphere test passed!")
 else:
     print("atmosphere test failed")
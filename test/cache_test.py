@@ -0,0 +1,42 @@
+from tempfile import mkdtemp
+from numpy import array
+from src.modeling.cache import fingerprint, LruCache
+
+a = {'wing': {'planform': 100, 'limits': [-25, 25]}, 'cg': array([10.0, 0, 1])}
+b = {'cg': array([10.0, 0, 1]), 'wing': {'limits': [-25, 25], 'planform': 100.0}}
+c = {'wing': {'planform': 101, 'limits': [-25, 25]}, 'cg': array([10.0, 0, 1])}
+
+cache = LruCache(maxsize=2)
+cache.put('a', 1)
+cache.put('b', 2)
+cache.get('a')
+cache.put('c', 3)
+
+store = mkdtemp()
+disk = LruCache(maxsize=2, store=store)
+disk.put('d', array([1.0, 2.0]))
+disk_2 = LruCache(maxsize=2, store=store)
+scoped_cache = LruCache(maxsize=2)
+with scoped_cache.backed_by(store):
+    scoped = scoped_cache.get('d')
+bounded = LruCache(maxsize=1, store=mkdtemp(), store_size=2)
+for key in ['f', 'g', 'h']:
+    bounded.put(key, array([1.0]))
+bounded.clear()
+
+out = list()
+out.append(fingerprint(a) == fingerprint(b))
+out.append(fingerprint(a) != fingerprint(c))
+out.append(cache.get('b') is None)
+out.append(cache.get('a') == 1)
+out.append(cache.info()['hits'] == 2)
+out.append(cache.info()['misses'] == 1)
+out.append(all(disk_2.get('d') == array([1.0, 2.0])) and disk_2.hits == 1)
+out.append(disk_2.get('e') is None)
+out.append(all(scoped == array([1.0, 2.0])) and scoped_cache.store is None)
+out.append(bounded.get('f') is None and bounded.get('g') is not None and bounded.get('h') is not None)
+
+if all(out):
+    print("cache test passed!")
+else:
+    print("cache test failed")
@@ -0,0 +1,41 @@
+from common.equations_of_motion import nonlinear_eom
+from numpy import array, zeros
+from src.airplanes.example.plane import plane
+from src.analysis.controls_analysis import nonlinear_eom_to_ss
+from src.modeling.force_model import c_f_m
+from test.test_library import is_close
+
+x_0 = array([400, 0, 20, 0, 0.05, 0, 0, 0, 0, 0, 0, 10000], dtype=float)
+u_0 = array([0, -0.02, 0, 0.8])
+m = plane['weight']['weight'] / 32.174
+j = plane['weight']['inertia']
+x_ss = [0, 2, 4, 7]
+u_ss = [1]
+x_copy = x_0.copy()
+u_copy = u_0.copy()
+a, b, c, d = nonlinear_eom_to_ss(plane, x_ss, u_ss, x_0, u_0, m, j)
+
+out = list()
+out.append(all(x_0 == x_copy) and all(u_0 == u_copy))
+out.append(a.shape == (4, 4) and b.shape == (4, 1))
+for jj, col in enumerate(x_ss):
+    h = 1e-4 * max(abs(x_0[col]), 1)
+    x_1 = x_0.copy()
+    x_2 = x_0.copy()
+    x_1[col] = x_1[col] + h
+    x_2[col] = x_2[col] - h
+    dxdt = (nonlinear_eom(x_1, m, j, c_f_m(plane, x_1, u_0)) - nonlinear_eom(x_2, m, j, c_f_m(plane, x_2, u_0)))/(2*h)
+    for ii, row in enumerate(x_ss):
+        out.append(is_close(a[ii, jj], dxdt[row], rel_tol=1e-6, abs_tol=1e-8))
+u_1 = u_0.copy()
+u_2 = u_0.copy()
+u_1[1] = u_1[1] + 1e-4
+u_2[1] = u_2[1] - 1e-4
+dxdt = (nonlinear_eom(x_0, m, j, c_f_m(plane, x_0, u_1)) - nonlinear_eom(x_0, m, j, c_f_m(plane, x_0, u_2)))/2e-4
+for ii, row in enumerate(x_ss):
+    out.append(is_close(b[ii, 0], dxdt[row], rel_tol=1e-6, abs_tol=1e-8))
+
+if all(out):
+    print("controls analysis test passed!")
+else:
+    print("controls analysis test failed")
@@ -0,0 +1,23 @@
+from numpy import array, cos
+from src.modeling.fixed_point import fixed_point
+from test.test_library import is_close
+
+a = array([[0.9, 0.05], [0.02, 0.85]])
+b = array([1.0, 2.0])
+x_picard, picard = fixed_point(lambda x: a @ x + b, [0, 0], tol=1e-8, max_iter=500, method='picard')
+x_anderson, anderson = fixed_point(lambda x: a @ x + b, [0, 0], tol=1e-8, max_iter=500)
+x_aitken, aitken = fixed_point(cos, 1.0, tol=1e-10, method='aitken')
+x_secant, secant = fixed_point(cos, 1.0, tol=1e-10, method='secant')
+x_cap, cap = fixed_point(cos, 1.0, max_iter=3, method='picard')
+
+out = list()
+out.append(picard['success'] and anderson['success'] and anderson['n_fev'] < picard['n_fev'] / 10)
+out.append(is_close(x_anderson[0], 125 / 7) and is_close(x_anderson[1], 110 / 7))
+out.append(is_close(x_aitken, 0.7390851332) and is_close(x_secant, 0.7390851332) and aitken['n_fev'] < 10)
+out.append(not cap['success'] and cap['iterations'] == 3 and len(cap['history']) == 4)
+out.append(picard['history'][-1] <= 1e-8 < picard['history'][0])
+
+if all(out):
+    print("fixed point test passed!")
+else:
+    print("fixed point test failed")
@@ -0,0 +1,68 @@
+import time
+from numpy import array, linspace, ones, outer, random, tile
+from src.airplanes.example.plane import plane
+from src.modeling.AeroModel import names, sweeps
+from src.modeling.Aircraft import Aircraft, derivatives_key
+from src.modeling.FlightCondition import FlightCondition
+from src.modeling.force_model import c_f_m, c_f_m_batch, landing_gear_loads, linear_aero, _linear_coefficients
+from test.test_library import is_close
+
+x = array([[400, 5, 20, 0.01, 0.05, 0, 0.01, 0.02, 0.01, 0, 0, 10000],
+           [300, -5, 30, 0, 0.1, 0, 0, -0.05, 0, 0, 0, 0],
+           [500, 0, 10, 0, 0.02, 0, 0, 0, 0, 0, 0, 30000]])
+u = tile(array([0.01, -0.02, 0.01, 0.8]), (3, 1))
+c_batch = c_f_m_batch(plane, x, u)
+fc = FlightCondition(x)
+fc_1 = FlightCondition(x[1])
+c_fc = c_f_m(plane, x[1], u[1], fc=fc_1)
+c_key = c_f_m(plane, x[1], u[1], fc=fc_1, geometry_key=derivatives_key(plane))
+model = {'mrc': [10, 0, 1]}
+for sweep, key in sweeps.items():
+    y = linspace(-10, 10, 5)
+    model[sweep] = {'mach': linspace(0.2, 0.6, 4), key: y, 'cfm': {}}
+    for ii, cfm in enumerate(names):
+        model[sweep]['cfm'][cfm] = 0.001 * (ii + 1) * outer(ones(4), y) + 0.01 * outer(linspace(0.2, 0.6, 4), ones(5))
+plane_model = dict(plane, aero_model=model)
+c_model = c_f_m_batch(plane_model, x, u)
+x_mid = array([400, 5, 20, 0.01, 0.05, 0, 0, 0, 0, 0, 0, 10000])
+fc_mid = FlightCondition(x_mid)
+c_mid = linear_aero(plane, x_mid, u[0], fc=fc_mid)
+c_exact = _linear_coefficients(plane, Aircraft(plane, fc_mid.mach), fc_mid.mach, 10000, fc_mid.alpha, fc_mid.beta,
+                               0, 0, 0, 0.01, -0.02, 0.01)
+rng = random.default_rng(0)
+x_many = tile(x[0], (1000, 1)) + rng.standard_normal((1000, 12)) * array([60, 5, 5, 0.1, 0.05, 0.1, 0.05, 0.05,
+                                                                          0.05, 0, 0, 2000])
+u_many = tile(u[0], (1000, 1))
+c_f_m_batch(plane, x_many, u_many)
+t_0 = time.perf_counter()
+c_many = c_f_m_batch(plane, x_many, u_many)
+wall_batch = time.perf_counter() - t_0
+t_0 = time.perf_counter()
+c_loop = array([c_f_m(plane, x_many[ii], u_many[ii]) for ii in range(0, 100)])
+wall_loop = (time.perf_counter() - t_0) * 10
+try:
+    fc_1.mach = 0
+    immutable = False
+except AttributeError:
+    immutable = True
+
+out = list()
+for ii in range(0, len(x)):
+    c = c_f_m(plane, x[ii], u[ii])
+    for jj in range(0, 6):
+        out.append(is_close(c_batch[ii, jj], c[jj], abs_tol=1e-6))
+out.append(all(abs(c_fc - c_f_m(plane, x[1], u[1])) < 1e-9) and all(c_key == c_fc))
+out.append(fc.mach.shape == (3,) and is_close(fc.mach[1], fc_1.mach) and is_close(fc.q_bar[1], fc_1.q_bar))
+out.append(all(abs(fc_1.b_2_w @ fc_1.w_2_b - array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])).reshape(-1) < 1e-12))
+out.append(immutable)
+out.append(all(abs(c_mid - c_exact) < 1e-4 * (1e-3 + abs(c_exact))))
+out.append(all(abs(c_many[:100] - c_loop).reshape(-1) < 1e-6 * (1 + abs(c_loop).reshape(-1))))
+out.append(wall_batch < wall_loop / 5)
+for ii in range(0, len(x)):
+    out.append(all(abs(c_model[ii] - c_f_m(plane_model, x[ii], u[ii])) < 1e-6 * (1 + abs(c_model[ii]))))
+out.append(all(abs(landing_gear_loads(plane, x[1], c_fc, fc=fc_1)[0] - landing_gear_loads(plane, x[1], c_fc)[0]) < 1e-9))
+
+if all(out):
+    print("force model test passed!")
+else:
+    print("force model test failed")
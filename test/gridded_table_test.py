@@ -0,0 +1,29 @@
+from numpy import linspace, meshgrid, stack
+from src.modeling.GriddedTable import GriddedTable
+from test.test_library import is_close
+
+x = linspace(0, 1, 6)
+y = linspace(-2, 2, 5)
+z = linspace(0.2, 0.8, 3)
+x_g, y_g, z_g = meshgrid(x, y, z, indexing='ij')
+linear = GriddedTable([x, y, z], stack([x_g + 2 * y_g - z_g, x_g * y_g * z_g]))
+cubic = GriddedTable([x, y], stack([x_g[:, :, 0] ** 2 + y_g[:, :, 0], x_g[:, :, 0] * y_g[:, :, 0]]), method='cubic')
+reverse = GriddedTable([x[::-1], y, z], stack([x_g + 2 * y_g - z_g, x_g * y_g * z_g])[:, ::-1])
+
+c = linear(0.35, 0.5, 0.4)
+c_clamp = linear(1.5, 0.5, 0.4)
+c_vector = linear(linspace(0, 1, 7), 0.5, 0.4)
+c_cubic = cubic(0.5, 0.3)
+
+out = list()
+out.append(is_close(c[0], 0.35 + 1 - 0.4))
+out.append(c_clamp.shape == (2,) and is_close(c_clamp[0], 1 + 1 - 0.4))
+out.append(c_vector.shape == (7, 2))
+out.append(is_close(reverse(0.35, 0.5, 0.4)[0], c[0]))
+out.append(is_close(c_cubic[0], 0.5 ** 2 + 0.3, rel_tol=1e-3))
+out.append(is_close(c_cubic[1], 0.15))
+
+if all(out):
+    print("gridded table test passed!")
+else:
+    print("gridded table test failed")
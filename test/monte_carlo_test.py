@@ -0,0 +1,54 @@
+import time
+from copy import deepcopy
+from numpy import array, cos, deg2rad, random, sin, tile
+from common.equations_of_motion import nonlinear_eom
+from src.airplanes.example.plane import plane
+from src.analysis.monte_carlo import dispersed_c_f_m, monte_carlo, nominal_members, sample_dispersions
+from src.analysis.simulation import simulate
+from src.analysis.trim import trim_alpha_de_nonlinear
+from src.modeling.force_model import c_f_m_batch, nonlinear_eom_batch
+
+v = 400
+altitude = 10000
+trim_out = trim_alpha_de_nonlinear(plane, v, altitude, 0)
+x_0 = array([v * cos(deg2rad(trim_out[0])), 0, v * sin(deg2rad(trim_out[0])), 0, deg2rad(trim_out[0]), 0,
+             0, 0, 0, 0, 0, altitude])
+u_0 = array([0, deg2rad(trim_out[1]), 0, 1])
+
+rng = random.default_rng(0)
+x = tile(x_0, (5, 1)) + rng.standard_normal((5, 12)) * array([5, 2, 2, 0.05, 0.02, 0.1, 0.05, 0.05, 0.05, 0, 0, 50])
+members = sample_dispersions(plane, 5, seed=1)
+c = rng.standard_normal((5, 6)) * 1000
+dxdt = nonlinear_eom_batch(x, members['weight'] / 32.174, members['inertia'], c)
+
+shifted = deepcopy(plane)
+shifted['weight']['cg'] = [plane['weight']['cg'][0] + 0.7, plane['weight']['cg'][1], plane['weight']['cg'][2] - 0.3]
+moved = nominal_members(plane, 5)
+moved['cg'] = tile(array(shifted['weight']['cg'], dtype=float), (5, 1))
+moved['aero_scale'] = 0 * moved['aero_scale']
+u = tile(u_0, (5, 1))
+
+t, x_single, u_single, info_single = simulate(plane, x_0, u_0, 1, dt=0.02)
+t_mc, nominal, info_nominal = monte_carlo(plane, x_0, u_0, 1, nominal_members(plane, 3), dt=0.02)
+t_0 = time.perf_counter()
+t_mc, dispersed, info = monte_carlo(plane, x_0, u_0, 1, sample_dispersions(plane, 200, seed=2), dt=0.02,
+                                    keep_states=True)
+wall = time.perf_counter() - t_0
+
+out = list()
+for ii in range(0, 5):
+    out.append(all(abs(dxdt[ii] - nonlinear_eom(x[ii], members['weight'][ii] / 32.174, members['inertia'][ii], c[ii]))
+                   < 1e-9 * (1 + abs(dxdt[ii]))))
+out.append(all(abs(dispersed_c_f_m(plane, x, u, moved) -
+                   c_f_m_batch(shifted, x, u, aero_scale=0)).reshape(-1) < 1e-6))
+out.append(all(abs(dispersed_c_f_m(plane, x, u, nominal_members(plane, 5)) - c_f_m_batch(plane, x, u)).reshape(-1)
+               < 1e-9))
+out.append(all(abs(nominal['mean'][-1] - x_single[-1]) < 1e-6 * (1 + abs(x_single[-1]))))
+out.append(all(nominal['std'][-1] < 1e-9) and all(dispersed['std'][-1, [0, 2, 11]] > 0))
+out.append(info['states'].shape == (51, 200, 12) and all(dispersed['min'][-1] <= dispersed['max'][-1]))
+out.append(info['n_fev'] == 201 and wall < 20)
+
+if all(out):
+    print("monte carlo test passed!")
+else:
+    print("monte carlo test failed")
@@ -1,4 +1,6 @@
+from numpy import array, cos, deg2rad
 from src.modeling import Propulsion
+from src.modeling.EngineDeck import engine_deck
 from test.test_library import is_close
 
 propulsion = {
@@ -72,7 +74,21 @@ out.append((is_close(cfm[0], 186.60355)))
 out.append((is_close(cfm[4], 398.9669)))
 out.append((is_close(cfm[3], 6.5412)))
 
-if any(out):
+decks = list()
+turbofan = dict(propulsion['engine_1'], deck='turbofan')
+x = array([[200, 0, 0, 0], [800, 0, 0, 35000]])
+p = Propulsion({'n_engines': 2, 'engine_1': propulsion['engine_1'], 'engine_2': turbofan}, x, array([[1, 1], [1, 1]]), cg)
+cfm = p.thrust_f_m()
+t_jet = engine_deck('jet').thrust([propulsion['engine_1']], x[:, 0], x[:, -1], array([[1], [1]]))
+t_fan = engine_deck('turbofan').thrust([turbofan], x[:, 0], x[:, -1], array([[1], [1]]))
+tsfc = engine_deck('turbofan').tsfc([turbofan], 0, 0, 1)
+power = engine_deck('propeller').power([{'pitch': 25, 'diameter': 4, 'rpm_max': 3000}], 100, 0, 1)
+decks.append(cfm.shape == (2, 6) and p.decks() == {'jet': [0], 'turbofan': [1]})
+decks.append(is_close(t_jet[0, 0], 500) and t_fan[1, 0] < 0.7 * t_jet[1, 0])
+decks.append(is_close(tsfc[0], 0.4) and power[0] > 0)
+decks.append(is_close(cfm[1, 0], (t_jet[1, 0] + t_fan[1, 0]) * cos(deg2rad(5)) * cos(deg2rad(2))))
+
+if any(out) and all(decks):
     print("propulsion test passed!")
 else:
     print("propulsion test failed")
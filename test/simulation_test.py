@@ -0,0 +1,52 @@
+from numpy import array, cos, deg2rad, exp, sin
+from src.airplanes.example.plane import plane
+from src.analysis.simulation import control_schedule, integrate, simulate
+from src.analysis.trim import trim_alpha_de_nonlinear
+from test.test_library import is_close
+
+
+def oscillator(t, x):
+    return array([x[1], -x[0]])
+
+
+def apogee(t, x):
+    return x[1]
+
+
+apogee.terminal = True
+apogee.direction = -1
+
+
+def crossing(t, x):
+    return x[0]
+
+
+t_rk4, x_rk4, rk4 = integrate(oscillator, [1, 0], 10, dt=0.05)
+t_rk45, x_rk45, rk45 = integrate(oscillator, [1, 0], 10, dt=0.05, method='rk45', rtol=1e-9, atol=1e-9)
+t_stop, x_stop, stop = integrate(oscillator, [0, 1], 10, dt=0.1, events=[crossing, apogee])
+t_decay, x_decay, decay = integrate(lambda t, x: -x, [1.0], 2, dt=0.1, method='rk45')
+schedule = control_schedule(([0, 1, 2], [[0, 0, 0, 1], [0, 0.1, 0, 1], [0, 0.1, 0, 0.5]]))
+
+v = 400
+altitude = 10000
+trim_out = trim_alpha_de_nonlinear(plane, v, altitude, 0)
+x_0 = array([v * cos(deg2rad(trim_out[0])), 0, v * sin(deg2rad(trim_out[0])), 0, deg2rad(trim_out[0]), 0,
+             0, 0, 0, 0, 0, altitude])
+u_0 = array([0, deg2rad(trim_out[1]), 0, 1])
+t, x, u, info = simulate(plane, x_0, u_0, 2, dt=0.02)
+t_a, x_a, u_a, info_a = simulate(plane, x_0, u_0, 2, dt=0.02, method='rk45', rtol=1e-7, atol=1e-7)
+
+out = list()
+out.append(is_close(x_rk4[-1, 0], cos(10), abs_tol=1e-6) and len(t_rk4) == 201 and rk4['n_fev'] == 801)
+out.append(is_close(x_rk45[-1, 0], cos(10), abs_tol=1e-7) and rk45['n_steps'] < 200)
+out.append(is_close(x_decay[-1, 0], exp(-2), abs_tol=1e-5) and is_close(t_decay[-1], 2))
+out.append(is_close(t_stop[-1], 1.5707963, abs_tol=1e-4) and len(stop['events']) == 1 and stop['events'][0][0] == 1)
+out.append(all(abs(schedule(1.5, None) - array([0, 0.1, 0, 0.75])) < 1e-12) and schedule(5, None)[3] == 0.5)
+out.append(info['success'] and len(t) == 101 and u.shape == (101, 4) and info['real_time_factor'] > 4)
+out.append(abs(x[-1, 0] - x_0[0]) < 10 and abs(x[-1, 4] - x_0[4]) < 5e-2 and abs(x[-1, 11] - altitude) < 20)
+out.append(is_close(x_a[-1, 0], x[-1, 0], abs_tol=1e-3) and is_close(x_a[-1, 11], x[-1, 11], abs_tol=1e-2))
+
+if all(out):
+    print("simulation test passed!")
+else:
+    print("simulation test failed")
@@ -0,0 +1,43 @@
+from copy import deepcopy
+from numpy import array, linspace, meshgrid, sin, stack
+from src.modeling.Surrogate import AvlSurrogate, Kriging
+from test.test_library import is_close
+
+
+def runner(aircraft, cases, n_workers=None):
+    return array([[0.02 + 0.01 * alpha ** 2 / 100, 0.01 * beta, 0.1 * alpha * aircraft['wing']['aspect_ratio'] / 8,
+                   -0.001 * beta, -0.02 * alpha - 0.05 * u[1], 0.002 * beta] for mach, alpha, beta, p, q, r, u in cases])
+
+
+x_g, y_g = meshgrid(linspace(0, 1, 6), linspace(0, 2, 6), indexing='ij')
+x = stack([x_g.reshape(-1), y_g.reshape(-1)], axis=1)
+kriging = Kriging().fit(x, stack([sin(3 * x[:, 0]) + x[:, 1], x[:, 0] * x[:, 1]], axis=1))
+mean, std = kriging.predict(array([[0.45, 1.1], [0.4, 0.8]]))
+
+plane = {'wing': {'aspect_ratio': 8, 'taper': 0.5, 'planform': 300, 'station': 20},
+         'horizontal': {'planform': 60, 'station': 40}, 'vertical': {'planform': 40}, 'weight': {'cg': [21, 0, 1]}}
+cases = [(0.3, alpha, beta, 0, 0, 0, [0, de, 0, 0]) for alpha in linspace(-5, 15, 5) for beta in linspace(-10, 10, 5)
+         for de in linspace(-20, 20, 3)]
+surrogate = AvlSurrogate(tol=1e-3, runner=runner)
+cfm, cfm_std = surrogate.evaluate(plane, cases)
+n_first = surrogate.n_avl
+cfm_2, cfm_std_2 = surrogate.evaluate(plane, [(0.3, 4.0, 1.0, 0, 0, 0, [0, 3.0, 0, 0])])
+swept = deepcopy(plane)
+swept['horizontal']['sweep_LE'] = 30
+mean_swept, std_swept = surrogate.predict(swept, cases[0:1])
+airfoil = dict(plane, wing=dict(plane['wing'], airfoil='2412'))
+std_airfoil = surrogate.predict(airfoil, cases[0:1])[1]
+
+out = list()
+out.append(is_close(mean[0, 0], sin(1.35) + 1.1, rel_tol=1e-2))
+out.append(std[1, 0] < 1e-2 and all(kriging.predict(x[0:1])[1][0] < 1e-3))
+out.append(0 < n_first < len(cases))
+out.append(abs(cfm - runner(plane, cases)).max() < 5e-3)
+out.append(surrogate.n_avl == n_first and cfm_std_2.max() <= 1e-3)
+out.append(is_close(cfm_2[0, 2], 0.4, rel_tol=1e-2))
+out.append(std_swept.max() > 1e-2 and std_airfoil.max() == float('inf'))
+
+if all(out):
+    print("surrogate test passed!")
+else:
+    print("surrogate test failed")
@@ -0,0 +1,47 @@
+from os import listdir, path
+from tempfile import TemporaryDirectory
+from numpy import array, isfinite
+from src.airplanes.example.plane import plane
+from src.analysis.takeoff_table import load_takeoff_table, save_takeoff_table, takeoff_cache, takeoff_key, \
+    takeoff_lookup, takeoff_point, takeoff_table
+from src.modeling.atmosphere import atmosphere, density_altitude
+
+weight = plane['weight']['weight']
+weights = [0.9 * weight, weight]
+elevations = [0, 5000]
+temperatures = [20, 100]
+model = {'mrc': plane['weight']['cg'], 'baseline': {'mach': [0.2, 0.4], 'alpha': [0, 10], 'cfm': {}}}
+model_2 = {'mrc': plane['weight']['cg'], 'baseline': {'mach': [0.2, 0.4], 'alpha': [0, 12], 'cfm': {}}}
+with TemporaryDirectory() as store:
+    table = takeoff_table(plane, weights, elevations, temperatures, n_workers=2, store=store)
+    n_stored = len([name for name in listdir(store) if name.endswith('.npy')])
+    takeoff_cache.clear()
+    with takeoff_cache.backed_by(store):
+        point = takeoff_point(plane, weights[1], elevations[1], temperatures[1])
+    cache_info = takeoff_cache.info()
+    takeoff_table(plane, weights[1:], elevations[1:], temperatures[1:], n_workers=1, store=store)
+    store_reset = takeoff_cache.store is None
+    file = save_takeoff_table(table, path.join(store, 'example.npz'))
+    loaded = load_takeoff_table(file)
+lookup = takeoff_lookup(loaded)
+node = lookup(weights[1], elevations[1], temperatures[1])
+mid = lookup(weight * 0.95, 2500, array([60, 60]))
+t_std = atmosphere(5000)[2] - 459.67  # F
+
+out = list()
+out.append(abs(density_altitude(5000, t_std) - 5000) < 1)
+out.append(density_altitude(0, 100) > 2000 and density_altitude(0, 0) < 0)
+out.append(table['bfl'].shape == (2, 2, 2) and all(isfinite(table['bfl'].reshape(-1))))
+out.append(table['bfl'][1, 1, 1] > table['bfl'][0, 0, 0] and table['v_1'][1, 1, 1] <= table['v_r'][1, 1, 1])
+out.append(n_stored == 8 and cache_info['hits'] == 1 and cache_info['misses'] == 0 and store_reset)
+out.append(takeoff_key(plane, weight, 0, 59) != takeoff_key(dict(plane, aero_model=model), weight, 0, 59))
+out.append(takeoff_key(dict(plane, aero_model=model), weight, 0, 59) !=
+           takeoff_key(dict(plane, aero_model=model_2), weight, 0, 59))
+out.append(all(point == array([table[key][1, 1, 1] for key in ['bfl', 'v_1', 'v_r', 'v_2', 'v_lof']])))
+out.append(loaded['name'] == table['name'] and all((loaded['bfl'] == table['bfl']).reshape(-1)))
+out.append(all([abs(node[key] - table[key][1, 1, 1]) < 1e-9 for key in node]))
+out.append(mid['bfl'].shape == (2,) and table['bfl'].min() < mid['bfl'][0] < table['bfl'].max())
+if all(out):
+    print('takeoff table test passed!')
+else:
+    print('takeoff table test failed!')
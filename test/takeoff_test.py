@@ -0,0 +1,48 @@
+from matplotlib import pyplot as plt
+from numpy import array, isnan, linspace, sqrt, tile
+from common.equations_of_motion import nonlinear_eom
+from src.airplanes.example.plane import plane
+from src.analysis.longitudinal import balanced_field_length, decision_speed, rejected_takeoff
+from src.modeling.force_model import c_f_m, c_f_m_batch, landing_gear_loads, landing_gear_loads_batch
+
+x_0 = array([0.01, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 5000])
+u_0 = array([0.0, 0.0, 0.0, 1])
+v_r, v_1, v_2, v_lof, out = balanced_field_length(plane, x_0, u_0, full_output=True)
+v_r_fine, v_1_fine, v_2_fine, v_lof_fine, out_fine = balanced_field_length(plane, x_0, u_0, rtol=1e-6,
+                                                                           full_output=True)
+
+x_rto = array([150, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 5000.0])
+u_rto = array([0, 0, 0, 0.001])
+v_rto, s_rto = rejected_takeoff(plane, 4000, x_rto, u_rto, n=20)
+s_loop = []
+for vi in v_rto:
+    x_i = x_rto.copy()
+    x_i[0] = 0.707 * vi
+    c_t, c_g, normal_loads = landing_gear_loads(plane, x_i, c_f_m(plane, x_i, u_rto), True, brake=1)
+    s_loop.append(4000 + vi ** 2 / (2 * nonlinear_eom(x_i, plane['weight']['weight'] / 32.174,
+                                                      plane['weight']['inertia'], c_t)[0]))
+x_gear = tile(x_rto, (3, 1))
+x_gear[:, 0] = [50, 100, 150]
+c_gear = c_f_m_batch(plane, x_gear, tile(u_rto, (3, 1)))
+c_t_batch, c_g_batch, normal_batch = landing_gear_loads_batch(plane, x_gear, c_gear, True, brake=0.5)
+v_grid = linspace(0, 100, 11)
+
+out_list = list()
+out_list.append(0 < v_1 < v_r and v_lof < v_r)
+out_list.append(abs(v_1 - v_1_fine) < 0.5 and abs(out['bfl'] - out_fine['bfl']) < 0.01 * out_fine['bfl'])
+out_list.append(abs(out['x'][-1, 11] - 5035) < 1e-6 and out['s'][-1] == out['bfl'])
+out_list.append(out['n_fev'] < 400 and out['n_fev'] < out_fine['n_fev'])
+out_list.append(all(u_0 == array([0.0, 0.0, 0.0, 1])) and all(x_0[1:11] == 0) and x_0[0] == 0.01)
+out_list.append(len(plt.get_fignums()) == 0)
+out_list.append(all(abs(s_rto - array(s_loop)) < 1e-6 * abs(array(s_loop))) and x_rto[0] == 150 and v_rto[0] == 350)
+for ii in range(0, 3):
+    c_t, c_g, normal_loads = landing_gear_loads(plane, x_gear[ii], c_gear[ii], True, brake=0.5)
+    out_list.append(all(abs(c_t_batch[ii] - c_t) < 1e-6) and all(abs(normal_batch[ii] - normal_loads[:, 0]) < 1e-6))
+out_list.append(abs(decision_speed(v_grid, v_grid ** 2, v_grid[::-1], 2000 - v_grid[::-1] ** 2) - sqrt(1000)) < 1e-6)
+out_list.append(decision_speed(v_grid, v_grid ** 2, v_grid[::-1], 20000 - v_grid[::-1] ** 2) == 100)
+out_list.append(isnan(decision_speed(v_grid, v_grid ** 2 + 10, v_grid[::-1], 5 - v_grid[::-1] ** 2)))
+
+if all(out_list):
+    print("takeoff test passed!")
+else:
+    print("takeoff test failed")
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from src.airplanes.example.plane import plane, requirements
+from src.airplanes.trade_study import case_inputs, full_factorial, latin_hypercube, read_results, sobol, trade_study
+
+
+def sizing(plane, requirements, propulsion='h2', **kwargs):
+    if requirements['performance']['range'] > 2000:
+        raise ValueError('no converged design')
+    plane['weight']['weight'] = requirements['performance']['range'] * (2 if propulsion == 'battery' else 1)
+
+
+factorial = full_factorial({'propulsion': ['h2', 'battery'], 'tail': ['T', 'conventional'],
+                            'performance.cruise_mach': [0.4, 0.5]})
+lhs = latin_hypercube({'performance.range': (500, 1000), 'propulsion': ['h2', 'battery']}, 8, seed=1)
+qmc = sobol({'performance.range': (500, 1000), 'plane.wing.aspect_ratio': (8, 14)}, 6, seed=1)
+p_case, r_case, kwargs = case_inputs(plane, requirements, {'propulsion': 'battery', 'plane.wing.aspect_ratio': 10,
+                                                           'performance.range': 600}, options={'rtol': 1e-2})
+
+cases = [{'propulsion': 'h2', 'performance.range': 800.0}, {'propulsion': 'battery', 'performance.range': 600.0},
+         {'propulsion': 'h2', 'performance.range': 3000.0}]
+results_file = os.path.join(tempfile.mkdtemp(), 'study.csv')
+first = trade_study(plane, requirements, cases[0:2], results_file, outputs=['weight.weight'], n_workers=1,
+                    runner=sizing)
+resumed = trade_study(plane, requirements, cases, results_file, outputs=['weight.weight'], n_workers=2,
+                      runner=sizing)
+table = read_results(results_file)
+kept = trade_study(plane, requirements, cases, results_file, outputs=['weight.weight'], n_workers=1, runner=sizing,
+                   retry_failed=False)
+retried = trade_study(plane, requirements, cases, results_file, outputs=['weight.weight'], n_workers=1,
+                      runner=sizing)
+n_lines = len(open(results_file).readlines())
+sized = trade_study(plane, requirements, [{'propulsion': 'h2'}], outputs=['weight.weight', 'performance.range',
+                                                                          'performance.bfl'], n_workers=1,
+                    runner=lambda plane, requirements, **kwargs: None)
+
+out = list()
+out.append(len(factorial) == 8 and factorial[-1] == {'propulsion': 'battery', 'tail': 'conventional',
+                                                     'performance.cruise_mach': 0.5})
+out.append(len(lhs) == 8 and sorted(int((c['performance.range'] - 500) / 62.5) for c in lhs) == list(range(0, 8)))
+out.append(len(qmc) == 8 and all(8 <= c['plane.wing.aspect_ratio'] <= 14 for c in qmc))
+out.append(kwargs == {'rtol': 1e-2, 'propulsion': 'battery'} and p_case['wing']['aspect_ratio'] == 10 and
+           r_case['performance']['range'] == 600 and plane['wing']['aspect_ratio'] == 12 and
+           requirements['performance']['range'] == 825)
+out.append([row['weight.weight'] for row in first] == [800, 1200] and [row['case'] for row in resumed] == [0, 1, 2])
+out.append(resumed[2]['status'].startswith('failed') and len(table) == 3 and resumed[1]['time'] == first[1]['time'])
+out.append(kept[2]['time'] == resumed[2]['time'] and retried[2]['time'] != resumed[2]['time'] and
+           retried[1]['time'] == first[1]['time'] and n_lines == 5 and len(read_results(results_file)) == 3)
+out.append(sized[0]['status'] == 'converged' and sized[0]['performance.range'] > 0 and sized[0]['performance.bfl'] > 0)
+
+if all(out):
+    print("trade study test passed!")
+else:
+    print("trade study test failed")
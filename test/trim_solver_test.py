@@ -0,0 +1,22 @@
+from numpy import array
+from src.analysis.trim_solver import newton_trim
+from test.test_library import is_close
+
+
+def fun(x):
+    return array([x[0] ** 2 + x[1] ** 2 - 4, x[0] - x[1]])
+
+
+x_1, info_1 = newton_trim(fun, [1, 0.5])
+x_2, info_2 = newton_trim(fun, [1, 0.5], bounds=([0, 1.2], [0, 3]))
+
+out = list()
+out.append(info_1['success'])
+out.append(is_close(x_1[0], 2 ** 0.5, rel_tol=1e-6) and is_close(x_1[1], 2 ** 0.5, rel_tol=1e-6))
+out.append(info_1['n_fev'] < 20)
+out.append(x_2[0] <= 1.2 and not info_2['success'])
+
+if all(out):
+    print("trim solver test passed!")
+else:
+    print("trim solver test failed")
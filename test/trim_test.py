@@ -0,0 +1,46 @@
+import warnings
+from numpy import array
+from src.airplanes.example.plane import plane
+from src.analysis.trim import continuation_guess, trim_alpha_de_nonlinear, trim_cache
+from test.test_library import is_close
+
+c_cold, info_cold = trim_alpha_de_nonlinear(plane, 400, 10000, 0, full_output=True)
+c_warm, info_warm = trim_alpha_de_nonlinear(plane, 400, 10000, 0, x0=c_cold, full_output=True)
+c_slsqp = trim_alpha_de_nonlinear(plane, 400, 10000, 0, solver='slsqp')
+c_loose, info_loose = trim_alpha_de_nonlinear(plane, 400, 10000, 0, tol=1e-2, full_output=True)
+c_newton, info = trim_alpha_de_nonlinear(plane, 400, 10000, 0, full_output=True)
+n_cached = trim_cache.info()['size']
+with warnings.catch_warnings(record=True) as caught:
+    warnings.simplefilter('always')
+    c_slow, info_slow = trim_alpha_de_nonlinear(plane, 40, 10000, 0, full_output=True)
+    n_full = len(caught)
+    trim_alpha_de_nonlinear(plane, 40, 10000, 0)
+    trim_alpha_de_nonlinear(plane, 40, 10000, 0)
+n_failed = trim_cache.info()['size'] - n_cached
+trim_cache.clear()
+c_1 = trim_alpha_de_nonlinear(plane, 350, 5000, 0)
+c_2 = trim_alpha_de_nonlinear(plane, 350, 5000, 0)
+hits = trim_cache.hits
+plane['weight']['cg'][0] = plane['weight']['cg'][0] + 0.5
+c_3 = trim_alpha_de_nonlinear(plane, 350, 5000, 0)
+plane['weight']['cg'][0] = plane['weight']['cg'][0] - 0.5
+guess = continuation_guess(3, [1, 2], [array([1.0, -2.0]), array([2.0, -3.0])])
+
+out = list()
+out.append(is_close(c_cold[0], c_warm[0], abs_tol=1e-2))
+out.append(is_close(c_cold[1], c_warm[1], abs_tol=1e-2))
+out.append(is_close(c_slsqp[0], c_newton[0], abs_tol=1e-3))
+out.append(is_close(c_slsqp[1], c_newton[1], abs_tol=1e-3))
+out.append(info['success'] and info['n_fev'] < 20)
+out.append(hits == 1 and all(c_1 == c_2) and trim_cache.misses == 2 and c_3[1] != c_1[1])
+out.append(not info_slow['success'] and n_full == 0 and len(caught) == 2 and caught[0].category is RuntimeWarning)
+out.append(n_failed == 0)
+out.append(info_warm['n_fev'] < info_cold['n_fev'])
+out.append(info_loose['success'] and info_loose['n_fev'] < info_cold['n_fev'] and info_cold['residual_norm'] < 1e-8)
+out.append(continuation_guess(1, [], []) is None)
+out.append(is_close(guess[0], 3) and is_close(guess[1], -4))
+
+if all(out):
+    print("trim test passed!")
+else:
+    print("trim test failed")
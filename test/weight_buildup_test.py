@@ -0,0 +1,50 @@
+from copy import deepcopy
+from numpy import array
+from common import Gravity
+from src.airplanes.example.plane import plane, requirements
+from src.modeling.MassProperties import MassProperties, anti_icing_weight, avionics_weight, buildup_cache, \
+    cargo_weight, electrical_weight, fcs_weight, fuselage_weight, ht_weight, main_gear_weight, nose_gear_weight, \
+    paint, passenger_weight, propulsion_weight, vt_weight, wing_weight
+
+
+def substitution(aircraft, tol=10e-2):
+    """plain substitution of the mtow loop as weight_buildup solved it before the fixed point iteration."""
+    mach = requirements['performance']['cruise_mach']
+    n = max(abs(array(requirements['loads']['n_z'])))
+    w_fixed = (avionics_weight(aircraft, requirements['performance']['range']) + cargo_weight(aircraft) +
+               electrical_weight(aircraft) + fuselage_weight(aircraft) + paint(aircraft) +
+               passenger_weight(aircraft) + propulsion_weight(aircraft) +
+               aircraft['propulsion']['fuel_mass'] * Gravity(0).gravity() + anti_icing_weight(aircraft))
+    mtow = aircraft['weight']['weight']
+    res = 10
+    while abs(res) > tol:
+        mtow_out = (fcs_weight(aircraft, mtow, mach) + ht_weight(aircraft, mtow) + main_gear_weight(aircraft, mtow) +
+                    nose_gear_weight(aircraft, mtow) + vt_weight(aircraft, mtow) + wing_weight(aircraft, mtow, mach, n)
+                    + w_fixed)
+        res = mtow - mtow_out
+        mtow = mtow_out
+    return mtow
+
+
+aircraft = deepcopy(plane)
+buildup_cache.clear()
+mtow, cg, info = MassProperties(aircraft).weight_buildup(requirements, full_output=True)
+mtow_plain = substitution(aircraft)
+heavier = deepcopy(aircraft)
+heavier['weight']['weight'] = 2 * aircraft['weight']['weight']
+mtow_heavier, cg_heavier = MassProperties(heavier).weight_buildup(requirements)
+hits = buildup_cache.hits
+bigger = deepcopy(aircraft)
+bigger['wing']['planform'] = 1.1 * aircraft['wing']['planform']
+mtow_bigger, cg_bigger = MassProperties(bigger).weight_buildup(requirements)
+
+out = list()
+out.append(abs(mtow - mtow_plain) < 1)
+out.append(info['success'] and info['iterations'] > 0 and info['residual_norm'] <= 10e-2 and info['n_fev'] > 0)
+out.append(hits == 1 and mtow_heavier == mtow and all(cg_heavier == cg))
+out.append(buildup_cache.hits == hits and mtow_bigger > mtow)
+
+if all(out):
+    print("weight buildup test passed!")
+else:
+    print("weight buildup test failed")